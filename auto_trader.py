@@ -5,11 +5,13 @@ from dataclasses import dataclass, field
 from typing import Optional
 
 # Selenium / Chrome DevTools connection
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+# נטען רק בחיבור הראשון לכרום (PC + מסחר אוטומטי) — לא ב-import של main
+from lazy_import import lazy_module
+webdriver = lazy_module("selenium.webdriver")
+selenium_options = lazy_module("selenium.webdriver.chrome.options")
+selenium_by = lazy_module("selenium.webdriver.common.by")
+selenium_ui = lazy_module("selenium.webdriver.support.ui")
+EC = lazy_module("selenium.webdriver.support.expected_conditions")
 
 
 # =====================================================================================
@@ -49,7 +51,7 @@ class AutoState:
 class AutoTrader:
     def __init__(self):
         self.state = AutoState()
-        self._driver: Optional[webdriver.Remote] = None
+        self._driver: Optional["webdriver.Remote"] = None
 
     # ------------------------------------------------------------------
     # Public API
@@ -151,7 +153,7 @@ class AutoTrader:
             # אנו מתחברים לשרת chromedriver מרוחק,
             # לכן אנו מסירים את האופציה .debugger_address
             # chromedriver ינהל את הדפדפן בעצמו.
-            chrome_opts = Options()
+            chrome_opts = selenium_options.Options()
             
             # (אופציונלי: אם אתה רוצה שהכרום ייפתח ב-headless במחשב המקומי)
             # chrome_opts.add_argument("--headless") 
@@ -204,7 +206,7 @@ class AutoTrader:
                 return False
 
             # המתנה חכמה (Explicit Wait)
-            wait = WebDriverWait(self._driver, 10) # הגדלת זמן המתנה
+            wait = selenium_ui.WebDriverWait(self._driver, 10) # הגדלת זמן המתנה
             
             # שלב קריטי: לוודא שאנחנו בדף המסחר הנכון
             # אם ה-URL הוא 'login', אל תנסה ללחוץ
@@ -213,7 +215,7 @@ class AutoTrader:
                  return False
 
             el = wait.until(
-                EC.element_to_be_clickable((By.XPATH, xpath))
+                EC.element_to_be_clickable((selenium_by.By.XPATH, xpath))
             )
 
             # לחיצה
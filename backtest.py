@@ -0,0 +1,197 @@
+# backtest.py
+from __future__ import annotations
+import argparse, collections, json, time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+import strategy
+from strategy import CFG, quality_label
+from quantiles import SymbolSketches
+from stream_state import SymbolStream
+from tick_history import TICK_HISTORY_DIR, list_symbols, load_symbol
+from vector_signal import FeatureCache, TickSeries, SIDE_UP, SIDE_DOWN, SIDE_WAIT, SKETCH_SEED
+
+###############################################################################
+# Backtester
+# ----------
+# משחזר היסטוריית טיקים דרך לוגיקת הסיגנל, מתייג כל UP/DOWN לפי המחיר
+# ב-trade_expiry_sec (כניסה = מחיר הטיק של ההחלטה), ומדווח אחוז פגיעה לפי
+# איכות (Strong/Medium/Weak) ולפי דלי Confidence.
+#
+# שני מצבים:
+#   fast  — vector_signal (ברירת מחדל): שבועות של טיקים לכל הנכסים בדקות.
+#           כולל גלאי הרג'ים המתגלגל (stream_regimes) כש-REGIME_STREAM דלוק.
+#   exact — strategy.decide_from_ticks עצמו, עם שעון מדומה (strategy.set_clock)
+#           ו-SymbolStream כמו בלייב (כולל גלאי הרג'ים) — איטי, לאימות מול הלייב.
+#           שני המצבים נותנים אותו side / conf לכל נקודת החלטה.
+# בשניהם ספי vol/slope מגיעים מ-SymbolSketches שנבנה מהטיקים המשוחזרים
+# (QUANTILE_THRESHOLDS=1, כמו בלייב) — עד QUANTILE_MIN_COUNT החלטות, הקבועים.
+#
+#   python backtest.py --history ticks/ --expiry 60 --min-conf 70
+###############################################################################
+
+CONF_BUCKETS = [(55, 60), (60, 65), (65, 70), (70, 75), (75, 80), (80, 85), (85, 101)]
+QUALITIES = ["🟩 Strong", "🟨 Medium", "🟥 Weak"]
+
+
+def _bucket_label(lo: int, hi: int) -> str:
+    return f"{lo}+" if hi > 100 else f"{lo}-{hi-1}"
+
+
+def replay_exact(ts: List[float], prices: List[float], eval_idx: np.ndarray,
+                 cfg: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    מריץ את decide_from_ticks כמו בלייב — טיק אחרי טיק, "עכשיו" = זמן הטיק.
+    ה-deque נשמר קצר (החלון + 12 טיקים) כדי שכל צעד יעלה O(חלון).
+    ספי האחוזונים: resolve לפני כל החלטה ו-update אחריה, כמו main._compute_decision.
+    """
+    saved_cfg = dict(CFG)
+    CFG.update(cfg)
+    strategy.reset_state()
+    clock = [0.0]
+    strategy.set_clock(lambda: clock[0])
+    try:
+        want = set(int(i) for i in eval_idx)
+        m = len(eval_idx)
+        pos = {int(i): k for k, i in enumerate(eval_idx)}
+        side = np.zeros(m, dtype=np.int8)
+        conf = np.full(m, 50, dtype=np.int16)
+        bonus = np.zeros(m, dtype=np.float64)
+        dq: collections.deque = collections.deque()
+        W = float(CFG["WINDOW_SEC"])
+        stream = SymbolStream("replay", W) if CFG["REGIME_STREAM"] else None
+        sketches = SymbolSketches("replay", SKETCH_SEED)
+        for i, (t, p) in enumerate(zip(ts, prices)):
+            dq.append((t, p))
+            if stream is not None:
+                stream.on_tick(t, p)
+            while len(dq) > 12 and t - dq[0][0] > W:
+                dq.popleft()
+            if i not in want:
+                continue
+            clock[0] = t
+            s, c, dbg = strategy.decide_from_ticks(dq, stream, None, sketches.resolve(dict(CFG)))
+            sketches.update(vol=dbg.get("vol"), slope=dbg.get("trend_slope"),
+                            spread=dbg.get("ema_spread"))
+            k = pos[i]
+            side[k] = SIDE_UP if s == "UP" else SIDE_DOWN if s == "DOWN" else SIDE_WAIT
+            conf[k] = c
+            bonus[k] = float(dbg.get("align_bonus", 0.0))
+        return {"side": side, "conf": conf, "align_bonus": bonus}
+    finally:
+        strategy.set_clock(None)
+        strategy.reset_state()
+        CFG.clear()
+        CFG.update(saved_cfg)
+
+
+def summarize(side: np.ndarray, conf: np.ndarray, bonus: np.ndarray,
+              win: np.ndarray, labeled: np.ndarray, min_conf: int) -> Dict[str, Any]:
+    traded = labeled & (conf >= min_conf)
+    def rate(mask) -> Dict[str, Any]:
+        n = int(mask.sum())
+        h = int((win & mask).sum())
+        return {"trades": n, "hits": h, "hit_rate": (h / n) if n else 0.0}
+
+    qual = np.array([quality_label(int(c), float(b)) for c, b in zip(conf, bonus)]) \
+        if len(conf) else np.array([], dtype=object)
+    by_quality = {q: rate(traded & (qual == q)) for q in QUALITIES}
+    by_conf = {
+        _bucket_label(lo, hi): rate(labeled & (conf >= lo) & (conf < hi))
+        for lo, hi in CONF_BUCKETS
+    }
+    return {
+        "decisions": int(len(side)),
+        "signals": int((side != SIDE_WAIT).sum()),
+        "all": rate(traded),
+        "by_quality": by_quality,
+        "by_conf": by_conf,
+    }
+
+
+def backtest_symbol(args) -> Tuple[str, Dict[str, Any]]:
+    root, sym, cfg, expiry_sec, min_conf, eval_step, mode = args
+    t0 = time.time()
+    ts, ps = load_symbol(root, sym)
+    fc = FeatureCache(TickSeries(ts, ps), eval_step)
+    c = dict(CFG)
+    c.update(cfg)
+    if mode == "exact" or c.get("ENSEMBLE_MODE", "off") != "off":
+        # המסלול המוקטר מממש רק את ה-blend — ensemble רץ דרך האסטרטגיה עצמה
+        out = replay_exact(ts, ps, fc.eval_idx, c)
+    else:
+        out = fc.evaluate(c)
+    win, labeled = fc.outcomes(out["side"], expiry_sec)
+    rep = summarize(out["side"], out["conf"], out["align_bonus"], win, labeled, min_conf)
+    rep["ticks"] = len(ts)
+    rep["span_h"] = ((ts[-1] - ts[0]) / 3600.0) if ts else 0.0
+    rep["elapsed_s"] = time.time() - t0
+    return sym, rep
+
+
+def run_backtest(root: str, cfg_by_symbol: Dict[str, Dict[str, Any]], expiry_sec: float,
+                 min_conf: int, eval_step: float = 0.0, mode: str = "fast",
+                 workers: int | None = None) -> Dict[str, Dict[str, Any]]:
+    """סימבול לכל תהליך; cfg_by_symbol = דריסות CFG לכל סימבול (למשל preset)."""
+    jobs = [(root, s, c, expiry_sec, min_conf, eval_step, mode) for s, c in cfg_by_symbol.items()]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        return dict(ex.map(backtest_symbol, jobs))
+
+
+def _fmt_rate(r: Dict[str, Any]) -> str:
+    if not r["trades"]:
+        return "    n/a (0)"
+    return f"{100*r['hit_rate']:5.1f}% ({r['trades']})"
+
+def print_report(reports: Dict[str, Dict[str, Any]]):
+    for sym, rep in reports.items():
+        print(f"== {sym}: {rep['ticks']} ticks / {rep['span_h']:.1f}h, "
+              f"{rep['signals']} signals, {rep['elapsed_s']:.1f}s")
+        print(f"   all:    {_fmt_rate(rep['all'])}")
+        for q, r in rep["by_quality"].items():
+            print(f"   {q}: {_fmt_rate(r)}")
+        for b, r in rep["by_conf"].items():
+            print(f"   conf {b:>6}: {_fmt_rate(r)}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Backtest the signal on recorded ticks")
+    ap.add_argument("--history", default=TICK_HISTORY_DIR or "ticks")
+    ap.add_argument("--symbols", default="")
+    ap.add_argument("--expiry", type=float, default=60.0, help="trade_expiry_sec")
+    ap.add_argument("--min-conf", type=int, default=70)
+    ap.add_argument("--window", type=float, default=float(CFG["WINDOW_SEC"]))
+    ap.add_argument("--eval-step", type=float, default=0.0, help="seconds between decisions (0 = every tick)")
+    ap.add_argument("--mode", choices=["fast", "exact"], default="fast")
+    ap.add_argument("--presets", default="", help="apply per-symbol presets from this file")
+    ap.add_argument("--ensemble", default="", help="off/weighted/majority/unanimous (forces exact replay)")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--json", default="", help="write the full report here")
+    args = ap.parse_args()
+
+    symbols = [s.strip() for s in args.symbols.split(",") if s.strip()] or list_symbols(args.history)
+    if not symbols:
+        raise SystemExit(f"no recorded ticks under {args.history}")
+    if args.presets:
+        strategy.load_presets(args.presets)
+
+    t0 = time.time()
+    cfg_by_symbol = {}
+    for s in symbols:
+        c = {"WINDOW_SEC": args.window}
+        if args.ensemble:
+            c["ENSEMBLE_MODE"] = args.ensemble
+        c.update(strategy.PRESETS.get(s, {}))
+        cfg_by_symbol[s] = c
+    reports = run_backtest(args.history, cfg_by_symbol, args.expiry, args.min_conf,
+                           args.eval_step, args.mode, args.workers)
+
+    print_report(reports)
+    print(f"total {time.time()-t0:.1f}s ({args.mode})")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# candles.py
+from __future__ import annotations
+import collections, os, threading
+from typing import Deque, Dict, Iterable, List, Tuple
+
+###############################################################################
+# נרות OHLC פר סימבול / TF (מצטברים מראש)
+# ---------------------------------------
+# במצב CANDLE הגרף צריך להיראות כמו ב-Pocket Option: נרות ב-candle_tf_sec.
+# CandleSeries מחזיק deque של ברים [t0, open, high, low, close, n] ומתעדכן
+# מכל טיק (listener של ה-fetcher) — הרינדור רק קורא את הברים, בלי לעבור על טיקים.
+# סדרה ל-TF חדש נזרעת פעם אחת מה-buffer הקיים של הסימבול (ticks_for).
+###############################################################################
+
+CANDLE_MAX_BARS = int(os.getenv("CANDLE_MAX_BARS", "600"))
+
+Bar = List[float]   # [t0, open, high, low, close, n]
+
+
+class CandleSeries:
+    def __init__(self, tf_sec: int, maxlen: int = CANDLE_MAX_BARS):
+        self.tf = int(tf_sec)
+        self.bars: Deque[Bar] = collections.deque(maxlen=maxlen)
+
+    def add(self, ts: float, price: float):
+        t0 = (int(ts) // self.tf) * self.tf
+        if self.bars and self.bars[-1][0] == t0:
+            b = self.bars[-1]
+            if price > b[2]:
+                b[2] = price
+            if price < b[3]:
+                b[3] = price
+            b[4] = price
+            b[5] += 1
+        elif not self.bars or t0 > self.bars[-1][0]:
+            self.bars.append([t0, price, price, price, price, 1])
+        # טיק ישן מבר שכבר נסגר — מתעלמים
+
+
+class CandleRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series: Dict[str, Dict[int, CandleSeries]] = collections.defaultdict(dict)
+
+    def on_tick(self, symbol: str, ts: float, price: float):
+        with self.lock:
+            for s in self.series.get(symbol, {}).values():
+                s.add(ts, price)
+
+    def bars(self, symbol: str, tf_sec: int, ticks: Iterable[Tuple[float, float]] = (),
+             n: int | None = None) -> List[Tuple[float, float, float, float, float]]:
+        """
+        (t0, o, h, l, c) של n הברים האחרונים. סדרה חדשה ל-TF נזרעת מ-ticks
+        (ה-buffer של הסימבול) ומכאן והלאה מתעדכנת מ-on_tick.
+        """
+        tf = int(tf_sec)
+        with self.lock:
+            s = self.series[symbol].get(tf)
+            if s is None:
+                s = self.series[symbol][tf] = CandleSeries(tf)
+                for ts, p in list(ticks):
+                    s.add(ts, p)
+            items = list(s.bars)[-n:] if n else list(s.bars)
+        return [(b[0], b[1], b[2], b[3], b[4]) for b in items]
+
+
+# אינסטנס גלובלי (כמו STREAMS / FEATURES)
+CANDLES = CandleRegistry()
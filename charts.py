@@ -0,0 +1,731 @@
+# charts.py
+from __future__ import annotations
+import collections, hashlib, io, multiprocessing, os, threading, time
+from dataclasses import dataclass, field
+from concurrent.futures import BrokenExecutor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from lazy_import import lazy_module
+
+from downsample import DOWNSAMPLE_PX_FACTOR, downsample
+from metrics import LatencyTracker
+
+# matplotlib / PIL נטענים ב-figure הראשון (lazy_import.py), לא ב-import של main
+mpl_figure = lazy_module("matplotlib.figure", on_load=lambda _: __import__("matplotlib").use("Agg"))
+mpl_agg = lazy_module("matplotlib.backends.backend_agg")
+mpl_collections = lazy_module("matplotlib.collections")
+mpl_ticker = lazy_module("matplotlib.ticker")
+pil_image = lazy_module("PIL.Image")
+
+###############################################################################
+# רינדור גרפים עם figures ממוחזרים + cache של PNG
+# ----------------------------------------------
+# במקום plt.figure + tight_layout + close בכל לחיצה (מאות ms בתוך ה-handler):
+#
+# - PooledChart: figure/axes שנבנים פעם אחת עם כל ה-artists. רינדור =
+#   set_data + גבולות צירים בלבד; tight_layout רק כשמשהו שמשפיע על הפריסה
+#   משתנה (מספר ספרות, מקרא). figure לא thread-safe -> lock לכל chart.
+#   קווים ארוכים מדוללים (downsample.py, MinMax+LTTB) לכ-2x רוחב ה-axes
+#   בפיקסלים — זמן הרינדור לא גדל עם צפיפות הטיקים.
+# - MarketChart: שירות גרף אחד (במקום קו / נרות נפרדים; דרך main.chart_job). figure
+#   עם axes מחיר + axes RSI קבועים, והשכבות מ-ChartData בסבב אחד:
+#   מחיר או נרות (collection אחד לפתילים ואחד לגופים), EMA מהיר/איטי ו-RSI
+#   כפי שה-feature store פרסם אותם, הצללת רג'ים, סמני סיגנלים.
+#   זמן כל שכבה נמדד (CHARTS.layer_time, גם מה-workers).
+# - PngCache: LRU של bytes לפי (symbol, tick_seq, window, mode) — לחיצות
+#   חוזרות בלי טיק חדש מקבלות את אותה תמונה.
+# - submit / cached_async: רינדור ב-process pool קטן (RENDER_PROCESSES) שמחזיר
+#   bytes — matplotlib מחזיק את ה-GIL, וכך הוא לא מאט את ה-ingest וה-auto_loop.
+#   ה-workers (forkserver עם charts טעון מראש) מחזיקים figures ממוחזרים משלהם.
+#   RENDER_PROCESSES=0 -> thread אחד בתהליך הראשי. ברירת מחדל: עד 3 workers
+#   (cpu_count-1) — כמה גרפים של אותה בקשה (חבילת רב-TF) מתרנדרים במקביל.
+# - ChartOutput: פורמט הפלט (CHART_FORMAT): png רגיל, png8 (פלטה, עד 256 צבעים
+#   לפי CHART_QUALITY), jpeg או webp (CHART_QUALITY). dpi לפי session_mode —
+#   PHONE מקבל תמונה קטנה יותר (CHART_DPI_PHONE). חלק מה-cache key.
+# - SparklineGrid ("dashboard:<rows>"): רשת ספארקליינים לכמה נכסים ב-figure
+#   אחד, מ-buffers מדוללים (sparkline); cache key = וקטור ה-tick_seq שלהם.
+# - FileIdCache: hash של ה-bytes -> file_id של טלגרם — אותה תמונה בדיוק
+#   נשלחת שוב בלי upload. גודל ה-bytes וזמן ה-upload נמדדים לסטטוס.
+###############################################################################
+
+CHART_DPI = 140
+CANDLE_UP_COLOR, CANDLE_DOWN_COLOR = "#26a69a", "#ef5350"
+CHART_CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", "32"))
+RENDER_PROCESSES = int(os.getenv("RENDER_PROCESSES", str(max(1, min(3, (os.cpu_count() or 2) - 1)))))
+CHART_FORMAT = os.getenv("CHART_FORMAT", "png8").lower()     # png / png8 / jpeg / webp
+CHART_QUALITY = int(os.getenv("CHART_QUALITY", "80"))         # 1..100
+CHART_DPI_PHONE = int(os.getenv("CHART_DPI_PHONE", "100"))
+CHART_DPI_PC = int(os.getenv("CHART_DPI_PC", str(CHART_DPI)))
+FILE_ID_CACHE_SIZE = int(os.getenv("FILE_ID_CACHE_SIZE", "256"))
+
+DASH_COLS = 3
+SPARK_POINTS = 120        # נקודות לספארקליין (תא קטן — יותר לא נראה)
+SIDE_COLORS = {"UP": CANDLE_UP_COLOR, "DOWN": CANDLE_DOWN_COLOR}
+CHART_LAYERS = ("price", "ema", "rsi", "regime", "signals", "frame")
+REGIME_COLORS = {"TREND": "tab:green", "RANGE": "tab:gray", "SHOCK": "tab:red"}
+
+Tick = Tuple[float, float]
+
+
+def window_ticks(ticks, window_sec: float, now: float | None = None, min_n: int = 6) -> List[Tick]:
+    """הטיקים של החלון האחרון (או min_n האחרונים אם אין מספיק)."""
+    now = now or time.time()
+    items = list(ticks)
+    win = [(ts, p) for (ts, p) in items if now - ts <= window_sec]
+    if len(win) < min_n:
+        win = items[-min_n:]
+    return win
+
+
+@dataclass(frozen=True)
+class ChartOutput:
+    fmt: str = CHART_FORMAT
+    quality: int = CHART_QUALITY
+    dpi: int = CHART_DPI
+
+    def label(self) -> str:
+        q = f"@q{self.quality}" if self.fmt != "png" else ""
+        return f"{self.fmt}{q} {self.dpi}dpi"
+
+
+def output_for(session_mode: str) -> ChartOutput:
+    """PHONE -> רזולוציה נמוכה יותר (פחות bytes על סלולר); PC -> CHART_DPI_PC."""
+    return ChartOutput(dpi=CHART_DPI_PC if session_mode == "PC" else CHART_DPI_PHONE)
+
+
+def encode_figure(fig, out: ChartOutput) -> bytes:
+    buf = io.BytesIO()
+    if out.fmt not in ("png8", "jpeg", "webp"):
+        fig.savefig(buf, format="png", dpi=out.dpi)
+        return buf.getvalue()
+    fig.set_dpi(out.dpi)
+    canvas = fig.canvas
+    canvas.draw()
+    img = pil_image.frombuffer("RGBA", canvas.get_width_height(), canvas.buffer_rgba(), "raw", "RGBA", 0, 1)
+    img = img.convert("RGB")
+    q = max(1, min(100, out.quality))
+    if out.fmt == "png8":
+        colors = max(16, min(256, q * 256 // 100))
+        img.quantize(colors=colors, method=pil_image.Quantize.FASTOCTREE).save(buf, format="PNG", optimize=True)
+    elif out.fmt == "jpeg":
+        img.save(buf, format="JPEG", quality=q, optimize=True)
+    else:
+        img.save(buf, format="WEBP", quality=q, method=4)
+    return buf.getvalue()
+
+
+class PngCache:
+    def __init__(self, maxsize: int = CHART_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self._data: "collections.OrderedDict[Hashable, bytes]" = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self.lock:
+            png = self._data.get(key)
+            if png is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return png
+
+    def put(self, key: Hashable, png: bytes):
+        with self.lock:
+            self._data[key] = png
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def status_line(self) -> str:
+        total = self.hits + self.misses
+        rate = (100.0 * self.hits / total) if total else 0.0
+        return f"Chart cache: {self.hits} hits / {self.misses} misses ({rate:.1f}%) | {len(self._data)} PNGs"
+
+
+@dataclass
+class ChartData:
+    """
+    כל השכבות של גרף אחד (picklable — נשלח כמו שהוא ל-worker).
+    ticks = קו מחיר (LINE); bars + tf_sec = נרות (CANDLE) — אחד מהם.
+    ema_fast / ema_slow / rsi: סדרות מה-feature store (לא מחושבות כאן),
+    ind_ts = ה-ts של כל נקודה בהן; ריק -> מיושרות לסוף ticks.
+    signals: [(ts, side)] — סיגנלים שנשלחו בחלון.
+    """
+    ticks: List[Tick] = field(default_factory=list)
+    bars: List[Tuple[float, float, float, float, float]] = field(default_factory=list)
+    tf_sec: float = 0.0
+    decimals: Optional[int] = None
+    ind_ts: List[float] = field(default_factory=list)
+    ema_fast: List[float] = field(default_factory=list)
+    ema_slow: List[float] = field(default_factory=list)
+    rsi: List[float] = field(default_factory=list)
+    rsi_levels: Tuple[float, float] = (30.0, 70.0)
+    regimes: List[Tuple[float, float, str]] = field(default_factory=list)
+    signals: List[Tuple[float, str]] = field(default_factory=list)
+
+
+class FileIdCache:
+    """hash(bytes) -> file_id של טלגרם (LRU). אותה תמונה = אותו file_id, בלי upload."""
+
+    def __init__(self, maxsize: int = FILE_ID_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self._data: "collections.OrderedDict[bytes, str]" = collections.OrderedDict()
+        self.reused = 0
+
+    @staticmethod
+    def _key(data: bytes) -> bytes:
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def get(self, data: bytes) -> Optional[str]:
+        with self.lock:
+            k = self._key(data)
+            fid = self._data.get(k)
+            if fid is not None:
+                self._data.move_to_end(k)
+                self.reused += 1
+            return fid
+
+    def put(self, data: bytes, file_id: str):
+        with self.lock:
+            k = self._key(data)
+            self._data[k] = file_id
+            self._data.move_to_end(k)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def drop(self, data: bytes):
+        with self.lock:
+            self._data.pop(self._key(data), None)
+
+
+class PooledChart:
+    """figure אחד שנבנה פעם אחת; subclass מממש build() ו-render()."""
+    figsize = (6.6, 3.2)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.fig = mpl_figure.Figure(figsize=self.figsize)
+        mpl_agg.FigureCanvasAgg(self.fig)
+        self.out = ChartOutput()
+        self.make_axes()
+        self._layout_key = None
+        self.build()
+
+    def make_axes(self):
+        self.ax = self.fig.add_subplot(111)
+
+    def build(self):
+        raise NotImplementedError
+
+    def max_points(self) -> int:
+        """תקרת נקודות לקו: DOWNSAMPLE_PX_FACTOR * רוחב ה-axes בפיקסלים של ה-PNG."""
+        px = self.ax.get_position().width * self.fig.get_figwidth() * self.out.dpi
+        return int(DOWNSAMPLE_PX_FACTOR * px)
+
+    def _png(self, layout_key) -> bytes:
+        """התמונה בפורמט של self.out (השם נשאר מהימים שזה היה רק PNG)."""
+        if layout_key != self._layout_key:
+            self.fig.tight_layout()
+            self._layout_key = layout_key
+        return encode_figure(self.fig, self.out)
+
+
+class MarketChart(PooledChart):
+    """
+    figure אחד עם שני axes קבועים (מחיר 3 : RSI 1, ציר X משותף). כל שכבה
+    היא artists שנבנו ב-build ומתעדכנים ב-set_data; שכבה בלי נתונים מוסתרת.
+    layer_secs: זמן כל שכבה ברינדור האחרון — עדכון הנתונים + ה-draw של ה-artists
+    שלה בתוך savefig; "frame" = שאר ה-savefig (צירים, טקסט, קידוד PNG).
+    נאסף ל-CHARTS.layer_time.
+    """
+
+    def __init__(self, figsize=(6.6, 4.2), title="Last ~window price view",
+                 xlabel="time [sec]", legend=True, last_line=True, grid_alpha=0.35):
+        self.figsize = figsize
+        self.title, self.xlabel = title, xlabel
+        self.legend, self.last_line, self.grid_alpha = legend, last_line, grid_alpha
+        self.layer_secs: Dict[str, float] = {}
+        super().__init__()
+
+    def make_axes(self):
+        self.ax, self.ax_rsi = self.fig.subplots(2, 1, sharex=True, gridspec_kw={"height_ratios": (3, 1)})
+
+    def build(self):
+        ax, ar = self.ax, self.ax_rsi
+        (self.price,) = ax.plot([], [], linewidth=2.0, label="Price")
+        self.wicks = mpl_collections.LineCollection([], linewidths=1.0, zorder=2)
+        self.bodies = mpl_collections.PolyCollection([], linewidths=0.6, zorder=3)
+        ax.add_collection(self.wicks)
+        ax.add_collection(self.bodies)
+        (self.ema_fast,) = ax.plot([], [], linestyle="--", linewidth=1.3, label="EMA fast", zorder=4)
+        (self.ema_slow,) = ax.plot([], [], linestyle=":", linewidth=1.3, label="EMA slow", zorder=4)
+        self.last = ax.axhline(0.0, linestyle="--", linewidth=1.2, label="Last Price",
+                               color="tab:red", visible=False, zorder=4)
+        (self.sig_up,) = ax.plot([], [], linestyle="none", marker="^", markersize=9,
+                                 color=CANDLE_UP_COLOR, markeredgecolor="black", label="Signal UP", zorder=5)
+        (self.sig_down,) = ax.plot([], [], linestyle="none", marker="v", markersize=9,
+                                   color=CANDLE_DOWN_COLOR, markeredgecolor="black", label="Signal DOWN", zorder=5)
+        (self.rsi,) = ar.plot([], [], linewidth=1.2, color="tab:purple")
+        self.rsi_lo = ar.axhline(30.0, linestyle="--", linewidth=0.8, color="tab:gray")
+        self.rsi_hi = ar.axhline(70.0, linestyle="--", linewidth=0.8, color="tab:gray")
+        self.spans = []
+        for layer, artists in (("price", (self.price, self.wicks, self.bodies, self.last)),
+                               ("ema", (self.ema_fast, self.ema_slow)),
+                               ("rsi", (self.rsi, self.rsi_lo, self.rsi_hi)),
+                               ("signals", (self.sig_up, self.sig_down))):
+            for a in artists:
+                self._timed(a, layer)
+        ax.set_ylabel("price")
+        ax.grid(True, linestyle="--", alpha=self.grid_alpha)
+        ar.set_ylim(0, 100)
+        ar.set_yticks((30, 70))
+        ar.set_ylabel("RSI")
+        ar.set_xlabel(self.xlabel)
+        ar.grid(True, linestyle="--", alpha=self.grid_alpha)
+        self._title = ax.set_title(self.title)
+        self._decimals = None
+        self._legend_sig = None
+
+    def _timed(self, artist, layer: str):
+        """עוטף את artist.draw כך שזמן הציור שלו נזקף לשכבה ב-layer_secs."""
+        draw = artist.draw
+
+        def timed_draw(renderer, *a, **kw):
+            t = time.perf_counter()
+            draw(renderer, *a, **kw)
+            self.layer_secs[layer] = self.layer_secs.get(layer, 0.0) + time.perf_counter() - t
+        artist.draw = timed_draw
+        return artist
+
+    # ---------- שכבות ----------
+
+    def _layer_price(self, d: ChartData, x0: float, n_max: int):
+        if d.bars:
+            self.price.set_data([], [])
+            self.price.set_visible(False)
+            half = 0.35 * d.tf_sec
+            wicks, bodies, colors = [], [], []
+            for t, o, h, l, c in d.bars:
+                x = t - x0 + 0.5 * d.tf_sec
+                wicks.append(((x, l), (x, h)))
+                b0, b1 = (o, c) if c >= o else (c, o)
+                if b1 == b0:   # דוג'י — גוף דק שעדיין נראה
+                    b1 = b0 + (h - l) * 0.02 if h > l else b0
+                bodies.append(((x - half, b0), (x - half, b1), (x + half, b1), (x + half, b0)))
+                colors.append(CANDLE_UP_COLOR if c >= o else CANDLE_DOWN_COLOR)
+            self.wicks.set_segments(wicks)
+            self.wicks.set_colors(colors)
+            self.bodies.set_verts(bodies)
+            self.bodies.set_facecolors(colors)
+            self.bodies.set_edgecolors(colors)
+            last = d.bars[-1][4]
+        else:
+            self.wicks.set_segments([])
+            self.bodies.set_verts([])
+            self.price.set_data(*downsample([ts - x0 for ts, _ in d.ticks], [p for _, p in d.ticks], n_max))
+            self.price.set_visible(True)
+            last = d.ticks[-1][1]
+        if self.last_line:
+            self.last.set_ydata([last, last])
+            self.last.set_visible(True)
+
+    def _ind_x(self, d: ChartData, m: int, x0: float) -> List[float]:
+        if d.ind_ts:
+            return [t - x0 for t in d.ind_ts[-m:]]
+        return [ts - x0 for ts, _ in d.ticks[-m:]]
+
+    def _layer_ema(self, d: ChartData, x0: float, n_max: int):
+        for ln, line in ((self.ema_fast, d.ema_fast), (self.ema_slow, d.ema_slow)):
+            m = min(len(line), len(d.ind_ts) or len(d.ticks))
+            if m >= 2:
+                ln.set_data(*downsample(self._ind_x(d, m, x0), line[-m:], n_max))
+                ln.set_visible(True)
+            else:
+                ln.set_data([], [])
+                ln.set_visible(False)
+
+    def _layer_rsi(self, d: ChartData, x0: float, n_max: int):
+        m = min(len(d.rsi), len(d.ind_ts) or len(d.ticks))
+        if m >= 2:
+            self.rsi.set_data(*downsample(self._ind_x(d, m, x0), d.rsi[-m:], n_max))
+        else:
+            self.rsi.set_data([], [])
+        lo, hi = d.rsi_levels
+        self.rsi_lo.set_ydata([lo, lo])
+        self.rsi_hi.set_ydata([hi, hi])
+
+    def _layer_regime(self, d: ChartData, x0: float):
+        for s in self.spans:
+            s.remove()
+        self.spans = [
+            self._timed(ax.axvspan(a - x0, b - x0, color=REGIME_COLORS.get(r, "tab:gray"), alpha=0.10,
+                                   linewidth=0, zorder=1), "regime")
+            for a, b, r in d.regimes for ax in (self.ax, self.ax_rsi)
+        ]
+
+    def _layer_signals(self, d: ChartData, x0: float):
+        if d.bars:
+            px = [t + 0.5 * d.tf_sec for t, *_ in d.bars]
+            py = [b[4] for b in d.bars]
+            t_lo, t_hi = d.bars[0][0], d.bars[-1][0] + d.tf_sec
+        else:
+            px = [ts for ts, _ in d.ticks]
+            py = [p for _, p in d.ticks]
+            t_lo, t_hi = px[0], px[-1]
+        for ln, side in ((self.sig_up, "UP"), (self.sig_down, "DOWN")):
+            ts = [t for t, s in d.signals if s == side and t_lo <= t <= t_hi]
+            ln.set_data([t - x0 for t in ts], list(np.interp(ts, px, py)) if ts else [])
+            ln.set_visible(bool(ts))
+
+    def render(self, d: ChartData, out: Optional[ChartOutput] = None) -> bytes:
+        with self.lock:
+            ax = self.ax
+            self.out = out or ChartOutput()
+            secs = self.layer_secs = {}
+            if not d.ticks and not d.bars:
+                for ln in (self.price, self.ema_fast, self.ema_slow, self.rsi, self.sig_up, self.sig_down):
+                    ln.set_data([], [])
+                self.wicks.set_segments([])
+                self.bodies.set_verts([])
+                self.last.set_visible(False)
+                self._layer_regime(ChartData(), 0.0)
+                self._title.set_text("No data yet")
+                if ax.get_legend():
+                    ax.get_legend().remove()
+                self._legend_sig = None
+                return self._png(("empty",))
+
+            x0 = d.bars[0][0] if d.bars else d.ticks[0][0]
+            n_max = self.max_points()
+            t = time.perf_counter()
+            for name, layer in (("price", lambda: self._layer_price(d, x0, n_max)),
+                                ("ema", lambda: self._layer_ema(d, x0, n_max)),
+                                ("rsi", lambda: self._layer_rsi(d, x0, n_max)),
+                                ("regime", lambda: self._layer_regime(d, x0)),
+                                ("signals", lambda: self._layer_signals(d, x0))):
+                layer()
+                now = time.perf_counter()
+                secs[name] = now - t
+                t = now
+
+            if d.bars:
+                lo = min(b[3] for b in d.bars)
+                hi = max(b[2] for b in d.bars)
+                pad = (hi - lo) * 0.05 or abs(hi) * 1e-5 or 1e-9
+                ax.set_xlim(0.0, d.bars[-1][0] - x0 + d.tf_sec)
+                ax.set_ylim(lo - pad, hi + pad)
+                self._title.set_text(f"{len(d.bars)} candles x {int(d.tf_sec)}s")
+            else:
+                ax.relim(visible_only=True)
+                ax.autoscale_view()
+                self._title.set_text(self.title)
+            if d.decimals is not None and d.decimals != self._decimals:
+                ax.yaxis.set_major_formatter(mpl_ticker.FormatStrFormatter(f"%.{d.decimals}f"))
+                self._decimals = d.decimals
+            shown = [ln for ln in (self.price, self.ema_fast, self.ema_slow, self.last,
+                                   self.sig_up, self.sig_down) if ln.get_visible()]
+            sig = tuple(ln.get_label() for ln in shown)
+            if self.legend and sig != self._legend_sig:
+                ax.legend(handles=shown, loc="best", frameon=True, fontsize="small")
+                self._legend_sig = sig
+            drawn = sum(secs.values())
+            png = self._png((self._decimals, self._legend_sig))
+            secs["frame"] = time.perf_counter() - t - (sum(secs.values()) - drawn)
+            return png
+
+
+def sparkline(ticks, window_sec: float, n_out: int = SPARK_POINTS,
+              now: float | None = None) -> Tuple[List[float], List[float]]:
+    """
+    (x, y) מדוללים של window_sec האחרונים מה-buffer של הסימבול; x = שניות
+    יחסית לעכשיו (שליליות). הדילול כאן — ל-worker עוברות רק n_out נקודות.
+    """
+    now = now or time.time()
+    items = [(ts, p) for ts, p in list(ticks) if now - ts <= window_sec]
+    if len(items) < 2:
+        return [], []
+    xs, ys = downsample([ts - now for ts, _ in items], [p for _, p in items], n_out)
+    return xs.tolist(), ys.tolist()
+
+
+@dataclass
+class Sparkline:
+    label: str
+    xs: List[float]
+    ys: List[float]
+    side: str = "WAIT"
+    conf: int = 0
+    decimals: int = 5
+
+
+class SparklineGrid(PooledChart):
+    """
+    דשבורד: רשת של DASH_COLS x rows ספארקליינים קטנים ב-figure אחד. ה-axes
+    נבנים פעם אחת עם עיצוב משותף (ציר X = אותו חלון לכולם, בלי ticks);
+    רינדור = set_data + כותרת (שם, מחיר, סיגנל / confidence) לכל תא.
+    """
+
+    def __init__(self, rows: int = 1):
+        self.rows = max(1, rows)
+        self.figsize = (7.5, 1.25 * self.rows + 0.3)
+        super().__init__()
+
+    def make_axes(self):
+        self.axes = list(self.fig.subplots(self.rows, DASH_COLS, sharex=True, squeeze=False).flat)
+        self.ax = self.axes[0]
+
+    def build(self):
+        self.lines, self.dots, self.titles = [], [], []
+        for ax in self.axes:
+            (ln,) = ax.plot([], [], linewidth=1.2, color="tab:blue")
+            (dot,) = ax.plot([], [], marker="o", markersize=3, linestyle="none", color="tab:blue")
+            self.lines.append(ln)
+            self.dots.append(dot)
+            self.titles.append(ax.set_title("", fontsize=8, loc="left"))
+            ax.set_xticks([])
+            ax.set_yticks([])
+            ax.grid(True, axis="y", linestyle=":", alpha=0.3)
+            for sp in ax.spines.values():
+                sp.set_alpha(0.3)
+        self.fig.subplots_adjust(left=0.01, right=0.99, bottom=0.02, top=0.93, wspace=0.05, hspace=0.45)
+        self._layout_key = "fixed"     # פריסה קבועה — בלי tight_layout
+
+    def render(self, panels: Sequence[Sparkline], window_sec: float,
+               out: Optional[ChartOutput] = None) -> bytes:
+        with self.lock:
+            self.out = out or ChartOutput()
+            for i, ax in enumerate(self.axes):
+                p = panels[i] if i < len(panels) else None
+                ax.set_visible(p is not None)
+                if p is None:
+                    continue
+                ln, dot, title = self.lines[i], self.dots[i], self.titles[i]
+                color = SIDE_COLORS.get(p.side, "tab:gray")
+                ln.set_data(p.xs, p.ys)
+                ln.set_color(color)
+                dot.set_data(p.xs[-1:], p.ys[-1:])
+                dot.set_color(color)
+                if p.ys:
+                    lo, hi = min(p.ys), max(p.ys)
+                    pad = (hi - lo) * 0.08 or abs(hi) * 1e-5 or 1e-9
+                    ax.set_ylim(lo - pad, hi + pad)
+                    price = f"{p.ys[-1]:.{p.decimals}f}"
+                else:
+                    price = "no ticks"
+                arrow = {"UP": "▲", "DOWN": "▼"}.get(p.side, "•")
+                title.set_text(f"{p.label}  {price}  {arrow} {p.conf}%")
+                title.set_color(color)
+            self.axes[0].set_xlim(-window_sec, 0.0)
+            return self._png("fixed")
+
+
+def _render_job(kind: str, args: tuple) -> Tuple[bytes, float, Dict[str, float]]:
+    """רץ ב-worker: (png, זמן רינדור נטו, זמן לכל שכבה)."""
+    t0 = time.perf_counter()
+    chart = CHARTS.chart(kind)
+    png = chart.render(*args)
+    return png, time.perf_counter() - t0, dict(getattr(chart, "layer_secs", {}))
+
+
+def _warm() -> bool:
+    """רץ ב-worker: טוען matplotlib ובונה את ה-figure הראשי מראש."""
+    CHARTS.chart("market")
+    return True
+
+
+def _chain(src: Future, dst: Future):
+    if src.exception() is not None:
+        dst.set_exception(src.exception())
+    else:
+        dst.set_result(src.result())
+
+
+class ChartRenderer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.charts: Dict[str, PooledChart] = {}
+        self.factories: Dict[str, Callable[[], PooledChart]] = {
+            "market": MarketChart,
+            "dashboard": SparklineGrid,     # "dashboard:<rows>"
+        }
+        self.cache = PngCache()
+        self.render_time = LatencyTracker("Chart render")
+        self.ready_time = LatencyTracker("Chart ready")   # submit -> bytes (כולל תור + IPC)
+        self.layer_time = {name: LatencyTracker(name) for name in CHART_LAYERS}
+        self.file_ids = FileIdCache()
+        self.upload_time = LatencyTracker("Chart upload")
+        self._sizes: Deque[int] = collections.deque(maxlen=200)
+        self.last_output = output_for("PHONE")
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._pool_broken = False
+        self._inflight: Dict[Hashable, Future] = {}
+
+    def chart(self, kind: str) -> PooledChart:
+        with self.lock:
+            c = self.charts.get(kind)
+            if c is None:
+                name, _, arg = kind.partition(":")
+                factory = self.factories[name]
+                c = self.charts[kind] = factory(int(arg)) if arg else factory()
+            return c
+
+    def _record(self, sec: float, layers: Dict[str, float]):
+        self.render_time.record(sec)
+        for name, s in layers.items():
+            if name in self.layer_time:
+                self.layer_time[name].record(s)
+
+    def render(self, kind: str, *args, **kwargs) -> bytes:
+        t0 = time.perf_counter()
+        chart = self.chart(kind)
+        png = chart.render(*args, **kwargs)
+        self._record(time.perf_counter() - t0, getattr(chart, "layer_secs", {}))
+        return png
+
+    def cached(self, key: Hashable, render_fn: Callable[[], bytes]) -> bytes:
+        """key = (symbol, tick_seq, window, mode) — בלי טיק חדש אין רינדור חדש."""
+        png = self.cache.get(key)
+        if png is None:
+            png = render_fn()
+            self.cache.put(key, png)
+        return png
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                if RENDER_PROCESSES > 0 and not self._pool_broken:
+                    ctx = multiprocessing.get_context("forkserver")
+                    ctx.set_forkserver_preload(["charts", "matplotlib.figure",
+                                                "matplotlib.backends.backend_agg"])
+                    self._pool = ProcessPoolExecutor(max_workers=RENDER_PROCESSES, mp_context=ctx)
+                else:
+                    self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="render")
+            return self._pool
+
+    def _downgrade(self, err: Exception):
+        """ה-process pool לא עולה / נשבר -> thread אחד מכאן והלאה (בלי לנסות שוב בכל גרף)."""
+        with self._pool_lock:
+            if self._pool_broken:
+                return
+            self._pool_broken = True
+            pool, self._pool = self._pool, None
+        print("[CHART RENDER] process pool unavailable, using a render thread:", err)
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def start(self):
+        """
+        מרים את ה-workers ברקע (מ-main) כדי שהגרף הראשון לא ישלם על spawn +
+        טעינת matplotlib — בלי לחכות להם (לא מעכב את ה-polling).
+        """
+        def done(f: Future):
+            if f.exception() is not None:
+                self._downgrade(f.exception())
+
+        def warm():
+            # submit הראשון מחכה ל-forkserver (preload של matplotlib) — לא ב-main
+            try:
+                self._executor().submit(_warm).add_done_callback(done)
+            except Exception as e:
+                self._downgrade(e)
+        threading.Thread(target=warm, name="render-warmup", daemon=True).start()
+
+    def submit(self, kind: str, *args) -> Future:
+        """Future של bytes; הרינדור ב-pool. pool שבור -> רינדור ב-thread מקומי."""
+        out: Future = Future()
+        t0 = time.perf_counter()
+
+        def done(f: Future):
+            try:
+                png, sec, layers = f.result()
+                self._record(sec, layers)
+            except BrokenExecutor as e:
+                self._downgrade(e)
+                try:
+                    png = self.render(kind, *args)
+                except Exception as e2:
+                    out.set_exception(e2)
+                    return
+            except Exception as e:
+                out.set_exception(e)
+                return
+            self.ready_time.record(time.perf_counter() - t0)
+            out.set_result(png)
+
+        try:
+            self._executor().submit(_render_job, kind, args).add_done_callback(done)
+        except Exception as e:
+            self._downgrade(e)
+            self._executor().submit(_render_job, kind, args).add_done_callback(done)
+        return out
+
+    def cached_async(self, key: Hashable, kind: str, *args) -> Future:
+        """כמו cached, אבל מחזיר Future; רינדור זהה שכבר בדרך לא נשלח שוב."""
+        return self.cached_async_lazy(key, kind, lambda: args)
+
+    def cached_async_lazy(self, key: Hashable, kind: str, build: Callable[[], tuple]) -> Future:
+        """כמו cached_async, אבל הארגומנטים נבנים (build()) רק אם אין פגיעה ב-cache."""
+        png = self.cache.get(key)
+        if png is not None:
+            f: Future = Future()
+            f.set_result(png)
+            return f
+        with self.lock:
+            f = self._inflight.get(key)
+            if f is not None:
+                return f
+            f = self._inflight[key] = Future()
+
+        def store(done: Future):
+            with self.lock:
+                self._inflight.pop(key, None)
+            if done.exception() is None:
+                self.cache.put(key, done.result())
+
+        f.add_done_callback(store)
+        try:
+            args = build()
+        except Exception as e:
+            f.set_exception(e)
+            return f
+        self.submit(kind, *args).add_done_callback(lambda r: _chain(r, f))
+        return f
+
+    def record_size(self, data: bytes, out: ChartOutput):
+        self._sizes.append(len(data))
+        self.last_output = out
+
+    def output_line(self) -> str:
+        if not self._sizes:
+            return f"Chart output: {self.last_output.label()} | n/a"
+        avg = sum(self._sizes) / len(self._sizes)
+        return (
+            f"Chart output: {self.last_output.label()} | last {self._sizes[-1] / 1024:.1f}KB | "
+            f"avg {avg / 1024:.1f}KB | file_id reuse {self.file_ids.reused} | "
+            + self.upload_time.status_line()
+        )
+
+    def layers_line(self) -> str:
+        """avg / p95 לכל שכבה (ms) — איפה הולך זמן הרינדור."""
+        parts = []
+        for name, tr in self.layer_time.items():
+            s = tr.summary()
+            if s["n"]:
+                parts.append(f"{name} {s['avg']:.1f}/{s['p95']:.1f}")
+        return "Chart layers avg/p95 ms: " + (" | ".join(parts) or "n/a")
+
+    def status_line(self) -> str:
+        return (self.cache.status_line() + " | " + self.render_time.status_line()
+                + " | " + self.ready_time.status_line() + "\n" + self.layers_line()
+                + "\n" + self.output_line())
+
+
+# אינסטנס גלובלי (כמו STREAMS / FEATURES)
+CHARTS = ChartRenderer()
@@ -0,0 +1,189 @@
+# correlation.py
+from __future__ import annotations
+import collections, math, os, threading
+from typing import Deque, List, Optional, Tuple
+
+import numpy as np
+
+###############################################################################
+# מטריצת קורלציה + lead-lag בין נכסים (מתעדכנת אינקרמנטלית)
+# -------------------------------------------------------
+# EUR/USD, GBP/USD, EUR/GBP, EUR/JPY זזים יחד, BTC מוביל את שאר הקריפטו —
+# אבל כל נכס נבדק לבד. כאן:
+#
+# - ברים על רשת זמן משותפת (CORR_BAR_SEC): תשואת לוג של כל סימבול מסגירת
+#   הבר הקודם שלו. סימבול בלי טיק בבר = חסר (m=0) ולא נספר לזוגות שלו.
+#   ברים שעברו בלי אף טיק נסגרים כברים ריקים — החלון וה-lead-lag זזים לפי
+#   ברים אמיתיים ולא לפי ברים שהיו בהם טיקים.
+# - חלון מתגלגל של CORR_BARS ברים: סכומים זוגיים (n, Σx, Σx², Σxy) כמטריצות
+#   k×k — בר חדש מוסיף outer products ובר שיוצא מחסיר אותם, ואז שתי מטריצות
+#   ה-corr מחושבות מהסכומים: O(k²) לבר, לא תלוי באורך החלון
+#   (רענון מלא פעם בחלון נגד סחיפה נומרית).
+# - lead-lag: אותם סכומים על (תשואת i בבר t-1, תשואת j בבר t) — i מוביל את j.
+#
+# confirmation(symbol, side): ממוצע משוקלל ב-|corr| של כיוון העמיתים
+# (מומנטום CORR_CONFIRM_BARS ברים) + מובילים (הבר האחרון שלהם * lead corr),
+# בטווח [-1, 1]: חיובי = העמיתים מאשרים את הצד, שלילי = סותרים.
+###############################################################################
+
+CORR_BAR_SEC = float(os.getenv("CORR_BAR_SEC", "5"))
+CORR_BARS = int(os.getenv("CORR_BARS", "120"))
+CORR_MIN = 0.4            # |corr| מינימלי לעמית
+CORR_LEAD_MIN = 0.2       # |lead corr| מינימלי למוביל
+CORR_MIN_PAIRS = 30       # ברים משותפים מינימליים לזוג
+CORR_CONFIRM_BARS = 3
+
+
+def _corr(n, sx, sy, sxx, syy, sxy):
+    """קורלציה מסכומים (מטריצות), NaN כשאין מספיק נתונים / שונות."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = n * sxy - sx * sy
+        vx = n * sxx - sx * sx
+        vy = n * syy - sy * sy
+        c = cov / np.sqrt(vx * vy)
+    c[(n < CORR_MIN_PAIRS) | ~np.isfinite(c)] = np.nan
+    return np.clip(c, -1.0, 1.0)
+
+
+class CorrelationMatrix:
+    def __init__(self, symbols: List[str], bar_sec: float = CORR_BAR_SEC, bars: int = CORR_BARS):
+        self.symbols = list(symbols)
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        self.bar_sec = bar_sec
+        self.bars = bars
+        self.lock = threading.Lock()
+        k = len(self.symbols)
+        self._last = np.full(k, np.nan)      # מחיר אחרון בבר הנוכחי
+        self._close = np.full(k, np.nan)     # סגירת הבר הקודם (בסיס לתשואה)
+        self._bar: Optional[int] = None
+        self._prev: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        # (r, m, r_prev, m_prev) לכל בר בחלון — להחסרה כשהוא יוצא
+        self._hist: Deque[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = collections.deque()
+        self._reset_sums()
+        self.bars_closed = 0
+        self.corr = np.full((k, k), np.nan)
+        self.lead = np.full((k, k), np.nan)
+
+    def _reset_sums(self):
+        k = len(self.symbols)
+        z = lambda: np.zeros((k, k))
+        self.N, self.SX, self.SXX, self.SXY = z(), z(), z(), z()
+        self.LN, self.LSX, self.LSY, self.LSXX, self.LSYY, self.LSXY = z(), z(), z(), z(), z(), z()
+
+    def _accumulate(self, r, m, rp, mp, sign: float):
+        self.N += sign * np.outer(m, m)
+        self.SX += sign * np.outer(r, m)
+        self.SXX += sign * np.outer(r * r, m)
+        self.SXY += sign * np.outer(r, r)
+        self.LN += sign * np.outer(mp, m)
+        self.LSX += sign * np.outer(rp, m)
+        self.LSY += sign * np.outer(mp, r)
+        self.LSXX += sign * np.outer(rp * rp, m)
+        self.LSYY += sign * np.outer(mp, r * r)
+        self.LSXY += sign * np.outer(rp, r)
+
+    # ---------- טיקים -> ברים ----------
+
+    def on_tick(self, symbol: str, ts: float, price: float):
+        i = self.index.get(symbol)
+        if i is None or not price or price <= 0:
+            return
+        b = int(ts // self.bar_sec)
+        with self.lock:
+            if self._bar is None:
+                self._bar = b
+            elif b > self._bar:
+                self._close_bar()
+                gap = b - self._bar - 1
+                for _ in range(min(gap, self.bars)):
+                    self._close_bar()
+                if gap >= self.bars:
+                    # החלון כולו ריק — גם הסגירות הישנות כבר לא בסיס לתשואה
+                    self._close = np.full(len(self.symbols), np.nan)
+                self._update_corr()
+                self._bar = b
+            self._last[i] = price
+
+    def _close_bar(self):
+        have = ~np.isnan(self._last)
+        m = (have & ~np.isnan(self._close)).astype(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            r = np.where(m > 0, np.log(self._last / self._close), 0.0)
+        self._close = np.where(have, self._last, self._close)
+        self._last = np.full(len(self.symbols), np.nan)
+
+        rp, mp = self._prev if self._prev is not None else (np.zeros_like(r), np.zeros_like(m))
+        self._prev = (r, m)
+        self._hist.append((r, m, rp, mp))
+        self._accumulate(r, m, rp, mp, +1.0)
+        if len(self._hist) > self.bars:
+            self._accumulate(*self._hist.popleft(), -1.0)
+        self.bars_closed += 1
+        if self.bars_closed % self.bars == 0:
+            # רענון מלא פעם בחלון — מאפס סחיפה של חיבור/חיסור
+            self._reset_sums()
+            for h in self._hist:
+                self._accumulate(*h, +1.0)
+
+    def _update_corr(self):
+        self.corr = _corr(self.N, self.SX, self.SX.T, self.SXX, self.SXX.T, self.SXY)
+        self.lead = _corr(self.LN, self.LSX, self.LSY, self.LSXX, self.LSYY, self.LSXY)
+
+    # ---------- קריאה ----------
+
+    def peers(self, symbol: str) -> List[Tuple[str, float]]:
+        i = self.index.get(symbol)
+        if i is None:
+            return []
+        with self.lock:
+            row = self.corr[i]
+            out = [(self.symbols[j], float(row[j])) for j in range(len(row))
+                   if j != i and np.isfinite(row[j]) and abs(row[j]) >= CORR_MIN]
+        return sorted(out, key=lambda x: -abs(x[1]))
+
+    def leaders(self, symbol: str) -> List[Tuple[str, float]]:
+        """סימבולים שהבר הקודם שלהם מתואם עם הבר הבא של symbol."""
+        i = self.index.get(symbol)
+        if i is None:
+            return []
+        with self.lock:
+            col = self.lead[:, i]
+            out = [(self.symbols[j], float(col[j])) for j in range(len(col))
+                   if j != i and np.isfinite(col[j]) and abs(col[j]) >= CORR_LEAD_MIN]
+        return sorted(out, key=lambda x: -abs(x[1]))
+
+    def confirmation(self, symbol: str, side: str) -> float:
+        """[-1, 1]: כמה העמיתים / המובילים מאשרים את side (0 = אין מידע)."""
+        i = self.index.get(symbol)
+        if i is None or side not in ("UP", "DOWN"):
+            return 0.0
+        want = 1.0 if side == "UP" else -1.0
+        with self.lock:
+            if not self._hist:
+                return 0.0
+            last_r = self._hist[-1][0]
+            mom = sum(h[0] for h in list(self._hist)[-CORR_CONFIRM_BARS:])
+            num = den = 0.0
+            for j in range(len(self.symbols)):
+                if j == i:
+                    continue
+                c = self.corr[i, j]
+                if np.isfinite(c) and abs(c) >= CORR_MIN:
+                    if mom[j]:
+                        num += c * math.copysign(1.0, mom[j]) * want
+                        den += abs(c)
+                l = self.lead[j, i]
+                if np.isfinite(l) and abs(l) >= CORR_LEAD_MIN and last_r[j]:
+                    num += l * math.copysign(1.0, last_r[j]) * want
+                    den += abs(l)
+        return num / den if den else 0.0
+
+    def status_line(self, symbol: str) -> str:
+        if symbol not in self.index:
+            return "Cross-asset: n/a"
+        peers = ", ".join(f"{s.split(':')[-1]} {c:+.2f}" for s, c in self.peers(symbol)[:3]) or "–"
+        leads = ", ".join(f"{s.split(':')[-1]} {c:+.2f}" for s, c in self.leaders(symbol)[:2]) or "–"
+        return (
+            f"Cross-asset ({len(self._hist)}x{self.bar_sec:g}s bars): peers {peers} | "
+            f"leaders {leads}"
+        )
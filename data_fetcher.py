@@ -1,49 +1,154 @@
 # data_fetcher.py
 from __future__ import annotations
 import json, time, threading, asyncio, os, collections
-from typing import List, Tuple
+from typing import Callable, Deque, Iterable, List, Tuple
 import websockets
 
 FINNHUB_KEY = os.getenv("FINNHUB_API_KEY", "").strip()
 HAS_LIVE_KEY = bool(FINNHUB_KEY)
+TICKS_MAXLEN = 8000
 
 STATE = {
-    "ticks": collections.deque(maxlen=8000),  # (ts, price)
+    "ticks": collections.deque(maxlen=TICKS_MAXLEN),  # (ts, price) של הסימבול הנוכחי
+    "ticks_by_symbol": {},       # symbol -> deque((ts, price)) — כל הסימבולים המנויים
+    "tick_seq_by_symbol": {},    # symbol -> מונה טיקים (מפתח מטמון פר סימבול)
+    "last_tick_ts_by_symbol": {},
     "ws_online": False,
     "used_symbol": None,
     "msg_count": 0,
     "last_recv_ts": 0.0,
+    "tick_seq": 0,          # מונה טיקים מצטבר — מפתח למטמון ההחלטות
+    "last_tick_ts": 0.0,    # זמן הגעת הטיק האחרון (לא כל הודעה — רק trade)
     "reconnects": 0,
     "ws_url": None,
     "subscribed": [],
     "current_finnhub_symbol": None,
 }
 
+# ===== buffers פר סימבול =====
+# ה-fetcher מנוי לכל הסימבולים שהבוט מכיר (בשביל הסורק), וכל אחד מקבל deque
+# משלו. STATE["ticks"] מצביע תמיד על ה-deque של הנכס הנוכחי (set_current_symbol).
+def ticks_for(sym: str) -> Deque[Tuple[float, float]]:
+    dq = STATE["ticks_by_symbol"].get(sym)
+    if dq is None:
+        dq = STATE["ticks_by_symbol"].setdefault(sym, collections.deque(maxlen=TICKS_MAXLEN))
+    return dq
+
+def symbol_seq(sym: str) -> int:
+    return STATE["tick_seq_by_symbol"].get(sym, 0)
+
+def set_current_symbol(sym: str):
+    """החלפת נכס: STATE["ticks"] עובר ל-buffer של הסימבול (שכבר מתמלא ברקע)."""
+    STATE["ticks"] = ticks_for(sym)
+    STATE["current_finnhub_symbol"] = sym
+
+# ===== אירועי טיק =====
+# במקום שהצרכנים ידגמו את STATE כל X שניות, ה-fetcher מפרסם כל טיק:
+# - wait_for_tick: חסימה עד שה-tick_seq עולה (או timeout)
+# - wait_for_first_tick: אותו דבר לסימבול אחד, + זמן הטיק החדש הראשון
+# - add_tick_listener: callback סינכרוני בתוך thread ה-fetcher (חייב להיות זול!)
+_TICK_COND = threading.Condition()
+_TICK_LISTENERS: List[Callable[[str, float, float], None]] = []
+
+def add_tick_listener(fn: Callable[[str, float, float], None]):
+    _TICK_LISTENERS.append(fn)
+
+def wait_for_tick(last_seq: int, timeout: float, symbol: str | None = None) -> int:
+    """
+    מחזיר את ה-tick_seq הנוכחי; אם לא הגיע טיק עד ה-timeout — יחזור last_seq.
+    symbol: להמתין רק לטיקים של הסימבול הזה (המונה שלו, symbol_seq).
+    """
+    if symbol is None:
+        read = lambda: STATE["tick_seq"]
+    else:
+        read = lambda: symbol_seq(symbol)
+    with _TICK_COND:
+        _TICK_COND.wait_for(lambda: read() != last_seq, timeout=timeout)
+        return read()
+
+def wait_for_first_tick(last_seq: int, timeout: float, symbol: str) -> Tuple[int, float | None]:
+    """
+    כמו wait_for_tick לסימבול אחד, ומחזיר גם את זמן הטיק הראשון אחרי last_seq
+    (None אם לא הגיע טיק). נקרא תחת ה-lock — טיקים שמגיעים אחרי החזרה לא
+    מזיזים אותו.
+    """
+    with _TICK_COND:
+        _TICK_COND.wait_for(lambda: symbol_seq(symbol) != last_seq, timeout=timeout)
+        seq = symbol_seq(symbol)
+        dq = ticks_for(symbol)
+        n_new = seq - last_seq
+        if n_new <= 0 or not dq:
+            return seq, None
+        return seq, dq[-min(n_new, len(dq))][0]
+
+def _publish_tick(sym: str, ts: float, price: float):
+    with _TICK_COND:
+        ticks_for(sym).append((ts, price))
+        STATE["tick_seq"] += 1
+        STATE["tick_seq_by_symbol"][sym] = symbol_seq(sym) + 1
+        STATE["last_tick_ts"] = ts
+        STATE["last_tick_ts_by_symbol"][sym] = ts
+        _TICK_COND.notify_all()
+    for fn in _TICK_LISTENERS:
+        try:
+            fn(sym, ts, price)
+        except Exception as e:
+            print("[TICK LISTENER] exception:", e)
+
 def _url_for_symbol(sym: str) -> str:
     return f"wss://ws.finnhub.io?token={FINNHUB_KEY}"
 
-async def _consumer(sym: str):
+def _wanted_symbols(sym_getter, symbols: Iterable[str]) -> List[str]:
+    out = [sym_getter()]
+    for s in symbols:
+        if s not in out:
+            out.append(s)
+    return out
+
+async def _consumer(sym_getter, symbols: Iterable[str]):
+    sym = sym_getter()
     url = _url_for_symbol(sym)
     STATE["ws_url"] = url
-    STATE["current_finnhub_symbol"] = sym
+    set_current_symbol(sym)
     async with websockets.connect(url, ping_interval=15, ping_timeout=15) as ws:
-        await ws.send(json.dumps({"type": "subscribe", "symbol": sym}))
-        STATE["subscribed"] = [sym]
+        subscribed = set()
+        async def sync_subscriptions():
+            # נכס שנבחר אחרי החיבור (ולא ברשימה) — מנוי בלי reconnect
+            for s in _wanted_symbols(sym_getter, symbols):
+                if s not in subscribed:
+                    await ws.send(json.dumps({"type": "subscribe", "symbol": s}))
+                    subscribed.add(s)
+            STATE["subscribed"] = sorted(subscribed)
+
+        await sync_subscriptions()
         STATE["ws_online"] = True
         while True:
-            msg = await ws.recv()
+            try:
+                msg = await asyncio.wait_for(ws.recv(), timeout=1.0)
+            except asyncio.TimeoutError:
+                msg = None
+            cur = sym_getter()
+            if cur not in subscribed:
+                await sync_subscriptions()
+            if STATE["current_finnhub_symbol"] != cur:
+                set_current_symbol(cur)
+            if msg is None:
+                continue
             STATE["msg_count"] += 1
             STATE["last_recv_ts"] = time.time()
             data = json.loads(msg)
             if data.get("type") == "trade":
+                now = time.time()
                 for d in data.get("data", []):
-                    if d.get("s") != sym:
+                    s = d.get("s")
+                    if s not in subscribed:
                         continue
                     price = float(d.get("p"))
-                    STATE["used_symbol"] = sym
-                    STATE["ticks"].append((time.time(), price))
+                    if s == cur:
+                        STATE["used_symbol"] = s
+                    _publish_tick(s, now, price)
 
-async def _main_loop(sym_getter):
+async def _main_loop(sym_getter, symbols: Iterable[str]):
     # אם אין KEY — לא לקרוס; נשארים אופליין ומאפשרים סטטוס.
     if not HAS_LIVE_KEY:
         STATE["ws_online"] = False
@@ -53,18 +158,22 @@ async def _main_loop(sym_getter):
     backoff = 2
     max_backoff = 30
     while True:
-        sym = sym_getter()
         try:
-            await _consumer(sym)
+            await _consumer(sym_getter, symbols)
         except Exception:
             STATE["ws_online"] = False
             STATE["reconnects"] += 1
             await asyncio.sleep(backoff)
             backoff = min(max_backoff, backoff * 2)
 
-def start_fetcher_in_thread(sym_getter):
+def start_fetcher_in_thread(sym_getter, symbols: Iterable[str] = ()):
+    """
+    sym_getter: הנכס הנוכחי (תמיד מנוי). symbols: סימבולים נוספים למנוי באותו
+    חיבור — כל אחד מקבל buffer משלו ב-STATE["ticks_by_symbol"].
+    """
+    symbols = list(symbols)
     t = threading.Thread(
-        target=lambda: asyncio.new_event_loop().run_until_complete(_main_loop(sym_getter)),
+        target=lambda: asyncio.new_event_loop().run_until_complete(_main_loop(sym_getter, symbols)),
         daemon=True
     )
     t.start()
@@ -0,0 +1,75 @@
+# decision_cache.py
+from __future__ import annotations
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+###############################################################################
+# מטמון החלטות
+# ------------
+# on_signal / on_status / auto_loop מבקשים את אותה החלטה שוב ושוב גם כשלא
+# הגיע טיק חדש. ההחלטה תלויה רק ב: (symbol, tick_seq, cfg_version),
+# אז שומרים את התוצאה האחרונה לכל סימבול ומחזירים אותה כל עוד המפתח זהה.
+#
+# - tick_seq   : data_fetcher.symbol_seq(symbol) (עולה בכל טיק של הסימבול)
+# - cfg_version: strategy.cfg_version() (עולה בכל שינוי ב-STRAT_CFG / AssetConfig)
+#
+# החישוב עצמו רץ בתוך lock של הסימבול: האסטרטגיה מחזיקה מצב פנימי (היסטרזיס,
+# EWMA, cooldown) ואסור ששני threads יעדכנו אותו במקביל על אותו טיק.
+# lock פר סימבול (ולא אחד גלובלי) — הסורק מעריך כמה סימבולים במקביל.
+###############################################################################
+
+DecisionKey = Tuple[str, int, int]  # (symbol, tick_seq, cfg_version)
+
+
+class DecisionCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._last: Dict[str, Tuple[DecisionKey, Any]] = {}
+        self.hits: int = 0
+        self.misses: int = 0
+        self.invalidations: int = 0
+
+    def _lock_for(self, symbol: str) -> threading.Lock:
+        with self.lock:
+            lk = self._locks.get(symbol)
+            if lk is None:
+                lk = self._locks[symbol] = threading.Lock()
+            return lk
+
+    def get_or_compute(self, key: DecisionKey, compute: Callable[[], Any]) -> Any:
+        symbol = key[0]
+        with self._lock_for(symbol):
+            cached = self._last.get(symbol)
+            if cached is not None and cached[0] == key:
+                with self.lock:
+                    self.hits += 1
+                return cached[1]
+            with self.lock:
+                self.misses += 1
+            value = compute()
+            self._last[symbol] = (key, value)
+            return value
+
+    def invalidate(self, symbol: str | None = None):
+        """ביטול מפורש (לכל הסימבולים או לאחד)."""
+        with self.lock:
+            if symbol is None:
+                self._last.clear()
+            else:
+                self._last.pop(symbol, None)
+            self.invalidations += 1
+
+    def hit_rate(self) -> float:
+        tot = self.hits + self.misses
+        return (100.0 * self.hits / tot) if tot > 0 else 0.0
+
+    def status_line(self) -> str:
+        return (
+            f"Decision cache: {self.hits} hits / {self.misses} misses "
+            f"({self.hit_rate():.1f}%) | invalidations: {self.invalidations}"
+        )
+
+
+# אינסטנס גלובלי (כמו LEARNER)
+DECISIONS = DecisionCache()
@@ -0,0 +1,79 @@
+# downsample.py
+from __future__ import annotations
+from typing import Sequence, Tuple
+
+import numpy as np
+
+###############################################################################
+# דילול נקודות לפני ציור (MinMax + LTTB, וקטורי ב-NumPy)
+# ----------------------------------------------------
+# בקריפטו עמוס חלון של 90s יכול להכיל אלפי טיקים; זמן הציור של matplotlib
+# עולה עם מספר הנקודות בלי שום תועלת ויזואלית מעבר לרזולוציית הפיקסלים.
+#
+# downsample(x, y, n_out):
+#   1. MinMax: חלוקה ל-n_out*MINMAX_RATIO/2 דליים שווים (לפי אינדקס) ושמירת
+#      המינימום והמקסימום של כל דלי — מעטפת min/max, קיצונים לא הולכים לאיבוד.
+#   2. LTTB (largest-triangle-three-buckets) על הנקודות שנשארו, עד n_out:
+#      מכל דלי נבחרת הנקודה עם המשולש הגדול ביותר מול ממוצעי הדליים השכנים
+#      (ממוצע הדלי הקודם במקום הנקודה שנבחרה בו — כך הכול וקטורי, בלי לולאה).
+#   נקודה ראשונה ואחרונה תמיד נשמרות.
+# n_out לגרף = DOWNSAMPLE_PX_FACTOR * רוחב ה-axes בפיקסלים (charts.py).
+###############################################################################
+
+DOWNSAMPLE_PX_FACTOR = 2.0
+MINMAX_RATIO = 4
+
+
+def _buckets(a: np.ndarray, n_buckets: int) -> np.ndarray:
+    """a[1:-1] מחולק ל-n_buckets דליים באורך שווה (זנב חסר מרופד בערך האחרון)."""
+    inner = a[1:-1]
+    size = -(-len(inner) // n_buckets)
+    pad = size * n_buckets - len(inner)
+    if pad:
+        inner = np.concatenate([inner, np.repeat(inner[-1:], pad)])
+    return inner.reshape(n_buckets, size)
+
+
+def minmax_indices(y: np.ndarray, n_buckets: int) -> np.ndarray:
+    """אינדקסים (ממוינים) של min ו-max בכל דלי, + הראשון והאחרון."""
+    n = len(y)
+    idx = _buckets(np.arange(n), n_buckets)
+    vals = y[idx]
+    rows = np.arange(n_buckets)
+    lo = idx[rows, vals.argmin(axis=1)]
+    hi = idx[rows, vals.argmax(axis=1)]
+    return np.unique(np.concatenate([[0], lo, hi, [n - 1]]))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    nb = n_out - 2
+    bx = _buckets(x, nb)
+    by = _buckets(y, nb)
+    bi = _buckets(np.arange(n), nb)
+    mx, my = bx.mean(axis=1), by.mean(axis=1)
+    # קודקוד "קודם" = ממוצע הדלי הקודם (לדלי הראשון: הנקודה הראשונה)
+    ax_ = np.concatenate([[x[0]], mx[:-1]])[:, None]
+    ay_ = np.concatenate([[y[0]], my[:-1]])[:, None]
+    # קודקוד "הבא" = ממוצע הדלי הבא (לאחרון: הנקודה האחרונה)
+    cx = np.concatenate([mx[1:], [x[-1]]])[:, None]
+    cy = np.concatenate([my[1:], [y[-1]]])[:, None]
+    area = np.abs((ax_ - cx) * (by - ay_) - (ax_ - bx) * (cy - ay_))
+    pick = bi[np.arange(nb), area.argmax(axis=1)]
+    return np.unique(np.concatenate([[0], pick, [n - 1]]))
+
+
+def downsample(x: Sequence[float], y: Sequence[float], n_out: int) -> Tuple[np.ndarray, np.ndarray]:
+    xa = np.asarray(x, dtype=np.float64)
+    ya = np.asarray(y, dtype=np.float64)
+    n = len(xa)
+    if n <= n_out or n_out < 3:
+        return xa, ya
+    n_pre = max(1, n_out * MINMAX_RATIO // 2)
+    if 2 * n_pre + 2 < n:
+        keep = minmax_indices(ya, n_pre)
+        xa, ya = xa[keep], ya[keep]
+    keep = lttb_indices(xa, ya, n_out)
+    return xa[keep], ya[keep]
@@ -0,0 +1,133 @@
+# ensemble.py
+from __future__ import annotations
+import math
+from typing import Callable, Dict, Tuple
+
+###############################################################################
+# Ensemble של "ראשים" (heads) על מעבר פיצ'רים אחד
+# ----------------------------------------------
+# strategy.compute_features מחשב פעם אחת לטיק את שינויי הלוג, ה-EMAs, vol, RSI,
+# התמדה ופריצה. כל head מקבל את אותו מילון ומחזיר (side, conf):
+#
+#   blend    — ה-head המקורי (EMA + שיפוע, stateful) — רץ בתוך strategy
+#   breakout — פריצה של קיצון החלון, בעוצמת norm ו-tick_imb
+#   rsi_mr   — mean-reversion על RSI קיצוני
+#
+# כלל השילוב (CFG["ENSEMBLE_MODE"]), head עם WAIT "נמנע", משקל = ENS_W_*:
+#   weighted  — ממוצע משוקלל של edge מסומן (conf-50): הצד = הסימן, conf = 50+|net|
+#   majority  — הצד עם משקל הקולות הגבוה; conf = edge הזוכים * (פער / סך המשקל)
+#   unanimous — רק אם אף head לא מתנגד; conf = ממוצע משוקלל של ה-edge
+# לכל head נרשמים side/conf/w/contrib ב-dbg["heads"].
+#
+# ה-conf המשולב לא "מורם" ל-CONF_MIN: מתחתיו -> WAIT (כמו ב-blend), ומעליו רק
+# חסימה ל-CONF_MAX. כשה-blend ב-cooldown ה-heads לא מייצרים סיגנל בכלל —
+# אחרת היפוך מיידי היה עוקף את ה-cooldown דרך head אחר.
+###############################################################################
+
+Vote = Tuple[str, int]
+ENSEMBLE_MODES = ("off", "weighted", "majority", "unanimous")
+
+
+def head_breakout(feat: Dict, cfg: Dict) -> Vote:
+    if feat["bo_up"]:
+        side = "UP"
+    elif feat["bo_dn"]:
+        side = "DOWN"
+    else:
+        return "WAIT", 50
+    strength = math.tanh(feat["norm"]) * (0.5 + 0.5 * feat["tick_imb"])
+    return side, int(50 + 30 * strength)
+
+def head_rsi_mr(feat: Dict, cfg: Dict) -> Vote:
+    r, hi, lo = feat["rsi"], float(cfg["MR_RSI_HIGH"]), float(cfg["MR_RSI_LOW"])
+    if r >= hi:
+        return "DOWN", int(50 + 45 * min(1.0, (r - hi) / max(1e-9, 100.0 - hi)))
+    if r <= lo:
+        return "UP", int(50 + 45 * min(1.0, (lo - r) / max(1e-9, lo)))
+    return "WAIT", 50
+
+
+# head נוסף = פונקציה (feat, cfg) -> (side, conf) + מפתח משקל ב-CFG
+HEADS: Dict[str, Callable[[Dict, Dict], Vote]] = {
+    "breakout": head_breakout,
+    "rsi_mr": head_rsi_mr,
+}
+WEIGHT_KEYS: Dict[str, str] = {
+    "blend": "ENS_W_BLEND",
+    "breakout": "ENS_W_BREAKOUT",
+    "rsi_mr": "ENS_W_RSI_MR",
+}
+
+
+def combine(votes: Dict[str, Vote], weights: Dict[str, float],
+            mode: str) -> Tuple[str, float, Dict[str, float]]:
+    """מחזיר (side, conf גולמי, contrib לכל head מצביע)."""
+    voting = {n: v for n, v in votes.items() if v[0] in ("UP", "DOWN") and weights.get(n, 0.0) > 0}
+    if not voting:
+        return "WAIT", 50.0, {}
+    W = sum(weights[n] for n in voting)
+    edge = {n: (c - 50.0) * (1.0 if s == "UP" else -1.0) for n, (s, c) in voting.items()}
+    contrib = {n: weights[n] * edge[n] / W for n in voting}
+
+    if mode == "weighted":
+        net = sum(contrib.values())
+        if net == 0:
+            return "WAIT", 50.0, contrib
+        return ("UP" if net > 0 else "DOWN"), 50.0 + abs(net), contrib
+
+    up_w = sum(weights[n] for n, (s, _) in voting.items() if s == "UP")
+    dn_w = W - up_w
+    if mode == "unanimous":
+        if up_w and dn_w:
+            return "WAIT", 50.0, contrib
+        return ("UP" if up_w else "DOWN"), 50.0 + abs(sum(contrib.values())), contrib
+
+    # majority
+    if up_w == dn_w:
+        return "WAIT", 50.0, contrib
+    win = "UP" if up_w > dn_w else "DOWN"
+    winners = [n for n, (s, _) in voting.items() if s == win]
+    win_w = sum(weights[n] for n in winners)
+    mean_edge = sum(weights[n] * abs(edge[n]) for n in winners) / win_w
+    return win, 50.0 + mean_edge * abs(up_w - dn_w) / W, contrib
+
+
+def run_ensemble(feat: Dict, blend: Tuple[str, int, Dict], cfg: Dict) -> Tuple[str, int, Dict]:
+    """blend = הפלט של strategy._blend_head על אותו feat (כבר עדכן את המצב שלו)."""
+    mode = cfg.get("ENSEMBLE_MODE", "off")
+    if mode not in ENSEMBLE_MODES:
+        mode = "weighted"
+    b_side, b_conf, b_dbg = blend
+    if b_dbg.get("reason") == "cooldown":
+        return b_side, b_conf, dict(b_dbg, ensemble=mode)
+    weights = {n: float(cfg.get(k, 0.0)) for n, k in WEIGHT_KEYS.items()}
+
+    votes: Dict[str, Vote] = {"blend": (b_side, int(b_conf))}
+    for name, fn in HEADS.items():
+        if weights.get(name, 0.0) > 0:
+            votes[name] = fn(feat, cfg)
+
+    side, raw_conf, contrib = combine(votes, weights, mode)
+    if side in ("UP", "DOWN") and raw_conf >= cfg["CONF_MIN"]:
+        conf = int(min(cfg["CONF_MAX"], raw_conf))
+    else:
+        side, conf = "WAIT", int(min(raw_conf, cfg["CONF_MIN"] - 1))
+
+    dbg = dict(b_dbg)
+    dbg["ensemble"] = mode
+    dbg["heads"] = {
+        n: {"side": s, "conf": c, "w": weights.get(n, 0.0), "contrib": contrib.get(n, 0.0)}
+        for n, (s, c) in votes.items()
+    }
+    return side, conf, dbg
+
+
+def heads_line(heads: Dict[str, Dict]) -> str:
+    """שורת תצוגה קצרה לסיגנל / סטטוס."""
+    parts = []
+    for n, h in heads.items():
+        if h["side"] in ("UP", "DOWN"):
+            parts.append(f"{n} {h['side']} {h['conf']} ({h['contrib']:+.1f})")
+        else:
+            parts.append(f"{n} –")
+    return "Heads: " + " | ".join(parts)
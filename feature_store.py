@@ -0,0 +1,211 @@
+# feature_store.py
+from __future__ import annotations
+import collections, math, threading
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from features import log_changes
+
+###############################################################################
+# Feature store פר סימבול
+# -----------------------
+# strategy.compute_features מחשב את הפיצ'רים פעם אחת לטיק; במקום שכל צרכן
+# (סטטוס, learner, גרפים) יחשב שוב, ההחלטה "מפרסמת" אותם לכאן:
+#
+#   publish(feat, ts, cfg)  — נקרא מתוך compute_signal_from_prices (store=...)
+#   get(name)               — ערך נוכחי; פיצ'ר "עצל" (LAZY_FEATURES) מחושב רק
+#                             בקריאה הראשונה אחרי publish, ואז נשמר
+#   get_ts(name)            — (ts, value)
+#   history(name)           — [(ts, value)] של ה-publishים האחרונים (רק מה שחושב)
+#   vector(names, lags)     — וקטור ל-learner: ערך נוכחי + ערכים מלפני k publishים
+#
+# כל ערך מתויג ב-version (מונה publish) וב-ts של ההחלטה.
+###############################################################################
+
+FEATURE_HISTORY = 64
+LEARN_FEATURES = (
+    "vol", "rsi", "ema_spread", "trend_slope", "norm", "persist_log",
+    "persist_price", "tick_imb", "regime", "ret_5", "zscore_last", "range_pos",
+    "tick_rate",
+)
+LEARN_LAGS = (1, 3)
+
+# פיצ'ר עצל = פונקציה (store) -> value; קוראת קלטים / פיצ'רים אחרים דרך store.get
+LAZY_FEATURES: Dict[str, Callable[["FeatureStore"], Any]] = {}
+
+def lazy_feature(name: str):
+    def deco(fn):
+        LAZY_FEATURES[name] = fn
+        return fn
+    return deco
+
+
+def _running_ema(x: List[float], alpha: float) -> List[float]:
+    # אותה רקורסיה כמו strategy._ema_alpha, כסדרה (לגרף)
+    if not x:
+        return []
+    v, out = x[0], []
+    for a in x:
+        v = alpha * a + (1.0 - alpha) * v
+        out.append(v)
+    return out
+
+def _price_line(store: "FeatureStore", alpha_key: str) -> List[float]:
+    prices = store.get("prices")
+    if not prices:
+        return []
+    base = prices[0]
+    return [base * math.exp(v) for v in _running_ema(log_changes(prices), store.cfg[alpha_key])]
+
+@lazy_feature("ema_fast_line")
+def _ema_fast_line(store):
+    """EMA מהיר במרחב המחיר — אותו alpha ואותם שינויי לוג כמו האסטרטגיה."""
+    return _price_line(store, "ALPHA_FAST")
+
+@lazy_feature("ema_slow_line")
+def _ema_slow_line(store):
+    return _price_line(store, "ALPHA_SLOW")
+
+@lazy_feature("rsi_line")
+def _rsi_line(store):
+    """RSI לכל נקודה בחלון — אותה נוסחה ו-RSI_PERIOD כמו strategy._rsi (סכומים רצים)."""
+    prices = store.get("prices") or []
+    period = int(store.cfg.get("RSI_PERIOD", 14))
+    out = [50.0] * min(len(prices), period)
+    gains = losses = 0.0
+    for i in range(1, len(prices)):
+        d = prices[i] - prices[i - 1]
+        gains += max(d, 0.0)
+        losses += max(-d, 0.0)
+        if i > period:
+            d0 = prices[i - period] - prices[i - period - 1]
+            gains -= max(d0, 0.0)
+            losses -= max(-d0, 0.0)
+        if i >= period:
+            avg_loss = losses / period if losses > 1e-15 else 1e-9
+            out.append(100.0 - 100.0 / (1.0 + (max(gains, 0.0) / period) / avg_loss))
+    return out
+
+@lazy_feature("n")
+def _n(store):
+    return len(store.get("prices") or [])
+
+@lazy_feature("ret_5")
+def _ret_5(store):
+    p = store.get("prices") or []
+    return math.log(p[-1] / p[-6]) if len(p) >= 6 and p[-6] > 0 else 0.0
+
+@lazy_feature("zscore_last")
+def _zscore_last(store):
+    p = store.get("prices") or []
+    if len(p) < 2:
+        return 0.0
+    m = sum(p) / len(p)
+    sd = math.sqrt(sum((v - m) ** 2 for v in p) / len(p))
+    return (p[-1] - m) / sd if sd > 0 else 0.0
+
+@lazy_feature("range_pos")
+def _range_pos(store):
+    p = store.get("prices") or []
+    if not p:
+        return 0.5
+    hi, lo = max(p), min(p)
+    return (p[-1] - lo) / (hi - lo) if hi > lo else 0.5
+
+@lazy_feature("tick_rate")
+def _tick_rate(store):
+    """טיקים לשנייה בחלון (לפי WINDOW_SEC)."""
+    return store.get("n") / max(1e-9, float(store.cfg["WINDOW_SEC"]))
+
+
+class FeatureStore:
+    def __init__(self, symbol: str, history: int = FEATURE_HISTORY):
+        self.symbol = symbol
+        self.lock = threading.RLock()
+        self.version = 0
+        self.ts = 0.0
+        self.cfg: Dict[str, Any] = {}
+        self._values: Dict[str, Any] = {}
+        self._hist: Dict[str, collections.deque] = collections.defaultdict(
+            lambda: collections.deque(maxlen=history))
+        self.publishes = 0
+        self.reads = 0
+        self.lazy_computed = 0
+
+    def publish(self, feat: Dict[str, Any], ts: float, cfg: Dict[str, Any]):
+        with self.lock:
+            self.version += 1
+            self.publishes += 1
+            self.ts = ts
+            self.cfg = cfg
+            self._values = dict(feat)
+            for k, v in self._values.items():
+                if k != "prices":
+                    self._hist[k].append((self.version, ts, v))
+
+    def get(self, name: str, default: Any = None) -> Any:
+        with self.lock:
+            self.reads += 1
+            if name in self._values:
+                return self._values[name]
+            fn = LAZY_FEATURES.get(name)
+            if fn is None or not self.version:
+                return default
+            v = fn(self)
+            self.lazy_computed += 1
+            self._values[name] = v
+            if not isinstance(v, list):
+                self._hist[name].append((self.version, self.ts, v))
+            return v
+
+    def get_ts(self, name: str) -> Tuple[float, Any]:
+        with self.lock:
+            return self.ts, self.get(name)
+
+    def history(self, name: str) -> List[Tuple[float, Any]]:
+        with self.lock:
+            return [(ts, v) for (_, ts, v) in self._hist.get(name, ())]
+
+    def _lagged(self, name: str, lag: int) -> Any:
+        want = self.version - lag
+        for ver, _, v in reversed(self._hist.get(name, ())):
+            if ver == want:
+                return v
+            if ver < want:
+                break
+        return None
+
+    def vector(self, names: Iterable[str] = LEARN_FEATURES,
+               lags: Iterable[int] = LEARN_LAGS) -> Dict[str, Any]:
+        """ערכים נוכחיים + "name@-k" מה-history (רק אם חושב אז — בלי עלות נוספת)."""
+        with self.lock:
+            out: Dict[str, Any] = {}
+            for n in names:
+                out[n] = self.get(n)
+                for k in lags:
+                    v = self._lagged(n, k)
+                    if v is not None:
+                        out[f"{n}@-{k}"] = v
+            return out
+
+    def status_line(self) -> str:
+        return (
+            f"Feature store: v{self.version} | reads {self.reads} | "
+            f"lazy computed {self.lazy_computed} | {len(self._values)} cached"
+        )
+
+
+class FeatureRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stores: Dict[str, FeatureStore] = {}
+
+    def get(self, symbol: str) -> FeatureStore:
+        with self.lock:
+            st = self.stores.get(symbol)
+            if st is None:
+                st = self.stores[symbol] = FeatureStore(symbol)
+            return st
+
+
+# אינסטנס גלובלי (כמו STREAMS)
+FEATURES = FeatureRegistry()
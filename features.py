@@ -53,6 +53,19 @@ def direction_from_score(score: float, last_prices: List[float]) -> str:
         return "UP"
     return "DOWN"
 
+def classify_regime(sl: float, vol_r: float, pers: float,
+                    shock_vol: float = 3e-3, shock_slope: float = 1e-3,
+                    trend_slope: float = 6e-4, trend_persist: float = 0.6) -> str:
+    """
+    הליבה של regime_classifier על ערכים מוכנים (שיפוע, vol, התמדה).
+    הספים כפרמטרים — regime.RegimeDetector מעביר ספים מנורמלים ל-vol של הסימבול.
+    """
+    if vol_r > shock_vol and abs(sl) < shock_slope:
+        return "SHOCK"
+    if abs(sl) > trend_slope and pers >= trend_persist:
+        return "TREND"
+    return "RANGE"
+
 def regime_classifier(prices: List[float], diffs_: List[float]) -> str:
     """
     רג'ים בסיסי:
@@ -64,8 +77,4 @@ def regime_classifier(prices: List[float], diffs_: List[float]) -> str:
     sl = slope(ch)
     vol_r = robust_vol(diffs_)
     pers = rolling_persistence(diffs_)
-    if vol_r > 3e-3 and abs(sl) < 1e-3:
-        return "SHOCK"
-    if abs(sl) > 6e-4 and pers >= 0.6:
-        return "TREND"
-    return "RANGE"
+    return classify_regime(sl, vol_r, pers)
@@ -0,0 +1,82 @@
+# lazy_import.py
+from __future__ import annotations
+import importlib, os, threading, time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+###############################################################################
+# imports עצלים + מדידת זמן עלייה
+# -------------------------------
+# matplotlib (גרפים), selenium (מסחר אוטומטי, רק PC) ו-requests (GitHub של
+# ה-learner) נטענו ב-import של main — גם ב-PHONE שלא נוגע ב-selenium, וגם
+# לפני שמישהו ביקש גרף. על קונטיינר קטן זה מאט עלייה / restart אחרי קריסה.
+#
+# - lazy_module(name): facade דק — ה-import האמיתי בגישה הראשונה למאפיין
+#   (thread-safe), ואז getattr ישיר. זמן הטעינה נרשם ב-LAZY_LOADS.
+# - STARTUP: חותמות זמן מתחילת התהליך (imports / main / first poll) לסטטוס
+#   ול-startup_bench.py (שמריץ גם -X importtime).
+###############################################################################
+
+STARTUP_BENCH = os.getenv("STARTUP_BENCH", "0") == "1"
+
+# (שם מודול, שניות, שלב STARTUP האחרון כשנטען)
+LAZY_LOADS: List[Tuple[str, float, str]] = []
+
+
+class LazyModule:
+    def __init__(self, name: str, on_load: Optional[Callable[[Any], None]] = None):
+        self.__dict__["_name"] = name
+        self.__dict__["_on_load"] = on_load
+        self.__dict__["_mod"] = None
+        self.__dict__["_lock"] = threading.Lock()
+
+    def _load(self):
+        mod = self.__dict__["_mod"]
+        if mod is not None:
+            return mod
+        with self.__dict__["_lock"]:
+            if self.__dict__["_mod"] is None:
+                t0 = time.perf_counter()
+                mod = importlib.import_module(self._name)
+                if self._on_load is not None:
+                    self._on_load(mod)
+                LAZY_LOADS.append((self._name, time.perf_counter() - t0, STARTUP.phase()))
+                self.__dict__["_mod"] = mod
+            return self.__dict__["_mod"]
+
+    @property
+    def loaded(self) -> bool:
+        return self.__dict__["_mod"] is not None
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module {self._name} ({state})>"
+
+
+def lazy_module(name: str, on_load: Optional[Callable[[Any], None]] = None) -> LazyModule:
+    return LazyModule(name, on_load)
+
+
+class StartupTimer:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.marks: Dict[str, float] = {}
+
+    def mark(self, name: str):
+        """חותמת ראשונה בלבד לכל שלב (restart של polling לא מזיז אותה)."""
+        self.marks.setdefault(name, time.perf_counter() - self.t0)
+
+    def phase(self) -> str:
+        """השלב שבו אנחנו עכשיו: "import" או "after <חותמת אחרונה>"."""
+        return "after " + max(self.marks, key=self.marks.get) if self.marks else "import"
+
+    def status_line(self) -> str:
+        parts = [f"{k} {v * 1000:.0f}ms" for k, v in self.marks.items()] or ["n/a"]
+        lazy = ", ".join(f"{n} {s * 1000:.0f}ms ({ph})" for n, s, ph in LAZY_LOADS) or "none yet"
+        return f"Startup: {' | '.join(parts)} | lazy loads: {lazy}"
+
+
+# נוצר ב-import הראשון של המודול — main מייבא אותו לפני כל השאר
+STARTUP = StartupTimer()
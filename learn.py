@@ -1,8 +1,11 @@
 # learn.py
 from __future__ import annotations
-import os, json, time, base64, threading, requests
+import os, json, time, base64, threading
 from typing import Optional, Dict, Any, List
 
+from lazy_import import lazy_module
+requests = lazy_module("requests")   # רק כשיש GitHub sync (lazy_import.py)
+
 ###############################################################################
 # מבוא
 # -----
@@ -137,6 +140,7 @@ class LearnerState:
           "persist": float,
           "tick_imb": float,
           "align_bonus": float,
+          "features": {...} (אופציונלי — feature_store.vector: ערכים + lags),
           "result": None/True/False
         }
 
@@ -210,11 +214,13 @@ class LearnerState:
         ema_spread: float,
         persist: float,
         tick_imb: float,
-        align_bonus: float
+        align_bonus: float,
+        features: Optional[Dict[str, Any]] = None
     ) -> int:
         """
         מוסיף סיגנל חדש (לפני שאתה יודע אם הצליח או לא).
         מחזיר אינדקס שלו כדי שנוכל לעדכן תוצאה אחר כך.
+        features: וקטור עשיר מה-feature store (כבר מחושב — בלי עלות נוספת).
         """
         sample = {
             "ts": time.time(),
@@ -231,6 +237,9 @@ class LearnerState:
             "result": None,  # יתעדכן ל-True/False אחרי שתדווח ✅/❌
         }
 
+        if features:
+            sample["features"] = features
+
         with self.lock:
             self.samples.append(sample)
             idx = len(self.samples) - 1
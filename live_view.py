@@ -0,0 +1,169 @@
+# live_view.py
+from __future__ import annotations
+import hashlib, os, threading, time
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from data_fetcher import wait_for_tick
+
+###############################################################################
+# תצוגת לייב: הודעת גרף אחת לצ'אט שמתרעננת ב-edit_message_media
+# ---------------------------------------------------------------
+# במקום ללחוץ 🖼️ שוב ושוב (רינדור + upload של תמונה חדשה בכל לחיצה):
+#
+# - LIVE.start(chat_id, message_id): ההודעה שנשלחה הופכת ל"חיה".
+# - run_forever: thread ברקע. כל view מתעדכן לכל היותר פעם ב-LIVE_INTERVAL_SEC
+#   (לא פחות מ-LIVE_MIN_INTERVAL_SEC — טלגרם מגביל עריכות לצ'אט), ורק אם:
+#     1. ה-cache key של הגרף השתנה (tick_seq חדש) — אחרת אין אפילו רינדור;
+#     2. ה-hash של התמונה שונה מזו שכבר בהודעה.
+#   429 מטלגרם -> הצ'אט מחכה retry_after; "message is not modified" = דילוג.
+# - בלי פעילות בצ'אט LIVE_IDLE_SEC (touch מכל הודעה / כפתור) -> עצירה אוטומטית.
+#   הודעה שנמחקה / שאי אפשר לערוך -> עצירה.
+###############################################################################
+
+LIVE_MIN_INTERVAL_SEC = 1.0
+LIVE_INTERVAL_SEC = max(LIVE_MIN_INTERVAL_SEC, float(os.getenv("LIVE_INTERVAL_SEC", "3")))
+LIVE_IDLE_SEC = float(os.getenv("LIVE_IDLE_SEC", "600"))
+
+
+class LiveView:
+    def __init__(self, chat_id: int, message_id: int, key: Hashable = None, img: bytes | None = None):
+        now = time.time()
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.started = now
+        self.last_active = now
+        self.last_edit = now            # השליחה הראשונה נחשבת עריכה (קצב)
+        self.next_allowed = 0.0         # אחרי 429: לא לפני retry_after
+        self.last_key = key
+        self.last_hash = _digest(img) if img else None
+        self.edits = 0
+
+    def due(self, now: float) -> bool:
+        return now >= max(self.last_edit + LIVE_INTERVAL_SEC, self.next_allowed)
+
+
+def _digest(img: bytes) -> bytes:
+    return hashlib.blake2b(img, digest_size=16).digest()
+
+
+def _retry_after(err: Exception) -> Optional[float]:
+    """retry_after של שגיאת 429 (ApiTelegramException) — None אם זו לא הגבלת קצב."""
+    if getattr(err, "error_code", None) != 429:
+        return None
+    params = (getattr(err, "result_json", None) or {}).get("parameters") or {}
+    return float(params.get("retry_after", 5))
+
+
+class LiveViewRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views: Dict[int, LiveView] = {}
+        self._wake = threading.Event()
+        self.edits = 0
+        self.skipped_seq = 0       # אותו tick_seq — בלי רינדור
+        self.skipped_same = 0      # רונדר, אבל התמונה זהה לזו שבהודעה
+        self.rate_limited = 0
+
+    def start(self, chat_id: int, message_id: int, key: Hashable = None,
+              img: bytes | None = None) -> Optional[LiveView]:
+        """רושם view חדש לצ'אט; מחזיר את הקודם (אם היה) כדי לסגור אותו."""
+        with self.lock:
+            old = self.views.get(chat_id)
+            self.views[chat_id] = LiveView(chat_id, message_id, key, img)
+        self._wake.set()
+        return old
+
+    def stop(self, chat_id: int) -> Optional[LiveView]:
+        with self.lock:
+            return self.views.pop(chat_id, None)
+
+    def touch(self, chat_id: int):
+        with self.lock:
+            v = self.views.get(chat_id)
+            if v is not None:
+                v.last_active = time.time()
+
+    def active(self, chat_id: int) -> bool:
+        with self.lock:
+            return chat_id in self.views
+
+    def _round(self, job, edit, on_stop):
+        now = time.time()
+        with self.lock:
+            views = list(self.views.values())
+        for v in views:
+            if now - v.last_active > LIVE_IDLE_SEC and self.stop(v.chat_id) is v:
+                on_stop(v, "idle")
+        due = [v for v in views if v.due(now) and self.active(v.chat_id)]
+        if not due:
+            return
+        key, render = job()
+        need = [v for v in due if v.last_key != key]
+        self.skipped_seq += len(due) - len(need)
+        if not need:
+            return
+        img = render()
+        h = _digest(img)
+        for v in need:
+            v.last_key = key
+            if v.last_hash == h:
+                self.skipped_same += 1
+                continue
+            v.last_edit = now
+            try:
+                edit(v, img)
+            except Exception as e:
+                wait = _retry_after(e)
+                if wait is not None:
+                    v.next_allowed = time.time() + wait
+                    v.last_key = None
+                    self.rate_limited += 1
+                elif "message is not modified" in str(e):
+                    v.last_hash = h
+                    self.skipped_same += 1
+                else:
+                    print("[LIVE VIEW] edit failed, stopping:", e)
+                    if self.stop(v.chat_id) is v:
+                        on_stop(v, "error")
+                continue
+            v.last_hash = h
+            v.edits += 1
+            self.edits += 1
+
+    def run_forever(self, job: Callable[[], Tuple[Hashable, Callable[[], bytes]]],
+                    edit: Callable[[LiveView, bytes], None],
+                    on_stop: Callable[[LiveView, str], None]):
+        """
+        job() -> (cache key של הגרף הנוכחי, render() -> bytes) — ה-key זול, הרינדור
+        רק אם צריך. edit(view, img) עורך את ההודעה; on_stop(view, reason) סוגר אותה.
+        """
+        gseq = 0
+        while True:
+            if not self.views:
+                self._wake.wait()
+                self._wake.clear()
+            try:
+                self._round(job, edit, on_stop)
+            except Exception as e:
+                print("[LIVE VIEW] exception:", e)
+            # מתעוררים על טיק חדש, אבל לא יותר מפעמיים בשנייה
+            gseq = wait_for_tick(gseq, timeout=LIVE_MIN_INTERVAL_SEC)
+            time.sleep(0.5)
+
+    def start_thread(self, job, edit, on_stop) -> threading.Thread:
+        t = threading.Thread(target=self.run_forever, args=(job, edit, on_stop), daemon=True)
+        t.start()
+        return t
+
+    def status_line(self) -> str:
+        with self.lock:
+            n = len(self.views)
+        return (
+            f"Live view: {n} active | every {LIVE_INTERVAL_SEC:g}s | edits {self.edits} | "
+            f"skipped same-seq {self.skipped_seq} / same-image {self.skipped_same} | "
+            f"429 {self.rate_limited}"
+        )
+
+
+# אינסטנס גלובלי (כמו STREAMS / FEATURES)
+LIVE = LiveViewRegistry()
@@ -1,20 +1,35 @@
 # main.py
 from __future__ import annotations
-import os, sys, time, socket, io, collections, threading
+import os, sys, time, socket, collections, threading
+from lazy_import import STARTUP, STARTUP_BENCH   # ראשון: שעון העלייה מתחיל כאן
 import telebot
 from telebot import types
 from telebot.apihelper import delete_webhook, ApiTelegramException
 
-from data_fetcher import STATE, start_fetcher_in_thread, HAS_LIVE_KEY
+from data_fetcher import STATE, start_fetcher_in_thread, HAS_LIVE_KEY, wait_for_tick, wait_for_first_tick, add_tick_listener
+from data_fetcher import ticks_for, symbol_seq, set_current_symbol
 from pocket_map import PO_TO_FINNHUB, DEFAULT_SYMBOL
-from strategy import decide_from_ticks, CFG as STRAT_CFG
+from strategy import decide_from_ticks, CFG as STRAT_CFG, cfg_version, bump_cfg_version
+from strategy import load_presets, apply_preset, PRESETS, quality_label, state_for, cfg_for
+from tick_history import TICK_HISTORY_DIR, TickRecorder
+from stream_state import STREAMS
+from feature_store import FEATURES
+from decision_cache import DECISIONS
+from ensemble import heads_line
+from scanner import Scanner, SCAN_ENABLED, SCAN_INTERVAL_SEC, rank_in
+from window_selector import SelectorRegistry, SELECTOR_ENABLED
+from quantiles import SKETCHES, QUANTILE_PATH
+from correlation import CorrelationMatrix
+from market_guard import GUARDS
+from metrics import LatencyTracker
 from auto_trader import AutoTrader
 from learn import LEARNER
 from learn import init_learner_from_remote
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-from matplotlib.ticker import FormatStrFormatter
+from charts import CHARTS, ChartData, ChartOutput, output_for, window_ticks
+from charts import DASH_COLS, Sparkline, sparkline
+from candles import CANDLES
+from live_view import LIVE
+STARTUP.mark("imports")
 
 
 # =========================================================
@@ -23,99 +38,17 @@ from matplotlib.ticker import FormatStrFormatter
 CANDLE_CHOICES = [("10s",10),("15s",15),("30s",30),("1m",60),("2m",120),("3m",180),("5m",300)]
 TRADE_CHOICES  = [("10s",10),("30s",30),("1m",60),("2m",120),("3m",180),("5m",300)]
 WINDOW_CHOICES = [16,22,26,30,45,60,90]
-CHART_MODES    = ["CANDLE","LINE"]
-
-
-# =========================================================
-# MarketGuardState
-# מנהל מצב שוק (NORMAL / CAUTION / REVERSAL)
-# עוצר מסחר אוטומטי בקירור, מאריך קירור אם צריך,
-# ושולח התראות כשמשהו מסוכן או כשחזר להיות בטוח.
-# =========================================================
-class MarketGuardState:
-    def __init__(self):
-        self.mode: str = "NORMAL"           # NORMAL / CAUTION / REVERSAL
-        self.last_change_ts: float = 0.0     # מתי נכנסנו למצב הזה
-        self.last_alert_mode: str = "NORMAL" # כדי לא להציף באותו טקסט שוב
-        self.cooldown_override_until: float = 0.0  # תוספת זמן קירור אם עדיין מסוכן
-
-    def _base_cooldown(self) -> float:
-        if self.mode == "CAUTION":
-            return 60.0        # עצירה ~דקה
-        if self.mode == "REVERSAL":
-            return 300.0       # עצירה ~5 דקות
-        return 0.0
-
-    def cooldown_active(self) -> bool:
-        """
-        האם עדיין אסור לסחור אוטומטית.
-        מתקבל ע"י הזמן שעבר מאז שנכנסנו למצב + הארכות.
-        """
-        now = time.time()
-        base_left = self._base_cooldown() - (now - self.last_change_ts)
-        extra_left = self.cooldown_override_until - now
-        return (base_left > 0) or (extra_left > 0)
-
-    def status_line(self) -> str:
-        if self.mode == "NORMAL":
-            return "MarketGuard: ✅ Normal"
-        elif self.mode == "CAUTION":
-            return "MarketGuard: ⚠️ Caution (cooldown active)" if self.cooldown_active() else "MarketGuard: ⚠️ Caution (cooldown done)"
-        else:
-            return "MarketGuard: ⛔ Reversal (cooldown active)" if self.cooldown_active() else "MarketGuard: ⛔ Reversal (cooldown done)"
-
-    def set_mode(self, new_mode: str, extend: bool=False) -> bool:
-        """
-        מחזיר True אם עברנו למצב אחר.
-        extend=True -> אם כבר במצב CAUTION/REVERSAL פשוט מאריך את הקירור.
-        """
-        now = time.time()
-
-        # אותו מצב שוב -> אולי רק להאריך קירור
-        if new_mode == self.mode:
-            if extend and new_mode == "REVERSAL":
-                self.cooldown_override_until = max(self.cooldown_override_until, now + 120.0)
-            if extend and new_mode == "CAUTION":
-                self.cooldown_override_until = max(self.cooldown_override_until, now + 30.0)
-            return False
-
-        # עברנו למצב חדש
-        self.mode = new_mode
-        self.last_change_ts = now
-
-        # אתחול קירור בהתחלה
-        if new_mode == "NORMAL":
-            self.cooldown_override_until = 0.0
-        elif new_mode == "CAUTION":
-            self.cooldown_override_until = now + 30.0
-        elif new_mode == "REVERSAL":
-            self.cooldown_override_until = now + 120.0
 
-        return True
-
-    def should_notify_change(self) -> str | None:
-        """
-        אם המצב השתנה מאז ההתראה האחרונה -> מחזיר טקסט התראה חד-פעמי.
-        גם מעדכן last_alert_mode כדי לא להציף.
-        """
-        if self.mode != self.last_alert_mode:
-            self.last_alert_mode = self.mode
-            if self.mode == "CAUTION":
-                return (
-                    "⚠️ זיהיתי תנאי שוק לא יציבים.\n"
-                    "אני עוצר כניסות אגרסיביות לזמן קצר כדי להימנע מהיפוך פתאומי."
-                )
-            if self.mode == "REVERSAL":
-                return (
-                    "⛔ היפוך מגמה חריף!\n"
-                    "עצרתי כניסות אוטומטיות לחמש דקות (ואאריך אם צריך)."
-                )
-            if self.mode == "NORMAL":
-                return (
-                    "✅ השוק נרגע וחזר להתייצב.\n"
-                    "אני חוזר לפעול כרגיל."
-                )
-        return None
+# כל הסימבולים הייחודיים (לסורק), ושם PO מייצג לכל אחד (הראשון במפה)
+SCAN_SYMBOLS = list(dict.fromkeys(PO_TO_FINNHUB.values()))
+SYMBOL_TO_PO: dict[str, str] = {}
+for _po, _sym in PO_TO_FINNHUB.items():
+    SYMBOL_TO_PO.setdefault(_sym, _po)
+CHART_MODES    = ["CANDLE","LINE"]
+CANDLE_SHOW_BARS = int(os.getenv("CANDLE_SHOW_BARS", "80"))
+DASH_MAX = int(os.getenv("DASH_MAX", "12"))                 # ספארקליינים בדשבורד
+DASH_WINDOW_SEC = float(os.getenv("DASH_WINDOW_SEC", "300"))
+MTF_CONTEXT_MULT = int(os.getenv("MTF_CONTEXT_MULT", "5"))   # TF ההקשר = פי כמה מ-TF הנרות
 
 
 # =========================================================
@@ -144,7 +77,10 @@ class BotState:
         self.session_mode: str = "PHONE"  # PHONE / PC
         self.last_signal_idx = None       # אינדקס סיגנל שמחכה ל✅/❌
 
-        self.guard = MarketGuardState()   # Market safety
+    @property
+    def guard(self):
+        """Market safety של הנכס הנוכחי (market_guard.GUARDS — guard לכל סימבול)."""
+        return GUARDS.get(self.finnhub_symbol)
 
 APP = BotState()
 AUTO = AutoTrader()
@@ -157,6 +93,18 @@ _fetcher_started = False
 BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "").strip()
 CHAT_LOCK = os.getenv("TELEGRAM_CHAT_ID", "").strip()
 SINGLETON_PORT = int(os.getenv("SINGLETON_PORT","47653"))
+STRAT_PRESETS_PATH = os.getenv("STRAT_PRESETS_PATH", "strategy_presets.json").strip()
+
+# auto_loop מונע-אירועים: debounce = שקט בין טיקים שמאפשר לאחד אותם להערכה אחת,
+# max_delay = חסם עליון מהטיק הראשון ועד ההחלטה (גם כשהטיקים לא מפסיקים)
+AUTO_DEBOUNCE_SEC  = float(os.getenv("AUTO_DEBOUNCE_MS", "150")) / 1000.0
+AUTO_MAX_DELAY_SEC = float(os.getenv("AUTO_MAX_DELAY_MS", "500")) / 1000.0
+
+# סורק: מסחר אוטומטי רק אם הנכס הנוכחי בין K ההזדמנויות המובילות (0 = כבוי)
+SCAN_GATE_TOP_K = int(os.getenv("SCAN_GATE_TOP_K", "0"))
+# בדיקות gate רצופות בלי סריקה טרייה עד שה-gate נסגר (הסורק תקוע; 0 = לא נסגר)
+SCAN_GATE_STALE_MAX = int(os.getenv("SCAN_GATE_STALE_MAX", "30"))
+SCAN_SHOW_TOP = int(os.getenv("SCAN_SHOW_TOP", "10"))
 
 if not BOT_TOKEN:
     raise RuntimeError("Missing TELEGRAM_BOT_TOKEN")
@@ -191,12 +139,22 @@ def ensure_fetcher():
     """מתחיל למשוך נתוני מחיר (websocket וכו') פעם אחת."""
     global _fetcher_started
     if not _fetcher_started:
-        start_fetcher_in_thread(lambda: APP.finnhub_symbol)
+        add_tick_listener(STREAMS.on_tick)
+        if SELECTOR_ENABLED:
+            add_tick_listener(SELECTORS.on_tick)
+        add_tick_listener(CORR.on_tick)
+        add_tick_listener(CANDLES.on_tick)
+        if TICK_HISTORY_DIR:
+            add_tick_listener(TickRecorder(TICK_HISTORY_DIR).on_tick)
+        start_fetcher_in_thread(lambda: APP.finnhub_symbol, SCAN_SYMBOLS if SCAN_ENABLED else ())
         _fetcher_started = True
 
 def allowed(msg) -> bool:
     """נ鎙ל לשמור שהבוט עונה רק לך אם נתת CHAT_LOCK."""
-    return (not CHAT_LOCK) or (str(msg.chat.id) == CHAT_LOCK)
+    ok = (not CHAT_LOCK) or (str(msg.chat.id) == CHAT_LOCK)
+    if ok:
+        LIVE.touch(msg.chat.id)   # כל הודעה = פעילות (תצוגת לייב לא נעצרת)
+    return ok
 
 def _today_key() -> str:
     return time.strftime("%Y-%m-%d", time.localtime())
@@ -206,6 +164,8 @@ def cur_cfg() -> AssetConfig:
 
 def refresh_symbol():
     APP.finnhub_symbol = PO_TO_FINNHUB.get(APP.po_asset, DEFAULT_SYMBOL)
+    set_current_symbol(APP.finnhub_symbol)
+    apply_preset(APP.finnhub_symbol)  # preset מה-sweep (אם יש) — ה-sync שאחרי מבטל מטמון
 
 def _fmt(x, fmt=".4g"):
     try:
@@ -223,49 +183,248 @@ def _price_decimals(po_asset: str) -> int:
 
 
 # =========================================================
-# יצירת גרף מחיר קטן לתמונה
+# יצירת גרף מחיר קטן לתמונה (charts.py: figure ממוחזר + cache של PNG)
 # =========================================================
-def make_price_png(ticks, window_sec: float, po_asset: str):
-    now = time.time()
-    win = [(ts, p) for (ts,p) in list(ticks) if now - ts <= window_sec]
-    if len(win) < 6:
-        win = list(ticks)[-6:]  # fallback
-
-    buf = io.BytesIO()
-    fig = plt.figure(figsize=(6.6,3.2))
-    plt.clf()
-
-    if not win:
-        plt.title("No data yet")
-        plt.xlabel("time [sec]")
-        plt.ylabel("price")
-        fig.tight_layout()
-        fig.savefig(buf, format="png", dpi=140)
-        plt.close(fig)
-        return buf.getvalue()
-
-    xs = [ts - win[0][0] for (ts,_) in win]
-    ys = [p for (_,p) in win]
-    last_price = ys[-1]
-
-    plt.plot(xs, ys, linewidth=2.0, label="Price")
-    plt.axhline(last_price, linestyle="--", linewidth=1.2, label="Last Price")
-    plt.xlabel("time [sec]")
-    dec = _price_decimals(po_asset)
-    plt.gca().yaxis.set_major_formatter(FormatStrFormatter(f"%.{dec}f"))
-    plt.ylabel("price")
-    plt.grid(True, linestyle="--", alpha=0.35)
-    plt.legend(loc="best", frameon=True)
-    plt.title("Last ~window price view")
-    fig.tight_layout()
-    fig.savefig(buf, format="png", dpi=140)
-    plt.close(fig)
-    return buf.getvalue()
+def chart_indicators(symbol: str):
+    """
+    (ts, EMA מהיר, EMA איטי, RSI) כפי שה-feature store פרסם בהחלטה האחרונה —
+    אותן סדרות של האסטרטגיה, בלי חישוב מחדש. ה-ts = טיקי חלון ההחלטה.
+    """
+    store = FEATURES.get(symbol)
+    ema_fast = store.get("ema_fast_line") or []
+    ema_slow = store.get("ema_slow_line") or []
+    rsi = store.get("rsi_line") or []
+    m = max(len(ema_fast), len(rsi))
+    ts = [t for t, _ in ticks_for(symbol) if t <= store.ts][-m:] if m else []
+    return ts, ema_fast, ema_slow, rsi
+
+def chart_signals(symbol: str, t0: float):
+    """[(ts, side)] של סיגנלים שנשלחו על הנכס מאז t0 (מה-learner)."""
+    po = po_name_for(symbol)
+    out = []
+    with LEARNER.lock:
+        for s in reversed(LEARNER.samples):
+            if s.get("ts", 0) < t0:
+                break
+            if s.get("asset") == po and s.get("side") in ("UP", "DOWN"):
+                out.append((s["ts"], s["side"]))
+    return out[::-1]
+
+def chart_job(symbol: str, window_sec: float, mode: str | None = None, tf: int | None = None):
+    """
+    (cache key, סוג גרף, build) לגרף הנכס. ה-key זול (tick_seq, תצוגה, מספר
+    הסיגנלים ב-learner, פורמט); build() מכין את ה-ChartData (חלון טיקים / נרות,
+    קווי ה-feature store, רג'ים, סיגנלים) — רק כשאין פגיעה ב-cache.
+    הרינדור עצמו ב-CHARTS (process pool), כל השכבות ב-figure אחד.
+    CANDLE: CANDLE_SHOW_BARS נרות אחרונים ב-TF של הנכס (מצטברים מראש ב-candles.py).
+    mode / tf: דריסה של מצב התרשים / TF הנרות של הנכס (לחבילת רב-TF).
+    """
+    cfg = cur_cfg()
+    if (mode or cfg.chart_mode) == "CANDLE":
+        tf = int(tf or cfg.candle_tf_sec)
+        view = f"CANDLE:{tf}"
+    else:
+        tf, view = None, "LINE"
+    out = output_for(APP.session_mode)
+    key = (symbol, symbol_seq(symbol), window_sec, view, len(LEARNER.samples), out)
+
+    def build():
+        scfg = cfg_for(symbol)
+        ind_ts, ema_fast, ema_slow, rsi = chart_indicators(symbol)
+        data = ChartData(decimals=_price_decimals(po_name_for(symbol)), ind_ts=ind_ts,
+                         ema_fast=ema_fast, ema_slow=ema_slow, rsi=rsi,
+                         rsi_levels=(float(scfg["MR_RSI_LOW"]), float(scfg["MR_RSI_HIGH"])))
+        if tf:
+            data.bars, data.tf_sec = CANDLES.bars(symbol, tf, ticks_for(symbol), CANDLE_SHOW_BARS), tf
+            t0, t1 = (data.bars[0][0], data.bars[-1][0] + tf) if data.bars else (0.0, 0.0)
+        else:
+            data.ticks = window_ticks(ticks_for(symbol), window_sec)
+            t0, t1 = (data.ticks[0][0], data.ticks[-1][0]) if data.ticks else (0.0, 0.0)
+        if t1:
+            data.regimes = STREAMS.get(symbol).regime.spans(t0, t1)
+            data.signals = chart_signals(symbol, t0)
+        return data, out
+
+    return key, "market", build
+
+def price_png(symbol: str, window_sec: float) -> bytes:
+    """גרף הנכס הנוכחי (סינכרוני) — מה-cache אם לא הגיע טיק מאז הרינדור הקודם."""
+    key, kind, build = chart_job(symbol, window_sec)
+    return CHARTS.cached(key, lambda: CHARTS.render(kind, *build()))
+
+def price_png_async(symbol: str, window_sec: float):
+    """Future של ה-PNG — ה-handler לא מחכה לרינדור, ופגיעה ב-cache לא מכינה נתונים."""
+    key, kind, build = chart_job(symbol, window_sec)
+    return CHARTS.cached_async_lazy(key, kind, build)
+
+def send_chart_photo(chat_id, img: bytes, out: ChartOutput | None = None, **kwargs):
+    """
+    send_photo עם file_id cache: תמונה שכבר עלתה נשלחת לפי file_id (בלי upload).
+    file_id שטלגרם דוחה נזרק מה-cache ונשלח upload רגיל.
+    """
+    CHARTS.record_size(img, out or CHARTS.last_output)
+    fid = CHARTS.file_ids.get(img)
+    if fid:
+        try:
+            return bot.send_photo(chat_id, fid, **kwargs)
+        except ApiTelegramException as e:
+            print("[CHART SEND] file_id rejected, uploading:", e)
+            CHARTS.file_ids.drop(img)
+    t0 = time.perf_counter()
+    sent = bot.send_photo(chat_id, img, **kwargs)
+    CHARTS.upload_time.record(time.perf_counter() - t0)
+    if sent is not None and sent.photo:
+        CHARTS.file_ids.put(img, sent.photo[-1].file_id)
+    return sent
+
+def send_chart_when_ready(chat_id, fut, caption: str | None = None, reply_to: int | None = None,
+                          reply_markup=None):
+    """שולח את הגרף כהודעת המשך ברגע שהרינדור מסתיים (callback של ה-Future)."""
+    out = output_for(APP.session_mode)
+    def _send(f):
+        try:
+            send_chart_photo(chat_id, f.result(), out, caption=caption, reply_to_message_id=reply_to,
+                             reply_markup=reply_markup)
+        except Exception as e:
+            print("[CHART SEND] exception:", e)
+    fut.add_done_callback(_send)
+
+
+# =========================================================
+# דשבורד: ספארקליינים לכמה נכסים ב-figure אחד (charts.SparklineGrid)
+# =========================================================
+def dashboard_symbols():
+    """הנכס הנוכחי, אחריו לפי דירוג הסורק, ואז השאר — רק סימבולים עם טיקים."""
+    order = [APP.finnhub_symbol] + [r.symbol for r in SCANNER.rows] + list(subscribed_symbols())
+    return [s for s in dict.fromkeys(order) if symbol_seq(s)][:DASH_MAX]
+
+def dashboard_job():
+    """
+    (cache key, סוג גרף, build) — ה-key הוא וקטור ה-tick_seq של הנכסים, כך שבקשה
+    חוזרת בלי טיק חדש באף נכס היא פגיעה ב-cache (בלי החלטות / דילול / רינדור).
+    """
+    syms = dashboard_symbols()
+    out = output_for(APP.session_mode)
+    rows = max(1, -(-len(syms) // DASH_COLS))
+    key = ("dashboard", tuple((s, symbol_seq(s)) for s in syms), DASH_WINDOW_SEC, out)
+
+    def build():
+        now = time.time()
+        panels = []
+        for s in syms:
+            info = get_decision_for(s)
+            xs, ys = sparkline(ticks_for(s), DASH_WINDOW_SEC, now=now)
+            po = po_name_for(s)
+            panels.append(Sparkline(po, xs, ys, info["side"], int(info["conf"]), _price_decimals(po)))
+        return panels, DASH_WINDOW_SEC, out
+    return syms, key, f"dashboard:{rows}", build
+
+
+# =========================================================
+# חבילת רב-TF: טיקים / נרות ב-TF של הנכס / נרות הקשר — media group אחד
+# =========================================================
+def mtf_jobs(symbol: str):
+    """
+    שלושת הגרפים מאותו MarketChart (אותו עיצוב צירים ופריסה) ומאותם cache keys
+    של 🖼️ / לייב — תצוגה שכבר רונדרה לא מתרנדרת שוב.
+    """
+    cfg = cur_cfg()
+    window = effective_window(symbol)
+    tf = int(cfg.candle_tf_sec)
+    return [
+        ("Ticks", chart_job(symbol, window, "LINE")),
+        (f"{tf}s", chart_job(symbol, window, "CANDLE", tf)),
+        (f"{tf * MTF_CONTEXT_MULT}s", chart_job(symbol, window, "CANDLE", tf * MTF_CONTEXT_MULT)),
+    ]
+
+def send_chart_group(chat_id, imgs: list, captions: list):
+    """
+    send_media_group בקריאה אחת; תמונות שכבר עלו נשלחות לפי file_id.
+    file_id שטלגרם דוחה מפיל את כל הקבוצה -> ה-file_ids שלה נזרקים מה-cache
+    ושולחים שוב פעם אחת עם ה-bytes (כמו send_chart_photo).
+    """
+    out = output_for(APP.session_mode)
+    fids = [CHARTS.file_ids.get(img) for img in imgs]
+    for img in imgs:
+        CHARTS.record_size(img, out)
+
+    def media():
+        return [types.InputMediaPhoto(fid or img, caption=cap) for img, fid, cap in zip(imgs, fids, captions)]
+    t0 = time.perf_counter()
+    try:
+        sent = bot.send_media_group(chat_id, media())
+    except ApiTelegramException as e:
+        if not any(fids):
+            raise
+        print("[CHART SEND] file_id rejected in media group, uploading:", e)
+        for img, fid in zip(imgs, fids):
+            if fid:
+                CHARTS.file_ids.drop(img)
+        fids = [None] * len(imgs)
+        t0 = time.perf_counter()
+        sent = bot.send_media_group(chat_id, media())
+    if not all(fids):
+        CHARTS.upload_time.record(time.perf_counter() - t0)
+    for img, fid, m in zip(imgs, fids, sent or []):
+        if fid is None and m.photo:
+            CHARTS.file_ids.put(img, m.photo[-1].file_id)
+    return sent
+
+
+# =========================================================
+# תצוגת לייב (live_view.py): הודעת גרף אחת שמתעדכנת ב-edit_message_media
+# =========================================================
+def live_keyboard():
+    kb = types.InlineKeyboardMarkup()
+    kb.add(types.InlineKeyboardButton("⏹ עצור", callback_data="live::stop"),
+           types.InlineKeyboardButton("⏱ המשך", callback_data="live::keep"))
+    return kb
+
+def live_caption() -> str:
+    return f"📺 {APP.po_asset} • live • {time.strftime('%H:%M:%S')}"
+
+def live_job():
+    """
+    (key זול, render) לגרף הנכס הנוכחי: בלי טיק חדש / שינוי תצוגה ה-key זהה
+    ואין אפילו הכנת ChartData.
+    """
+    symbol = APP.finnhub_symbol
+    key, kind, build = chart_job(symbol, effective_window(symbol))
+    return key, lambda: CHARTS.cached_async_lazy(key, kind, build).result(timeout=30)
+
+def live_edit(view, img: bytes):
+    """edit_message_media; תמונה שכבר עלתה נשלחת לפי file_id."""
+    CHARTS.record_size(img, output_for(APP.session_mode))
+    fid = CHARTS.file_ids.get(img)
+    media = types.InputMediaPhoto(fid or img, caption=live_caption())
+    t0 = time.perf_counter()
+    msg = bot.edit_message_media(media, chat_id=view.chat_id, message_id=view.message_id,
+                                 reply_markup=live_keyboard())
+    if fid is None:
+        CHARTS.upload_time.record(time.perf_counter() - t0)
+        if isinstance(msg, types.Message) and msg.photo:
+            CHARTS.file_ids.put(img, msg.photo[-1].file_id)
+
+def live_stopped(view, reason: str):
+    why = "אין פעילות" if reason == "idle" else ("נעצר" if reason == "user" else "שגיאה")
+    try:
+        bot.edit_message_caption(f"⏹ לייב הסתיים ({why}) • {view.edits} עדכונים",
+                                 chat_id=view.chat_id, message_id=view.message_id, reply_markup=None)
+    except Exception as e:
+        print("[LIVE VIEW] close failed:", e)
 
 
 # =========================================================
 # סנכרון בין זמן עסקה / TF / חלון ניתוח
 # =========================================================
+def mark_config_changed():
+    """
+    כל שינוי ב-STRAT_CFG / AssetConfig עובר כאן:
+    גרסת קונפיג חדשה -> החלטות שמורות כבר לא תקפות.
+    """
+    bump_cfg_version()
+    DECISIONS.invalidate()
+
 def _nearest_choice(val: int, options: list[int]) -> int:
     return min(options, key=lambda c: abs(c - val))
 
@@ -287,6 +446,7 @@ def sync_from_tf_trade():
 
     STRAT_CFG["WINDOW_SEC"] = float(wnd)
     STRAT_CFG["EXPIRY"] = f"{tx}s" if tx < 60 else f"{int(tx/60)}m"
+    mark_config_changed()
 
 def sync_from_window():
     """
@@ -312,6 +472,7 @@ def sync_from_window():
         if cfg.trade_expiry_sec < 60
         else f"{int(cfg.trade_expiry_sec/60)}m"
     )
+    mark_config_changed()
 
 def recommend_from_expiry(expiry_sec: int):
     """
@@ -336,13 +497,6 @@ def recommend_from_expiry(expiry_sec: int):
 # =========================================================
 # דירוג איכות סיגנל
 # =========================================================
-def quality_label(conf: int, align_bonus: float) -> str:
-    if conf >= 75 or align_bonus >= 0.2:
-        return "🟩 Strong"
-    if conf >= 65:
-        return "🟨 Medium"
-    return "🟥 Weak"
-
 def multi_timeframe_agree(dbg: dict) -> bool:
     s_short = dbg.get("side_short")
     s_mid   = dbg.get("side_mid")
@@ -355,6 +509,9 @@ def multi_timeframe_agree(dbg: dict) -> bool:
 # =========================================================
 # זיהוי מצב שוק -> NORMAL / CAUTION / REVERSAL
 # =========================================================
+RISK_FLAT_SLOPE = 0.00001
+RISK_COUNTER_SLOPE = 0.00005
+
 def evaluate_market_risk(info: dict) -> str:
     side       = info["side"]
     conf       = info["conf"]
@@ -368,23 +525,30 @@ def evaluate_market_risk(info: dict) -> str:
     if side not in ("UP","DOWN"):
         return "CAUTION"
 
+    # הגלאי המתגלגל (regime.py) רואה הלם -> זהירות
+    if info.get("regime") == "SHOCK":
+        return "CAUTION"
+
     # Strong אבל אין הסכמה בין כל הטווחים -> מתחיל להישבר מבפנים
     if qual == "🟩 Strong" and not agree3:
         return "CAUTION"
 
     # slope ~ 0 אבל conf גבוה => "אני בטוח" בלי תנועה בפועל = חשוד
+    # (הספים: אחוזוני |slope| של הסימבול מ-quantiles.py, או הקבועים)
+    flat_slope = info.get("flat_slope", RISK_FLAT_SLOPE)
+    counter_slope = info.get("counter_slope", RISK_COUNTER_SLOPE)
     if slope is not None:
         try:
             s = float(slope)
         except:
             s = 0.0
-        if abs(s) < 0.00001 and conf >= 70:
+        if abs(s) < flat_slope and conf >= 70:
             return "CAUTION"
 
         # כיוון הסיגנל נגד השיפוע החזק = היפוך מגמה
-        if side == "UP" and s < 0 and abs(s) > 0.00005:
+        if side == "UP" and s < 0 and abs(s) > counter_slope:
             return "REVERSAL"
-        if side == "DOWN" and s > 0 and abs(s) > 0.00005:
+        if side == "DOWN" and s > 0 and abs(s) > counter_slope:
             return "REVERSAL"
 
     # persist נמוך מאוד + confidence גבוה => פאזה חדשה/פריצה חדה => מסוכן
@@ -418,8 +582,9 @@ def phone_menu():
     kb.add(types.KeyboardButton("📊 נכס"))
     kb.add(types.KeyboardButton("📈 מצב תרשים"), types.KeyboardButton("⏳ זמן עסקה"))
     kb.add(types.KeyboardButton("🕒 זמן נר"), types.KeyboardButton("🪟 חלון ניתוח"))
-    kb.add(types.KeyboardButton("🧠 סיגנל"), types.KeyboardButton("🖼️ ויזואל"))
+    kb.row(types.KeyboardButton("🧠 סיגנל"), types.KeyboardButton("🖼️ ויזואל"), types.KeyboardButton("🗂️ רב-TF"))
     kb.add(types.KeyboardButton("🛰️ סטטוס"), types.KeyboardButton("📈 ביצועים"))
+    kb.row(types.KeyboardButton("🔎 סורק"), types.KeyboardButton("📋 דשבורד"), types.KeyboardButton("📺 לייב"))
     kb.add(types.KeyboardButton("✅ פגיעה"), types.KeyboardButton("❌ החטאה"))
     kb.add(types.KeyboardButton("📘 הוראות"))
     return kb
@@ -429,8 +594,9 @@ def pc_menu():
     kb.add(types.KeyboardButton("📊 נכס"))
     kb.add(types.KeyboardButton("📈 מצב תרשים"), types.KeyboardButton("⏳ זמן עסקה"))
     kb.add(types.KeyboardButton("🕒 זמן נר"), types.KeyboardButton("🪟 חלון ניתוח"))
-    kb.add(types.KeyboardButton("🧠 סיגנל"), types.KeyboardButton("🖼️ ויזואל"))
+    kb.row(types.KeyboardButton("🧠 סיגנל"), types.KeyboardButton("🖼️ ויזואל"), types.KeyboardButton("🗂️ רב-TF"))
     kb.add(types.KeyboardButton("🛰️ סטטוס"), types.KeyboardButton("📈 ביצועים"))
+    kb.row(types.KeyboardButton("🔎 סורק"), types.KeyboardButton("📋 דשבורד"), types.KeyboardButton("📺 לייב"))
     kb.add(types.KeyboardButton("🤖 מסחר אוטומטי"), types.KeyboardButton("⚙️ Auto-Settings"))
     
     # --- שדרוג: כפתורי מסחר ידני ---
@@ -552,11 +718,41 @@ def adapt_thresholds_from_learning():
 
 # =========================================================
 # ניתוח סיגנל מהאסטרטגיה (strategy.decide_from_ticks)
+# ממואיזציה לפי (symbol, tick_seq של הסימבול, cfg_version, חלון) — בלי טיק חדש אין חישוב חדש
+# כל סימבול עם buffer, stream, StrategyState ו-preset משלו (הסורק מעריך את כולם)
+# החלון: מה שהבורר האוטומטי בחר לסימבול (AUTO_WINDOW), אחרת WINDOW_SEC הרגיל
+# ספי vol/slope: אחוזונים של הסימבול (quantiles.py) אחרי warm-up, אחרת הקבועים
 # =========================================================
 def get_decision():
-    side, conf, dbg = decide_from_ticks(STATE["ticks"])
+    return get_decision_for(APP.finnhub_symbol)
+
+def get_decision_for(symbol: str):
+    window = effective_window(symbol)
+    seq = symbol_seq(symbol)
+    key = (symbol, seq, cfg_version(), window)
+    return DECISIONS.get_or_compute(key, lambda: _compute_decision(symbol, window, seq))
+
+def _compute_decision(symbol: str, window: float, seq: int):
+    stream = STREAMS.get(symbol)
+    store = FEATURES.get(symbol)
+    sketches = SKETCHES.get(symbol)
+    cfg = sketches.resolve(cfg_for(symbol))
+    cfg["WINDOW_SEC"] = window
+    side, conf, dbg = decide_from_ticks(
+        ticks_for(symbol), stream, state_for(symbol), cfg, store
+    )
+    sketches.update(vol=dbg.get("vol"), slope=dbg.get("trend_slope"),
+                    spread=dbg.get("ema_spread"), tick_rate=store.get("tick_rate"))
+
+    # אישור / סתירה מנכסים מתואמים: ±BONUS_XASSET*100 נק' לכל היותר
+    xasset = CORR.confirmation(symbol, side)
+    if side in ("UP", "DOWN") and xasset:
+        conf = int(max(cfg["CONF_MIN"], min(cfg["CONF_MAX"], conf + 100.0 * cfg["BONUS_XASSET"] * xasset)))
 
     q = quality_label(conf, float(dbg.get("align_bonus",0.0)))
+    if SELECTOR_ENABLED:
+        # 3 טווחי זמן = החלון הקצר / הנבחר / הארוך מההערכה האחרונה של הבורר
+        dbg["side_short"], dbg["side_mid"], dbg["side_long"] = SELECTORS.get(symbol).sides()
     agree3 = multi_timeframe_agree(dbg)
     strong_ok = (q == "🟩 Strong" and agree3)
 
@@ -573,10 +769,107 @@ def get_decision():
         "tick_imb": dbg.get("tick_imb"),
         "align_bonus": dbg.get("align_bonus"),
         "penalty": dbg.get("penalty"),
+        "heads": dbg.get("heads"),
+        "regime": dbg.get("regime") or (stream.regime.current if stream.regime.seen else None),
         "strong_ok": strong_ok,
+        "flat_slope": sketches.threshold("RISK_FLAT_SLOPE", RISK_FLAT_SLOPE),
+        "counter_slope": sketches.threshold("RISK_COUNTER_SLOPE", RISK_COUNTER_SLOPE),
+        "vol_guard": cfg["VOL_GUARD"],
+        "xasset": xasset,
+        "seq": seq,
     }
 
 
+# =========================================================
+# סורק כל הנכסים (scanner.py)
+# =========================================================
+def scan_health(symbol: str):
+    """(גיל הטיק האחרון, טיקים בחלון, מרווח טיקים ממוצע) — לבריאות הפיד."""
+    now = time.time()
+    last = STATE["last_tick_ts_by_symbol"].get(symbol)
+    stream = STREAMS.get(symbol)
+    n = stream.size(now)
+    interval = (stream.window_sec / (n - 1)) if n > 1 else None
+    return ((now - last) if last else None), n, interval
+
+SCANNER = Scanner(SCAN_SYMBOLS, get_decision_for, scan_health)
+
+
+# =========================================================
+# בורר חלון ניתוח אוטומטי (window_selector.py)
+# =========================================================
+SELECTORS = SelectorRegistry(WINDOW_CHOICES)
+
+# קורלציה / lead-lag בין כל הסימבולים שנרשמים אליהם (correlation.py)
+CORR = CorrelationMatrix(SCAN_SYMBOLS)
+
+
+# =========================================================
+# MarketGuard פר נכס ברקע (market_guard.py)
+# =========================================================
+def subscribed_symbols():
+    return SCAN_SYMBOLS if SCAN_ENABLED else [APP.finnhub_symbol]
+
+def guard_risk(symbol: str) -> str:
+    return evaluate_market_risk(get_decision_for(symbol))
+
+def on_guard_change(symbol: str, guard):
+    """
+    התראת שינוי מצב — רק לנכס הנוכחי (לשאר: כשייבחרו, דרך should_notify_change),
+    ורק ב-PC עם מסחר אוטומטי פעיל (כמו auto_evaluate). אחרת המצב מתעדכן בשקט
+    ב-GUARDS וההתראה תצא עם הסיגנל הבא שיתבקש.
+    """
+    if symbol != APP.finnhub_symbol or not CHAT_LOCK:
+        return
+    if APP.session_mode != "PC" or not AUTO.state.enabled:
+        return
+    note = guard.should_notify_change()
+    if note:
+        try:
+            bot.send_message(CHAT_LOCK, note, reply_markup=current_menu())
+        except Exception:
+            pass
+
+def guards_line() -> str:
+    with GUARDS.lock:
+        guards = list(GUARDS.guards.items())
+    hot = [f"{po_name_for(s)} {g.mode[0]}" for s, g in guards if g.cooldown_active()]
+    return f"Guards: {len(guards)} assets | cooldown: {', '.join(hot) if hot else 'none'}"
+
+def effective_window(symbol: str) -> float:
+    auto = SELECTORS.window_for(symbol) if SELECTOR_ENABLED else None
+    return float(auto) if auto else float(cfg_for(symbol)["WINDOW_SEC"])
+
+def expiry_for(symbol: str) -> float:
+    return float(APP.assets[po_name_for(symbol)].trade_expiry_sec)
+
+def auto_window_line(symbol: str) -> str:
+    if not SELECTOR_ENABLED:
+        return "Auto window: OFF"
+    sel = SELECTORS.get(symbol)
+    chosen = f"{int(sel.chosen)}s" if sel.chosen is not None else "learning"
+    return f"Auto window: {chosen} | switches: {sel.switches}"
+
+def po_name_for(symbol: str) -> str:
+    if PO_TO_FINNHUB.get(APP.po_asset) == symbol:
+        return APP.po_asset
+    return SYMBOL_TO_PO.get(symbol, symbol)
+
+def fresh_scan():
+    """
+    הדירוג של הסריקה האחרונה אם היא טרייה (עד 2 מרווחי סריקה), אחרת None.
+    לא סורקים כאן: סריקה מלאה חוסמת את auto_loop / את ה-handler.
+    """
+    return SCANNER.fresh(2 * SCAN_INTERVAL_SEC) if SCAN_ENABLED else None
+
+def scan_keyboard(rows, n: int = 5):
+    markup = types.InlineKeyboardMarkup()
+    for r in rows[:n]:
+        po = po_name_for(r.symbol)
+        markup.add(types.InlineKeyboardButton(f"🎯 {po}", callback_data=f"asset::{po}::0"))
+    return markup
+
+
 # =========================================================
 # HANDLERS
 # =========================================================
@@ -732,6 +1025,7 @@ def on_set_trade(c):
 
     STRAT_CFG["WINDOW_SEC"] = float(rec_w)
     STRAT_CFG["EXPIRY"] = f"{sec}s" if sec < 60 else f"{int(sec/60)}m"
+    mark_config_changed()
 
     bot.answer_callback_query(c.id, text=f"Expiry={sec}s")
 
@@ -793,17 +1087,11 @@ def on_back_main(c):
 def on_signal(msg):
     cfg = cur_cfg()
     info = get_decision()
+    # אותו חלון כמו ה-EMAs מה-store; הרינדור רץ ב-pool בזמן שבונים את הטקסט
+    chart = price_png_async(APP.finnhub_symbol, effective_window(APP.finnhub_symbol))
 
-    # 1. עדכון MarketGuard
-    risk_mode = evaluate_market_risk(info)
-    if risk_mode in ("CAUTION","REVERSAL"):
-        changed = APP.guard.set_mode(risk_mode, extend=True)
-    else:
-        # רק אם אין קירור פעיל נחזור ל-NORMAL
-        if not APP.guard.cooldown_active():
-            changed = APP.guard.set_mode("NORMAL")
-        else:
-            changed = False
+    # 1. עדכון MarketGuard (אם ה-thread ברקע כבר ראה את ההחלטה הזו — לא נספר שוב)
+    APP.guard.observe(evaluate_market_risk(info), info["seq"])
 
     # נשלח התראת שינוי מצב אם צריך
     note = APP.guard.should_notify_change()
@@ -823,6 +1111,7 @@ def on_signal(msg):
             persist=info["persist"] if info["persist"] is not None else 0.0,
             tick_imb=info["tick_imb"] if info["tick_imb"] is not None else 0.0,
             align_bonus=info["align_bonus"] if info["align_bonus"] is not None else 0.0,
+            features=FEATURES.get(APP.finnhub_symbol).vector(),
         )
     else:
         APP.last_signal_idx = None
@@ -867,7 +1156,7 @@ def on_signal(msg):
         f"Chart Mode: {cfg.chart_mode}",
         f"TF: {cfg.candle_tf_sec}s" if cfg.chart_mode=="CANDLE" else "TF: N/A (Line)",
         f"Expiry: {cfg.trade_expiry_sec}s",
-        f"Window: {cfg.window_sec}s",
+        f"Window: {effective_window(APP.finnhub_symbol):g}s",
         f"Decision: {info['side']} {arrow}",
         f"Confidence: {info['conf']}%",
         f"Quality: {info['quality']}",
@@ -876,30 +1165,146 @@ def on_signal(msg):
         f"ema_spread: {_fmt(info['ema_spread'])} | slope: {_fmt(info['trend_slope'])}",
         f"persist: {_fmt(info['persist'],'.2f')} | tick_imb: {_fmt(info['tick_imb'],'.2f')} | align_bonus: {_fmt(info['align_bonus'],'.2f')}",
         f"Risk Penalty: {_fmt(info['penalty'], '.2f')}", # הוספנו את פלט הקנס
+        f"Regime: {info['regime'] or 'n/a'} | Cross-asset: {info['xasset']:+.2f}",
         APP.guard.status_line(),
     ]
+    if info.get("heads"):
+        lines.insert(-1, heads_line(info["heads"]))
 
     if warning_line:
         lines.append(warning_line)
     if APP.session_mode == "PC":
         lines.append(auto_line)
 
-    png = make_price_png(STATE["ticks"], cfg.window_sec, APP.po_asset)
-    bot.send_photo(
-        msg.chat.id,
-        png,
-        caption="\n".join(lines),
-        reply_markup=current_menu()
-    )
+    # הטקסט יוצא מיד; הגרף (שכבר ברינדור מתחילת ה-handler) כהודעת המשך
+    sent = bot.send_message(msg.chat.id, "\n".join(lines), reply_markup=current_menu())
+    send_chart_when_ready(msg.chat.id, chart, caption=f"📈 {APP.po_asset}", reply_to=sent.message_id)
+
+
+# ------ סורק ------
+@bot.message_handler(commands=["scan"])
+@bot.message_handler(func=lambda m: allowed(m) and m.text == "🔎 סורק")
+def on_scan(msg):
+    if not allowed(msg): return
+    rows = fresh_scan()
+    lines = ["סורק נכסים", SCANNER.status_line(), ""]
+    if rows is None:
+        # אין סריקה טרייה: מה שיש (עם הגיל), בלי לסרוק בתוך ה-handler
+        rows = list(SCANNER.rows)
+        age = SCANNER.age()
+        if not SCAN_ENABLED:
+            lines.append("⚠️ הסורק כבוי (SCAN_ENABLED=0).")
+        elif age is not None:
+            lines.append(f"⚠️ הסריקה האחרונה לפני {age:.0f}s — ייתכן שהדירוג לא עדכני.")
+    best = [r for r in rows if r.score > 0][:SCAN_SHOW_TOP]
+
+    if not best:
+        lines.append("אין כרגע הזדמנויות (אין סיגנל / אין טיקים טריים).")
+    for i, r in enumerate(best, 1):
+        arrow = "🔼" if r.side == "UP" else "🔽"
+        mark = " ⬅️" if r.symbol == APP.finnhub_symbol else ""
+        age = f"{r.tick_age:.1f}s" if r.tick_age is not None else "n/a"
+        g = GUARDS.get(r.symbol)
+        guard = f" | {'⚠️' if g.mode == 'CAUTION' else '⛔'} {g.mode}" if g.cooldown_active() else ""
+        lines.append(
+            f"{i}. {po_name_for(r.symbol)} {arrow} {r.conf}% {r.quality} | "
+            f"score {r.score:.2f} | feed {age}, {r.window_ticks} ticks{guard}{mark}"
+        )
+    rank = rank_in(rows, APP.finnhub_symbol)
+    lines += ["", f"הנכס הנוכחי ({APP.po_asset}): {('#'+str(rank)) if rank else 'לא בדירוג'}"]
+    if SCAN_GATE_TOP_K > 0:
+        lines.append(f"AutoTrade gate: Top {SCAN_GATE_TOP_K}")
+
+    bot.send_message(msg.chat.id, "\n".join(lines), reply_markup=scan_keyboard(best))
 
 
 # ------ ויזואל ------
 @bot.message_handler(func=lambda m: allowed(m) and m.text == "🖼️ ויזואל")
 def on_visual(msg):
     cfg = cur_cfg()
-    png = make_price_png(STATE["ticks"], cfg.window_sec, APP.po_asset)
-    cap = "גרף מחיר אחרון (X שניות, Y מחיר). הקו המקווקו = המחיר הנוכחי."
-    bot.send_photo(msg.chat.id, png, caption=cap, reply_markup=current_menu())
+    # אותו חלון כמו ה-EMAs מה-store
+    chart = price_png_async(APP.finnhub_symbol, effective_window(APP.finnhub_symbol))
+    if cfg.chart_mode == "CANDLE":
+        cap = f"נרות {cfg.candle_tf_sec}s אחרונים (X שניות, Y מחיר). הקו המקווקו = המחיר הנוכחי."
+    else:
+        cap = "גרף מחיר אחרון (X שניות, Y מחיר). הקו המקווקו = המחיר הנוכחי."
+    send_chart_when_ready(msg.chat.id, chart, caption=cap, reply_markup=current_menu())
+
+
+# ------ רב-TF ------
+@bot.message_handler(commands=["mtf"])
+@bot.message_handler(func=lambda m: allowed(m) and m.text == "🗂️ רב-TF")
+def on_mtf(msg):
+    """3 תצוגות שמתרנדרות במקביל ב-pool, ונשלחות כ-media group אחד כשכולן מוכנות."""
+    views = mtf_jobs(APP.finnhub_symbol)
+    futs = [CHARTS.cached_async_lazy(key, kind, build) for _, (key, kind, build) in views]
+    asset = APP.po_asset
+    chat_id = msg.chat.id
+    left = [len(futs)]
+    lock = threading.Lock()
+
+    def _done(_):
+        with lock:
+            left[0] -= 1
+            if left[0]:
+                return
+        try:
+            imgs = [f.result() for f in futs]
+            caps = [f"🗂️ {asset} • {name}" for name, _ in views]
+            send_chart_group(chat_id, imgs, caps)
+        except Exception as e:
+            print("[MTF] exception:", e)
+    for f in futs:
+        f.add_done_callback(_done)
+
+
+# ------ דשבורד ------
+@bot.message_handler(commands=["dash"])
+@bot.message_handler(func=lambda m: allowed(m) and m.text == "📋 דשבורד")
+def on_dashboard(msg):
+    syms, key, kind, build = dashboard_job()
+    if not syms:
+        bot.send_message(msg.chat.id, "אין עדיין טיקים לאף נכס.", reply_markup=current_menu())
+        return
+    chart = CHARTS.cached_async_lazy(key, kind, build)
+    cap = f"📋 {len(syms)} נכסים • {DASH_WINDOW_SEC:g}s אחרונים • ▲/▼ = סיגנל + confidence"
+    send_chart_when_ready(msg.chat.id, chart, caption=cap, reply_markup=current_menu())
+
+
+# ------ לייב ------
+@bot.message_handler(commands=["live"])
+@bot.message_handler(func=lambda m: allowed(m) and m.text == "📺 לייב")
+def on_live(msg):
+    """הודעת גרף אחת שמתרעננת עד עצירה / חוסר פעילות; לחיצה נוספת עוצרת."""
+    old = LIVE.stop(msg.chat.id)
+    if old is not None:
+        live_stopped(old, "user")
+        return
+    key, _ = live_job()
+    chart = price_png_async(APP.finnhub_symbol, effective_window(APP.finnhub_symbol))
+
+    def _send(f):
+        try:
+            img = f.result()
+            sent = send_chart_photo(msg.chat.id, img, output_for(APP.session_mode),
+                                    caption=live_caption(), reply_markup=live_keyboard())
+            prev = LIVE.start(msg.chat.id, sent.message_id, key, img)
+            if prev is not None:
+                live_stopped(prev, "user")
+        except Exception as e:
+            print("[LIVE VIEW] start failed:", e)
+    chart.add_done_callback(_send)
+
+@bot.callback_query_handler(func=lambda c: c.data.startswith("live::"))
+def on_live_cb(c):
+    if c.data == "live::stop":
+        v = LIVE.stop(c.message.chat.id)
+        if v is not None:
+            live_stopped(v, "user")
+        bot.answer_callback_query(c.id, text="הלייב נעצר")
+    else:
+        LIVE.touch(c.message.chat.id)
+        bot.answer_callback_query(c.id, text="ממשיך")
 
 
 # ------ סטטוס ------
@@ -916,12 +1321,12 @@ def status_header() -> list[str]:
 def on_status(msg):
     cfg = cur_cfg()
     now = time.time()
-    ticks = list(STATE["ticks"])
-    n_total = len(ticks)
-    n_win = len([1 for (ts, _) in ticks if now - ts <= cfg.window_sec])
     age_ms = int((now - STATE["last_recv_ts"]) * 1000) if STATE["last_recv_ts"] else None
 
     info = get_decision()
+    store = FEATURES.get(APP.finnhub_symbol)   # מה שההחלטה כבר חישבה
+    n_total = len(STATE["ticks"])
+    n_win = store.get("n", 0)
     learn_summary = LEARNER.summarize()
 
     lines = ["סטטוס"]
@@ -935,7 +1340,22 @@ def on_status(msg):
         f"TF (Chart): {(str(cfg.candle_tf_sec)+'s') if cfg.chart_mode=='CANDLE' else 'N/A (Line)'}",
         f"Trade Expiry: {cfg.trade_expiry_sec}s",
         f"Analysis Window: {cfg.window_sec}s",
+        auto_window_line(APP.finnhub_symbol),
+        f"Strategy preset: {'YES' if APP.finnhub_symbol in PRESETS else 'default'}",
         f"Window ticks: {n_win}/{n_total}",
+        DECISIONS.status_line(),
+        CHARTS.status_line(),
+        LIVE.status_line(),
+        STARTUP.status_line(),
+        store.status_line(),
+        SKETCHES.get(APP.finnhub_symbol).status_line(),
+        f"VOL_GUARD: {info['vol_guard']:.1e} | flat slope: {info['flat_slope']:.1e}",
+        SCANNER.status_line(),
+        CORR.status_line(APP.finnhub_symbol),
+    ]
+    if SELECTOR_ENABLED:
+        lines.append(SELECTORS.get(APP.finnhub_symbol).scores_line())
+    lines += [
         "",
         "איתות נוכחי",
         f"Signal: {info['side']}",
@@ -949,10 +1369,18 @@ def on_status(msg):
         f"Tick imbalance: {_fmt(info['tick_imb'],'.2f')}",
         f"Align bonus: {_fmt(info['align_bonus'],'.2f')}",
         f"Risk Penalty: {_fmt(info['penalty'], '.2f')}", # הוספנו את פלט הקנס
+        f"Cross-asset confirm: {info['xasset']:+.2f}",
+        f"Ensemble: {STRAT_CFG['ENSEMBLE_MODE']}",
+    ]
+    if info.get("heads"):
+        lines.append(heads_line(info["heads"]))
+    lines += [
         "",
         "Market Guard",
+        STREAMS.get(APP.finnhub_symbol).regime.status_line(now),
         APP.guard.status_line(),
         f"Cooldown active: {'YES' if APP.guard.cooldown_active() else 'NO'}",
+        guards_line(),
         "",
         "למידה חיה",
         f"Strong win%: {learn_summary['Strong win%']}",
@@ -967,6 +1395,10 @@ def on_status(msg):
             "Auto-Trading",
         ]
         lines += AUTO.status_lines()
+        lines += [
+            auto_events_line(),
+            TICK_TO_DECISION.status_line(),
+        ]
 
     bot.send_message(msg.chat.id, "\n".join(lines), reply_markup=current_menu())
 
@@ -1132,50 +1564,153 @@ def on_manual_sell(msg):
 # לולאת אוטומציה ברקע (למצב PC)
 # הבוט ימשיך לנתח ברקע ולבצע עסקאות אוטומטיות
 # אבל יכבד את MarketGuard (cooldown אחרי REVERSAL וכו')
+#
+# מונע-אירועים: הלולאה חוסמת על wait_for_tick במקום sleep קבוע.
+# טיקים שמגיעים ברצף מאוחדים (debounce) להערכה אחת, וההשהיה מהטיק
+# הראשון ועד ההחלטה חסומה ע"י AUTO_MAX_DELAY_SEC ונמדדת ב-TICK_TO_DECISION.
 # =========================================================
+TICK_TO_DECISION = LatencyTracker("Tick→Decision")
+AUTO_EVENTS = {"evals": 0, "ticks": 0}
+
+def _coalesce_ticks(seq: int, symbol: str) -> tuple[int, float] | None:
+    """
+    מחכה לטיק חדש של הסימבול, ואז אוסף טיקים נוספים כל עוד הם מגיעים בתוך
+    חלון ה-debounce (ולא יותר מ-AUTO_MAX_DELAY_SEC מהטיק הראשון).
+    מחזיר (seq חדש, זמן הטיק הראשון) או None אם לא הגיע כלום.
+    """
+    new_seq, first_ts = wait_for_first_tick(seq, 1.0, symbol)
+    if new_seq == seq:
+        return None
+    first_ts = first_ts or time.time()
+    deadline = first_ts + AUTO_MAX_DELAY_SEC
+    while True:
+        remaining = min(AUTO_DEBOUNCE_SEC, deadline - time.time())
+        if remaining <= 0:
+            break
+        nxt = wait_for_tick(new_seq, timeout=remaining, symbol=symbol)
+        if nxt == new_seq:
+            break  # שקט — מעריכים
+        new_seq = nxt
+    return new_seq, first_ts
+
+_SCAN_GATE = {"top": None, "ts": 0.0, "blocked": 0, "stale": 0, "stale_run": 0}
+
+def _scan_gate_closed() -> bool:
+    return 0 < SCAN_GATE_STALE_MAX < _SCAN_GATE["stale_run"]
+
+def scan_gate_allows() -> bool:
+    """
+    SCAN_GATE_TOP_K > 0: נכנסים רק אם הנכס הנוכחי בין K המובילים בסריקה האחרונה.
+    אחרת — התראה (פעם אחת לכל מוביל חדש / לכל דקה) על ההזדמנות המובילה.
+    סריקה ישנה / חסרה = אין gate (הסורק לא רץ בתוך auto_loop), אבל אחרי
+    SCAN_GATE_STALE_MAX בדיקות רצופות כאלה ה-gate נסגר עד הסריקה הטרייה הבאה —
+    סורק תקוע לא מבטל את ה-gate בשקט.
+    """
+    if SCAN_GATE_TOP_K <= 0:
+        return True
+    rows = fresh_scan()
+    if rows is None:
+        _SCAN_GATE["stale"] += 1
+        _SCAN_GATE["stale_run"] += 1
+        if not _scan_gate_closed():
+            return True
+        _SCAN_GATE["blocked"] += 1
+        if _SCAN_GATE["stale_run"] == SCAN_GATE_STALE_MAX + 1 and CHAT_LOCK:
+            try:
+                bot.send_message(
+                    CHAT_LOCK,
+                    f"🔎 אין סריקה טרייה ({SCAN_GATE_STALE_MAX} בדיקות ברצף) — "
+                    f"עצרתי כניסות אוטומטיות עד שהסורק יחזור.",
+                    reply_markup=current_menu(),
+                )
+            except Exception:
+                pass
+        return False
+    _SCAN_GATE["stale_run"] = 0
+    rank = rank_in(rows, APP.finnhub_symbol)
+    if rank is not None and rank <= SCAN_GATE_TOP_K:
+        return True
+    _SCAN_GATE["blocked"] += 1
+    top = next((r for r in rows if r.score > 0), None)
+    now = time.time()
+    if top and CHAT_LOCK and (top.symbol != _SCAN_GATE["top"] or now - _SCAN_GATE["ts"] > 60.0):
+        _SCAN_GATE["top"], _SCAN_GATE["ts"] = top.symbol, now
+        arrow = "🔼" if top.side == "UP" else "🔽"
+        try:
+            bot.send_message(
+                CHAT_LOCK,
+                f"🔎 {APP.po_asset} לא ב-Top {SCAN_GATE_TOP_K} — לא נכנסתי.\n"
+                f"ההזדמנות המובילה: {po_name_for(top.symbol)} {arrow} {top.conf}% {top.quality}",
+                reply_markup=scan_keyboard([top], 1),
+            )
+        except Exception:
+            pass
+    return False
+
+def auto_evaluate():
+    info = get_decision()
+
+    # עדכון guard
+    APP.guard.observe(evaluate_market_risk(info), info["seq"])
+
+    # אם מצב guard השתנה -> שלח התראה שקטה אל בעל החשבון
+    note = APP.guard.should_notify_change()
+    if note and CHAT_LOCK:
+        try:
+            bot.send_message(CHAT_LOCK, note, reply_markup=current_menu())
+        except Exception:
+            pass
+
+    # כניסה אוטומטית בפועל?
+    if (
+        info["side"] in ("UP","DOWN")
+        and not APP.guard.cooldown_active()
+        and APP.guard.mode == "NORMAL"
+        and scan_gate_allows()
+    ):
+        adapt_thresholds_from_learning()
+        AUTO.place_if_allowed(
+            side=info["side"],
+            conf=info["conf"],
+            strong_ok=info["strong_ok"]
+        )
+
 def auto_loop():
+    sym = APP.finnhub_symbol
+    seq = symbol_seq(sym)
     while True:
         try:
-            if APP.session_mode == "PC" and AUTO.state.enabled:
-                info = get_decision()
-
-                # עדכון guard
-                risk_mode = evaluate_market_risk(info)
-                if risk_mode in ("CAUTION","REVERSAL"):
-                    changed = APP.guard.set_mode(risk_mode, extend=True)
-                else:
-                    if not APP.guard.cooldown_active():
-                        changed = APP.guard.set_mode("NORMAL")
-                    else:
-                        changed = False
-
-                # אם מצב guard השתנה -> שלח התראה שקטה אל בעל החשבון
-                note = APP.guard.should_notify_change()
-                if note and CHAT_LOCK:
-                    try:
-                        bot.send_message(CHAT_LOCK, note, reply_markup=current_menu())
-                    except Exception:
-                        pass
-
-                # כניסה אוטומטית בפועל?
-                if (
-                    info["side"] in ("UP","DOWN")
-                    and not APP.guard.cooldown_active()
-                    and APP.guard.mode == "NORMAL"
-                ):
-                    adapt_thresholds_from_learning()
-                    AUTO.place_if_allowed(
-                        side=info["side"],
-                        conf=info["conf"],
-                        strong_ok=info["strong_ok"]
-                    )
+            if APP.finnhub_symbol != sym:
+                sym = APP.finnhub_symbol   # נכס הוחלף — מונה הטיקים שלו
+                seq = symbol_seq(sym)
+            got = _coalesce_ticks(seq, sym)
+            if got is None:
+                continue  # שוק שקט — אין מה להעריך
+            new_seq, first_ts = got
+            n_ticks = new_seq - seq
+            seq = new_seq
 
-            time.sleep(2.0)
+            if APP.session_mode == "PC" and AUTO.state.enabled:
+                auto_evaluate()
+                TICK_TO_DECISION.record(time.time() - first_ts)
+                AUTO_EVENTS["evals"] += 1
+                AUTO_EVENTS["ticks"] += n_ticks
 
         except Exception as e:
             print("[AUTO LOOP] exception:", e)
             time.sleep(2.0)
 
+def auto_events_line() -> str:
+    ev = AUTO_EVENTS["evals"]
+    per = (AUTO_EVENTS["ticks"] / ev) if ev else 0.0
+    return (
+        f"Auto evals: {ev} | ticks/eval: {per:.1f} | "
+        f"debounce {int(AUTO_DEBOUNCE_SEC*1000)}ms, max {int(AUTO_MAX_DELAY_SEC*1000)}ms"
+        + (f" | scan gate Top {SCAN_GATE_TOP_K}: {_SCAN_GATE['blocked']} blocked, "
+           f"{_SCAN_GATE['stale']} stale "
+           f"({'gate closed' if _scan_gate_closed() else 'no gate'})" if SCAN_GATE_TOP_K > 0 else "")
+    )
+
 
 # =========================================================
 # PANIC
@@ -1197,7 +1732,12 @@ def on_panic(msg):
 def run_forever():
     while True:
         try:
-            aggressive_reset()
+            if not STARTUP_BENCH:
+                aggressive_reset()
+            STARTUP.mark("first poll")
+            if STARTUP_BENCH:
+                print(STARTUP.status_line())
+                return
             print("Bot started polling…")
             bot.infinity_polling(skip_pending=True, timeout=30, long_polling_timeout=30)
         except ApiTelegramException as e:
@@ -1213,12 +1753,33 @@ def run_forever():
             time.sleep(2)
 
 def main():
-    ensure_single_instance()
-    ensure_fetcher()
-    init_learner_from_remote()
+    STARTUP.mark("main")
+    # STARTUP_BENCH (startup_bench.py): בלי נעילת מופע ובלי רשת — לא נוגעים
+    # בבוט שכבר רץ על המכונה (webhook / Finnhub / GitHub), רק זמן העלייה המקומי
+    if not STARTUP_BENCH:
+        ensure_single_instance()
+    CHARTS.start()
+    n_sketch = SKETCHES.load(QUANTILE_PATH)
+    if n_sketch:
+        print(f"Loaded quantile sketches for {n_sketch} symbols from {QUANTILE_PATH}")
+    if QUANTILE_PATH:
+        SKETCHES.start(QUANTILE_PATH)
+    if not STARTUP_BENCH:
+        ensure_fetcher()
+        init_learner_from_remote()
+    n_presets = load_presets(STRAT_PRESETS_PATH)
+    if n_presets:
+        print(f"Loaded {n_presets} strategy presets from {STRAT_PRESETS_PATH}")
+    refresh_symbol()
     sync_from_tf_trade()
     t = threading.Thread(target=auto_loop, daemon=True)
     t.start()
+    if SCAN_ENABLED:
+        SCANNER.start()
+    if SELECTOR_ENABLED:
+        SELECTORS.start(cfg_for, expiry_for)
+    GUARDS.start(subscribed_symbols, guard_risk, on_guard_change)
+    LIVE.start_thread(live_job, live_edit, live_stopped)
     run_forever()
 
 if __name__ == "__main__":
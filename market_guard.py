@@ -0,0 +1,200 @@
+# market_guard.py
+from __future__ import annotations
+import os, threading, time
+from typing import Callable, Dict, Iterable, Optional
+
+from data_fetcher import symbol_seq, wait_for_tick
+
+###############################################################################
+# MarketGuard פר נכס
+# -----------------
+# היה אינסטנס גלובלי אחד (APP.guard) שזז רק בלחיצה על 🧠 או ב-auto_loop של
+# הנכס הנוכחי: REVERSAL על EUR/USD חסם מסחר ב-BTC, ונכס חדש התחיל בלי היסטוריה.
+#
+# - GUARDS.get(symbol): MarketGuardState לכל סימבול (APP.guard = של הנכס הנוכחי).
+# - הקירור הוא deadline אחד (cooldown_until) — לא חישוב מחדש מול time.time()
+#   מכמה שדות בכל בדיקה.
+# - GuardRegistry.run_forever: thread ברקע — על כל טיק חדש של סימבול מעריך את
+#   ההחלטה שלו (דרך ה-cache) ומעדכן את ה-guard; ב-deadline של קירור מתעורר
+#   גם בלי טיק ומחזיר ל-NORMAL אם הסיכון האחרון כבר נורמלי.
+###############################################################################
+
+GUARD_IDLE_SEC = float(os.getenv("GUARD_IDLE_SEC", "1.0"))
+GUARD_MIN_INTERVAL_SEC = float(os.getenv("GUARD_MIN_INTERVAL_MS", "250")) / 1000.0
+
+
+# =========================================================
+# MarketGuardState
+# מנהל מצב שוק (NORMAL / CAUTION / REVERSAL)
+# עוצר מסחר אוטומטי בקירור, מאריך קירור אם צריך,
+# ושולח התראות כשמשהו מסוכן או כשחזר להיות בטוח.
+# =========================================================
+class MarketGuardState:
+    def __init__(self):
+        self.mode: str = "NORMAL"           # NORMAL / CAUTION / REVERSAL
+        self.last_change_ts: float = 0.0     # מתי נכנסנו למצב הזה
+        self.last_alert_mode: str = "NORMAL" # כדי לא להציף באותו טקסט שוב
+        self.cooldown_until: float = 0.0     # deadline: עד אז אסור לסחור אוטומטית
+        self.last_risk: str = "NORMAL"       # תוצאת evaluate_market_risk האחרונה
+        self.last_seq: Optional[int] = None  # ה-tick_seq של ההחלטה האחרונה שנצפתה
+        self.lock = threading.RLock()
+
+    def _base_cooldown(self) -> float:
+        if self.mode == "CAUTION":
+            return 60.0        # עצירה ~דקה
+        if self.mode == "REVERSAL":
+            return 300.0       # עצירה ~5 דקות
+        return 0.0
+
+    def _extend(self, until: float):
+        self.cooldown_until = max(self.cooldown_until, until)
+
+    def cooldown_active(self, now: float | None = None) -> bool:
+        """האם עדיין אסור לסחור אוטומטית (השוואה אחת מול ה-deadline)."""
+        return (now or time.time()) < self.cooldown_until
+
+    def cooldown_left(self, now: float | None = None) -> float:
+        return max(0.0, self.cooldown_until - (now or time.time()))
+
+    def status_line(self) -> str:
+        if self.mode == "NORMAL":
+            return "MarketGuard: ✅ Normal"
+        left = self.cooldown_left()
+        if self.mode == "CAUTION":
+            return f"MarketGuard: ⚠️ Caution (cooldown {left:.0f}s)" if left else "MarketGuard: ⚠️ Caution (cooldown done)"
+        else:
+            return f"MarketGuard: ⛔ Reversal (cooldown {left:.0f}s)" if left else "MarketGuard: ⛔ Reversal (cooldown done)"
+
+    def set_mode(self, new_mode: str, extend: bool=False) -> bool:
+        """
+        מחזיר True אם עברנו למצב אחר.
+        extend=True -> אם כבר במצב CAUTION/REVERSAL פשוט מאריך את הקירור.
+        """
+        with self.lock:
+            now = time.time()
+
+            # אותו מצב שוב -> אולי רק להאריך קירור
+            if new_mode == self.mode:
+                if extend and new_mode == "REVERSAL":
+                    self._extend(now + 120.0)
+                if extend and new_mode == "CAUTION":
+                    self._extend(now + 30.0)
+                return False
+
+            # עברנו למצב חדש: קירור בסיס מרגע המעבר (NORMAL מבטל קירור)
+            self.mode = new_mode
+            self.last_change_ts = now
+            self.cooldown_until = now + self._base_cooldown()
+            return True
+
+    def observe(self, risk_mode: str, seq: Optional[int] = None) -> bool:
+        """
+        עדכון מהחלטה חדשה (תוצאת evaluate_market_risk). מחזיר True אם המצב השתנה.
+        seq: tick_seq של ההחלטה — אותה החלטה לא נספרת פעמיים (ברקע + בלחיצה).
+        """
+        with self.lock:
+            if seq is not None and seq == self.last_seq:
+                return False
+            self.last_seq = seq
+            self.last_risk = risk_mode
+            if risk_mode in ("CAUTION","REVERSAL"):
+                return self.set_mode(risk_mode, extend=True)
+            # רק אם אין קירור פעיל נחזור ל-NORMAL
+            if not self.cooldown_active():
+                return self.set_mode("NORMAL")
+            return False
+
+    def expire(self, now: float | None = None) -> bool:
+        """ה-deadline עבר והסיכון האחרון נורמלי -> NORMAL בלי לחכות לטיק."""
+        with self.lock:
+            if self.mode != "NORMAL" and self.last_risk == "NORMAL" and not self.cooldown_active(now):
+                return self.set_mode("NORMAL")
+            return False
+
+    def should_notify_change(self) -> str | None:
+        """
+        אם המצב השתנה מאז ההתראה האחרונה -> מחזיר טקסט התראה חד-פעמי.
+        גם מעדכן last_alert_mode כדי לא להציף.
+        נקרא גם מה-thread של GUARDS וגם מ-on_signal / auto_evaluate — הבדיקה
+        והעדכון תחת ה-lock, כך שכל שינוי מצב מתקבל פעם אחת בדיוק.
+        """
+        with self.lock:
+            mode = self.mode
+            if mode == self.last_alert_mode:
+                return None
+            self.last_alert_mode = mode
+        if mode == "CAUTION":
+            return (
+                "⚠️ זיהיתי תנאי שוק לא יציבים.\n"
+                "אני עוצר כניסות אגרסיביות לזמן קצר כדי להימנע מהיפוך פתאומי."
+            )
+        if mode == "REVERSAL":
+            return (
+                "⛔ היפוך מגמה חריף!\n"
+                "עצרתי כניסות אוטומטיות לחמש דקות (ואאריך אם צריך)."
+            )
+        if mode == "NORMAL":
+            return (
+                "✅ השוק נרגע וחזר להתייצב.\n"
+                "אני חוזר לפעול כרגיל."
+            )
+        return None
+
+
+class GuardRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.guards: Dict[str, MarketGuardState] = {}
+        self.updates = 0
+
+    def get(self, symbol: str) -> MarketGuardState:
+        with self.lock:
+            g = self.guards.get(symbol)
+            if g is None:
+                g = self.guards[symbol] = MarketGuardState()
+            return g
+
+    def next_deadline(self, now: float) -> Optional[float]:
+        with self.lock:
+            guards = list(self.guards.values())
+        pending = [g.cooldown_until for g in guards if g.mode != "NORMAL" and g.cooldown_until > now]
+        return min(pending) if pending else None
+
+    def run_forever(self, symbols: Callable[[], Iterable[str]],
+                    evaluate: Callable[[str], str],
+                    on_change: Callable[[str, MarketGuardState], None] | None = None):
+        """
+        symbols(): הסימבולים שנרשמים אליהם; evaluate(symbol) -> risk mode
+        (NORMAL / CAUTION / REVERSAL) של ההחלטה העדכנית של הסימבול.
+        """
+        gseq, seen = 0, {}
+        while True:
+            now = time.time()
+            dl = self.next_deadline(now)
+            timeout = GUARD_IDLE_SEC if dl is None else min(GUARD_IDLE_SEC, max(0.0, dl - now))
+            gseq = wait_for_tick(gseq, timeout=timeout)
+            for sym in list(symbols()):
+                g = self.get(sym)
+                seq = symbol_seq(sym)
+                changed = False
+                if seq and seq != seen.get(sym):
+                    seen[sym] = seq
+                    try:
+                        changed = g.observe(evaluate(sym), seq)
+                    except Exception as e:
+                        print("[MARKET GUARD] exception:", e)
+                    self.updates += 1
+                changed = g.expire() or changed
+                if changed and on_change is not None:
+                    on_change(sym, g)
+            # אחרי סבב: לא יותר מסבב אחד לכל GUARD_MIN_INTERVAL_SEC (טיקים מצטברים)
+            time.sleep(max(0.0, GUARD_MIN_INTERVAL_SEC - (time.time() - now)))
+
+    def start(self, symbols, evaluate, on_change=None) -> threading.Thread:
+        t = threading.Thread(target=self.run_forever, args=(symbols, evaluate, on_change), daemon=True)
+        t.start()
+        return t
+
+
+# אינסטנס גלובלי (כמו STREAMS / FEATURES)
+GUARDS = GuardRegistry()
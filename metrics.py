@@ -0,0 +1,46 @@
+# metrics.py
+from __future__ import annotations
+import collections, threading
+from typing import Dict
+
+###############################################################################
+# מדדי זמן קלים (בלי תלויות חיצוניות)
+# LatencyTracker שומר את N המדידות האחרונות ומחזיר last/avg/p95/max במילישניות.
+###############################################################################
+
+
+class LatencyTracker:
+    def __init__(self, name: str, maxlen: int = 500):
+        self.name = name
+        self.lock = threading.Lock()
+        self._samples_ms = collections.deque(maxlen=maxlen)
+        self.count: int = 0
+
+    def record(self, seconds: float):
+        with self.lock:
+            self._samples_ms.append(max(0.0, seconds) * 1000.0)
+            self.count += 1
+
+    def summary(self) -> Dict[str, float]:
+        with self.lock:
+            data = sorted(self._samples_ms)
+            last = self._samples_ms[-1] if self._samples_ms else 0.0
+        if not data:
+            return {"n": 0, "last": 0.0, "avg": 0.0, "p95": 0.0, "max": 0.0}
+        p95 = data[min(len(data) - 1, int(0.95 * len(data)))]
+        return {
+            "n": len(data),
+            "last": last,
+            "avg": sum(data) / len(data),
+            "p95": p95,
+            "max": data[-1],
+        }
+
+    def status_line(self) -> str:
+        s = self.summary()
+        if not s["n"]:
+            return f"{self.name}: n/a"
+        return (
+            f"{self.name}: last {s['last']:.0f}ms | avg {s['avg']:.0f}ms | "
+            f"p95 {s['p95']:.0f}ms | max {s['max']:.0f}ms"
+        )
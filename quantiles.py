@@ -0,0 +1,244 @@
+# quantiles.py
+from __future__ import annotations
+import json, math, os, random, threading, time
+from typing import Dict, List, Optional, Tuple
+
+###############################################################################
+# ספים יחסיים לסימבול — sketch קוונטילים זורם (בסגנון KLL)
+# -------------------------------------------------------
+# ספים כמו VOL_GUARD=8e-5, SHOCK (vol > 3e-3) או slope ~ 0 ב-evaluate_market_risk
+# הם מוחלטים — ול-USD/JPY, BTC ומדדים הם אומרים דברים שונים לגמרי.
+# כאן שומרים לכל סימבול sketch של vol, |slope|, |ema_spread| ו-tick_rate,
+# ומגדירים את הספים כאחוזונים (PCT_THRESHOLDS).
+#
+# KLLSketch: היררכיית compactors — כשרמה h מתמלאת ממיינים אותה ומעבירים
+# חצי מהאיברים (זוגיים / אי-זוגיים באקראי) לרמה h+1 עם משקל כפול.
+# זיכרון חסום (~600 ערכים ל-k=200), שגיאת דירוג ~1%.
+#
+# בזמן החלטה: טבלת 101 אחוזונים שנבנית מחדש כל SKETCH_REFRESH עדכונים,
+# כך ש-quantile(q) הוא O(1). עד QUANTILE_MIN_COUNT דגימות — הספים המוחלטים.
+# ה-sketches נשמרים ל-QUANTILE_PATH (JSON) ונטענים בהפעלה.
+# backtest / sweep / walkforward בונים SymbolSketches לכל סימבול מהטיקים
+# המשוחזרים (vector_signal.sketch_thresholds) — אותו QUANTILE_THRESHOLDS כמו בלייב.
+###############################################################################
+
+QUANTILE_ENABLED = os.getenv("QUANTILE_THRESHOLDS", "1").strip() != "0"
+QUANTILE_PATH = os.getenv("QUANTILE_PATH", "quantile_sketches.json").strip()
+QUANTILE_SAVE_SEC = float(os.getenv("QUANTILE_SAVE_SEC", "60"))
+QUANTILE_MIN_COUNT = 500
+SKETCH_K = 200
+SKETCH_REFRESH = 64
+
+METRICS = ("vol", "slope", "spread", "tick_rate")
+
+# סף -> (מדד, אחוזון). המפתחות הם שמות CFG (או ספי הסיכון של main)
+PCT_THRESHOLDS: Dict[str, Tuple[str, float]] = {
+    "VOL_GUARD":          ("vol",   0.10),   # vol נמוך לסימבול הזה
+    "SHOCK_VOL":          ("vol",   0.99),   # vol חריג
+    "SHOCK_SLOPE":        ("slope", 0.60),   # ...בלי שיפוע מעל החציון
+    "RANGE_SLOPE":        ("slope", 0.40),   # דשדוש
+    "RISK_FLAT_SLOPE":    ("slope", 0.05),   # slope ~ 0 (evaluate_market_risk)
+    "RISK_COUNTER_SLOPE": ("slope", 0.30),   # שיפוע נגדי "אמיתי" -> REVERSAL
+}
+
+
+class KLLSketch:
+    def __init__(self, k: int = SKETCH_K, seed: Optional[int] = None):
+        self.k = k
+        self.n = 0
+        self.compactors: List[List[float]] = [[]]
+        self._rng = random.Random(seed)
+        self._size = 0
+        self._max_size = self._capacity(0)
+        self._table: Optional[List[float]] = None
+        self._dirty = 0
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self.compactors) - h - 1
+        return max(2, int(math.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _grow(self):
+        self.compactors.append([])
+        self._max_size = sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def update(self, x: float):
+        if x is None or not math.isfinite(x):
+            return
+        self.compactors[0].append(float(x))
+        self.n += 1
+        self._size += 1
+        self._dirty += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def _compress(self):
+        for h in range(len(self.compactors)):
+            c = self.compactors[h]
+            if len(c) < self._capacity(h):
+                continue
+            if h + 1 >= len(self.compactors):
+                self._grow()
+            c.sort()
+            keep = [c.pop()] if len(c) % 2 else []   # אי-זוגי: האחרון נשאר ברמה
+            self.compactors[h + 1].extend(c[self._rng.randint(0, 1)::2])
+            self.compactors[h] = keep
+            self._size = sum(len(x) for x in self.compactors)
+            if self._size < self._max_size:
+                break
+
+    def _weighted(self) -> List[Tuple[float, int]]:
+        items = [(x, 1 << h) for h, c in enumerate(self.compactors) for x in c]
+        items.sort()
+        return items
+
+    def _refresh(self):
+        items = self._weighted()
+        total = sum(w for _, w in items)
+        table, acc, i = [], 0, 0
+        for p in range(101):
+            target = p / 100.0 * total
+            while i < len(items) - 1 and acc + items[i][1] <= target:
+                acc += items[i][1]
+                i += 1
+            table.append(items[i][0])
+        self._table = table
+        self._dirty = 0
+
+    def quantile(self, q: float) -> Optional[float]:
+        """O(1) מטבלת האחוזונים (נבנית מחדש כל SKETCH_REFRESH עדכונים)."""
+        if not self.n:
+            return None
+        if self._table is None or self._dirty >= SKETCH_REFRESH:
+            self._refresh()
+        return self._table[int(round(min(1.0, max(0.0, q)) * 100))]
+
+    def to_dict(self) -> Dict:
+        return {"k": self.k, "n": self.n, "compactors": self.compactors}
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "KLLSketch":
+        sk = cls(int(d.get("k", SKETCH_K)))
+        sk.n = int(d.get("n", 0))
+        sk.compactors = [[float(x) for x in c] for c in d.get("compactors") or [[]]] or [[]]
+        sk._size = sum(len(c) for c in sk.compactors)
+        sk._max_size = sum(sk._capacity(h) for h in range(len(sk.compactors)))
+        return sk
+
+
+class SymbolSketches:
+    def __init__(self, symbol: str, seed: Optional[int] = None):
+        """seed: לשחזור (backtest / sweep) — אותם ספים בשני מסלולי ה-replay."""
+        self.symbol = symbol
+        self.lock = threading.Lock()
+        self.sketches: Dict[str, KLLSketch] = {m: KLLSketch(seed=seed) for m in METRICS}
+
+    @property
+    def count(self) -> int:
+        return self.sketches["vol"].n
+
+    @property
+    def ready(self) -> bool:
+        return self.count >= QUANTILE_MIN_COUNT
+
+    def update(self, vol=None, slope=None, spread=None, tick_rate=None):
+        with self.lock:
+            for name, v in (("vol", vol), ("slope", slope), ("spread", spread), ("tick_rate", tick_rate)):
+                if v is not None:
+                    self.sketches[name].update(abs(float(v)))
+
+    def quantile(self, metric: str, q: float) -> Optional[float]:
+        with self.lock:
+            return self.sketches[metric].quantile(q)
+
+    def threshold(self, name: str, default: float) -> float:
+        """הסף name לפי האחוזון שלו ב-PCT_THRESHOLDS, או default (לא מוכן / כבוי)."""
+        spec = PCT_THRESHOLDS.get(name)
+        if not (QUANTILE_ENABLED and spec and self.ready):
+            return default
+        v = self.quantile(*spec)
+        return v if v is not None else default
+
+    def resolve(self, cfg: Dict) -> Dict:
+        """cfg עם ספי האחוזונים במקום הקבועים (רק מפתחות שכבר קיימים ב-cfg)."""
+        for name in PCT_THRESHOLDS:
+            if name in cfg:
+                cfg[name] = self.threshold(name, cfg[name])
+        return cfg
+
+    def status_line(self) -> str:
+        if not self.count:
+            return "Quantiles: n/a"
+        q = lambda m, p: self.quantile(m, p) or 0.0
+        return (
+            f"Quantiles: n={self.count}{'' if self.ready else ' (warm-up)'} | "
+            f"vol p10/p50/p99 {q('vol', .1):.1e}/{q('vol', .5):.1e}/{q('vol', .99):.1e} | "
+            f"slope p50 {q('slope', .5):.1e} | tick/s p50 {q('tick_rate', .5):.2f}"
+        )
+
+    def to_dict(self) -> Dict:
+        with self.lock:
+            return {m: sk.to_dict() for m, sk in self.sketches.items()}
+
+    def load(self, d: Dict):
+        with self.lock:
+            for m in METRICS:
+                if isinstance(d.get(m), dict):
+                    self.sketches[m] = KLLSketch.from_dict(d[m])
+
+
+class SketchRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.symbols: Dict[str, SymbolSketches] = {}
+
+    def get(self, symbol: str) -> SymbolSketches:
+        with self.lock:
+            sk = self.symbols.get(symbol)
+            if sk is None:
+                sk = self.symbols[symbol] = SymbolSketches(symbol)
+            return sk
+
+    def save(self, path: str = QUANTILE_PATH) -> bool:
+        if not path:
+            return False
+        with self.lock:
+            items = list(self.symbols.items())
+        data = {"saved_ts": time.time(), "symbols": {s: sk.to_dict() for s, sk in items}}
+        tmp = path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+            return True
+        except OSError as e:
+            print("[QUANTILES] save failed:", e)
+            return False
+
+    def load(self, path: str = QUANTILE_PATH) -> int:
+        """טוען sketches שמורים. מחזיר כמה סימבולים נטענו."""
+        if not path or not os.path.exists(path):
+            return 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return 0
+        syms = data.get("symbols") or {}
+        for s, d in syms.items():
+            if isinstance(d, dict):
+                self.get(s).load(d)
+        return len(syms)
+
+    def run_forever(self, path: str = QUANTILE_PATH, every_sec: float = QUANTILE_SAVE_SEC):
+        while True:
+            time.sleep(every_sec)
+            self.save(path)
+
+    def start(self, path: str = QUANTILE_PATH) -> threading.Thread:
+        t = threading.Thread(target=self.run_forever, args=(path,), daemon=True)
+        t.start()
+        return t
+
+
+# אינסטנס גלובלי (כמו STREAMS / FEATURES)
+SKETCHES = SketchRegistry()
@@ -0,0 +1,115 @@
+# regime.py
+from __future__ import annotations
+import collections, math, os, time
+from typing import List, Optional, Tuple
+
+from features import classify_regime
+
+###############################################################################
+# גלאי רג'ים מתגלגל (TREND / RANGE / SHOCK)
+# ----------------------------------------
+# נבנה על features.classify_regime (הליבה של regime_classifier), אבל:
+# - מתעדכן בכל טיק מהמצב המצטבר של stream_state.SymbolStream
+#   (שיפוע לוג של החלון, robust vol, התמדה) — בלי חישוב מחדש של החלון.
+# - ספים מנורמלים ל-vol ה"רגיל" של הסימבול (EWMA איטי של vol החלון):
+#     SHOCK: vol > SHOCK_MULT * typical ושיפוע קטן מ-vol*sqrt(n) (בלי כיוון)
+#     TREND: |slope| > TREND_Z * typical*sqrt(n) (תזוזה מעבר להליכה אקראית)
+#            והתמדה >= TREND_PERSIST
+#   עד שה-typical מתייצב (REGIME_WARMUP_TICKS) — הספים הקבועים של הקלסיפייר.
+# - היסטרזיס: ספי "הישארות" רכים מספי "כניסה", ומעבר מצב רק אחרי
+#   REGIME_CONFIRM_TICKS טיקים רצופים שמצביעים על המצב החדש.
+#
+# קוראים: האסטרטגיה (עונשי SHOCK/RANGE), MarketGuard (SHOCK -> CAUTION)
+# והגרפים (הצללת רג'ים לפי spans()).
+###############################################################################
+
+REGIME_CONFIRM_TICKS = int(os.getenv("REGIME_CONFIRM_TICKS", "3"))
+REGIME_WARMUP_TICKS = 50
+REGIME_BASE_ALPHA = 0.002      # EWMA של vol החלון -> vol "רגיל" (בזמן SHOCK: פי 10 לאט)
+
+SHOCK_MULT_ENTER, SHOCK_MULT_STAY = 3.0, 2.0
+SHOCK_SLOPE_Z = 1.0
+TREND_Z_ENTER, TREND_Z_STAY = 1.5, 1.0
+TREND_PERSIST_ENTER, TREND_PERSIST_STAY = 0.6, 0.55
+
+REGIMES = ("TREND", "RANGE", "SHOCK")
+
+
+class RegimeDetector:
+    def __init__(self, history: int = 500):
+        self.current: str = "RANGE"
+        self.since_ts: float = 0.0
+        self.typical_vol: Optional[float] = None
+        self.seen: int = 0
+        self._cand: Optional[str] = None
+        self._cand_n: int = 0
+        self.switches: int = 0
+        # (ts תחילת המקטע, רג'ים) — להצללה בגרף
+        self.segments: collections.deque = collections.deque(maxlen=history)
+
+    @property
+    def warm(self) -> bool:
+        return self.seen >= REGIME_WARMUP_TICKS
+
+    def _classify(self, slope: float, vol: float, persist: float, n: int) -> str:
+        if not self.warm:
+            return classify_regime(slope, vol, persist)
+        typ = self.typical_vol
+        rw = typ * math.sqrt(max(1, n - 1))   # סדר גודל של תזוזת הליכה אקראית בחלון
+        cur = self.current
+        return classify_regime(
+            slope, vol, persist,
+            shock_vol=typ * (SHOCK_MULT_STAY if cur == "SHOCK" else SHOCK_MULT_ENTER),
+            shock_slope=vol * math.sqrt(max(1, n - 1)) * SHOCK_SLOPE_Z,
+            trend_slope=rw * (TREND_Z_STAY if cur == "TREND" else TREND_Z_ENTER),
+            trend_persist=TREND_PERSIST_STAY if cur == "TREND" else TREND_PERSIST_ENTER,
+        )
+
+    def update(self, ts: float, slope: float, vol: float, persist: float, n: int) -> str:
+        self.seen += 1
+        if self.typical_vol is None:
+            self.typical_vol = vol
+        else:
+            # הלם לא "מלמד" את ה-vol הרגיל מהר — אחרת הוא נבלע תוך כמה עשרות טיקים
+            a = REGIME_BASE_ALPHA * (0.1 if self.current == "SHOCK" else 1.0)
+            self.typical_vol += a * (vol - self.typical_vol)
+        if not self.segments:
+            self.segments.append((ts, self.current))
+            self.since_ts = ts
+
+        cand = self._classify(slope, vol, persist, n)
+        if cand == self.current:
+            self._cand, self._cand_n = None, 0
+            return self.current
+        if cand == self._cand:
+            self._cand_n += 1
+        else:
+            self._cand, self._cand_n = cand, 1
+        if self._cand_n >= REGIME_CONFIRM_TICKS:
+            self.current = cand
+            self.since_ts = ts
+            self.segments.append((ts, cand))
+            self.switches += 1
+            self._cand, self._cand_n = None, 0
+        return self.current
+
+    def spans(self, t0: float, t1: float) -> List[Tuple[float, float, str]]:
+        """מקטעי רג'ים שחותכים את [t0, t1] — (התחלה, סוף, רג'ים)."""
+        segs = list(self.segments)
+        out = []
+        for i, (a, r) in enumerate(segs):
+            b = segs[i + 1][0] if i + 1 < len(segs) else t1
+            if b <= t0 or a >= t1:
+                continue
+            out.append((max(a, t0), min(b, t1), r))
+        return out
+
+    def status_line(self, now: float | None = None) -> str:
+        if not self.seen:
+            return "Regime: n/a"
+        now = now or time.time()
+        return (
+            f"Regime: {self.current} ({int(now - self.since_ts)}s) | "
+            f"typical vol {self.typical_vol:.2e} | switches: {self.switches}"
+            + ("" if self.warm else " | warm-up")
+        )
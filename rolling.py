@@ -0,0 +1,153 @@
+# rolling.py
+from __future__ import annotations
+import math, random
+from typing import Callable, List
+
+###############################################################################
+# מבני נתונים לחלון מתגלגל
+# ------------------------
+# IndexableSkiplist — רשימה ממוינת עם insert/remove/גישה לפי אינדקס ב-O(log n)
+#                     (skiplist עם "רוחב" לכל קישור).
+# RollingMedianMAD  — חציון ו-MAD של חלון מתגלגל, באותה הגדרה בדיוק כמו
+#                     strategy._robust_vol: sorted(x)[n//2] (חציון "עליון").
+#                     MAD = האיבר ה-n//2 מבין |x - med| — נמצא בלי למיין:
+#                     המרחקים משמאל ומימין לחציון הם שני מערכים ממוינים
+#                     "וירטואליים", ומחפשים את ה-k-י באיחוד שלהם (O(log² n)).
+###############################################################################
+
+
+class _Node:
+    __slots__ = ("value", "next", "width")
+
+    def __init__(self, value: float, levels: int):
+        self.value = value
+        self.next: List["_Node | None"] = [None] * levels
+        self.width: List[int] = [1] * levels
+
+
+class IndexableSkiplist:
+    MAX_LEVELS = 24
+
+    def __init__(self, seed: int | None = None):
+        self._rnd = random.Random(seed)
+        self.head = _Node(float("-inf"), self.MAX_LEVELS)
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _levels(self) -> int:
+        lvl = 1
+        while lvl < self.MAX_LEVELS and self._rnd.random() < 0.5:
+            lvl += 1
+        return lvl
+
+    def __getitem__(self, i: int) -> float:
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError(i)
+        node = self.head
+        i += 1
+        for level in reversed(range(self.MAX_LEVELS)):
+            while node.next[level] is not None and node.width[level] <= i:
+                i -= node.width[level]
+                node = node.next[level]
+        return node.value
+
+    def insert(self, value: float):
+        chain: List[_Node] = [None] * self.MAX_LEVELS  # type: ignore[list-item]
+        steps = [0] * self.MAX_LEVELS
+        node = self.head
+        for level in reversed(range(self.MAX_LEVELS)):
+            while node.next[level] is not None and node.next[level].value <= value:
+                steps[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+        lvl = self._levels()
+        new = _Node(value, lvl)
+        steps_at_level = 0
+        for level in range(lvl):
+            prev = chain[level]
+            new.next[level] = prev.next[level]
+            prev.next[level] = new
+            new.width[level] = prev.width[level] - steps_at_level
+            prev.width[level] = steps_at_level + 1
+            steps_at_level += steps[level]
+        for level in range(lvl, self.MAX_LEVELS):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, value: float):
+        chain: List[_Node] = [None] * self.MAX_LEVELS  # type: ignore[list-item]
+        node = self.head
+        for level in reversed(range(self.MAX_LEVELS)):
+            while node.next[level] is not None and node.next[level].value < value:
+                node = node.next[level]
+            chain[level] = node
+        target = chain[0].next[0]
+        if target is None or target.value != value:
+            raise KeyError(value)
+        for level in range(len(target.next)):
+            prev = chain[level]
+            prev.width[level] += target.width[level] - 1
+            prev.next[level] = target.next[level]
+        for level in range(len(target.next), self.MAX_LEVELS):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+
+def _kth_of_two(get_a: Callable[[int], float], na: int,
+                get_b: Callable[[int], float], nb: int, k: int) -> float:
+    """האיבר ה-k (מ-0) באיחוד שני מערכים ממוינים — חיפוש בינארי על כמה לקחת מ-A."""
+    lo, hi = max(0, k + 1 - nb), min(k + 1, na)
+    while lo < hi:
+        i = (lo + hi) // 2          # לוקחים i מ-A
+        j = k + 1 - i               # ו-j מ-B
+        if j > 0 and get_a(i) < get_b(j - 1):
+            lo = i + 1
+        else:
+            hi = i
+    i = lo
+    j = k + 1 - i
+    a = get_a(i - 1) if i > 0 else -math.inf
+    b = get_b(j - 1) if j > 0 else -math.inf
+    return max(a, b)
+
+
+class RollingMedianMAD:
+    def __init__(self):
+        self.sl = IndexableSkiplist()
+
+    def __len__(self) -> int:
+        return len(self.sl)
+
+    def add(self, x: float):
+        self.sl.insert(x)
+
+    def remove(self, x: float):
+        self.sl.remove(x)
+
+    def median(self) -> float:
+        n = len(self.sl)
+        return self.sl[n // 2] if n else 0.0
+
+    def mad(self) -> float:
+        n = len(self.sl)
+        if not n:
+            return 0.0
+        pos = n // 2
+        m = self.sl[pos]
+        sl = self.sl
+        # A[j] = m - s[pos-1-j] (עולה), B[j] = s[pos+j] - m (עולה)
+        return _kth_of_two(
+            lambda j: abs(sl[pos - 1 - j] - m), pos,
+            lambda j: abs(sl[pos + j] - m), n - pos,
+            n // 2,
+        )
+
+    def robust_vol(self) -> float:
+        """כמו strategy._robust_vol על אותם ערכים."""
+        if not len(self.sl):
+            return 1e-9
+        return max(1e-9, 1.4826 * self.mad())
@@ -0,0 +1,165 @@
+# scanner.py
+from __future__ import annotations
+import os, threading, time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import LatencyTracker
+
+###############################################################################
+# סורק נכסים
+# ----------
+# מעריך את הסיגנל לכל הסימבולים ב-PO_TO_FINNHUB לפי לוח זמנים, ומדרג:
+#   score = edge(conf) * משקל איכות * בריאות פיד
+# edge = (conf - 50) / 50 רק ל-UP/DOWN; בריאות = טריות הטיק האחרון * עומק החלון.
+#
+# ההערכות רצות ברצף ב-thread של הסורק (קוד Python טהור — pool של threads
+# לא מקביל אותן בגלל ה-GIL), דרך אותו מסלול החלטה של הבוט
+# (get_decision_for: buffer + stream + StrategyState פר סימבול, מטמון לפי
+# symbol_seq) — סימבול בלי טיק חדש לא מחושב מחדש.
+#
+# הקוראים (gate של AutoTrade, /scan) לא סורקים בעצמם: fresh() מחזיר את
+# הדירוג האחרון רק אם הוא טרי, אחרת None.
+#
+# "לעמוד בקצב": זמן סריקה מלאה נמדד (SCAN_TIME) ומושווה למרווח הטיקים של
+# הפיד הכי צפוף (budget בסטטוס).
+###############################################################################
+
+SCAN_ENABLED = os.getenv("SCAN_ENABLED", "1").strip() != "0"
+SCAN_INTERVAL_SEC = float(os.getenv("SCAN_INTERVAL_MS", "1000")) / 1000.0
+SCAN_STALE_SEC = float(os.getenv("SCAN_STALE_SEC", "15"))
+SCAN_MIN_TICKS = 24   # עומק חלון "מלא" לבריאות (2x המינימום של האסטרטגיה)
+
+QUALITY_WEIGHT = {"🟩 Strong": 1.0, "🟨 Medium": 0.85, "🟥 Weak": 0.7}
+
+
+@dataclass
+class ScanRow:
+    symbol: str
+    side: str
+    conf: int
+    quality: str
+    tick_age: Optional[float]   # שניות מאז הטיק האחרון (None = אין טיקים)
+    window_ticks: int
+    health: float               # 0..1
+    score: float
+    info: Dict = field(default_factory=dict, repr=False)
+
+
+def feed_health(tick_age: Optional[float], window_ticks: int,
+                stale_sec: float = SCAN_STALE_SEC) -> float:
+    if tick_age is None:
+        return 0.0
+    fresh = max(0.0, 1.0 - tick_age / stale_sec)
+    depth = min(1.0, window_ticks / SCAN_MIN_TICKS)
+    return fresh * depth
+
+def rank_in(rows: List["ScanRow"], symbol: str) -> Optional[int]:
+    """מקום (מ-1) בדירוג, רק מבין ההזדמנויות (score > 0)."""
+    for i, r in enumerate(rows):
+        if r.score <= 0:
+            break
+        if r.symbol == symbol:
+            return i + 1
+    return None
+
+def opportunity_score(side: str, conf: int, quality: str, health: float) -> float:
+    if side not in ("UP", "DOWN"):
+        return 0.0
+    edge = max(0.0, (conf - 50) / 50.0)
+    return edge * QUALITY_WEIGHT.get(quality, 0.7) * health
+
+
+class Scanner:
+    """
+    evaluate(symbol) -> dict החלטה (כמו get_decision: side/conf/quality/...)
+    health(symbol)   -> (tick_age | None, window_ticks, avg_tick_interval | None)
+    """
+    def __init__(self, symbols: List[str], evaluate: Callable[[str], Dict],
+                 health: Callable[[str], Tuple[Optional[float], int, Optional[float]]]):
+        self.symbols = list(symbols)
+        self.evaluate = evaluate
+        self.health = health
+        self.lock = threading.Lock()
+        self.rows: List[ScanRow] = []
+        self.last_ts: float = 0.0
+        self.last_sec: float = 0.0               # משך הסריקה האחרונה
+        self.budget_sec: Optional[float] = None  # מרווח הטיקים של הפיד הכי צפוף
+        self.scans: int = 0
+        self.errors: int = 0
+        self.scan_time = LatencyTracker("Scan")
+
+    def _scan_one(self, sym: str) -> Tuple[ScanRow, Optional[float]]:
+        age, n, interval = self.health(sym)
+        info = self.evaluate(sym)
+        h = feed_health(age, n)
+        row = ScanRow(
+            symbol=sym, side=info["side"], conf=int(info["conf"]),
+            quality=info["quality"], tick_age=age, window_ticks=n, health=h,
+            score=opportunity_score(info["side"], int(info["conf"]), info["quality"], h),
+            info=info,
+        )
+        return row, interval
+
+    def scan(self) -> List[ScanRow]:
+        t0 = time.time()
+        rows: List[ScanRow] = []
+        intervals: List[float] = []
+        for sym in self.symbols:
+            try:
+                row, interval = self._scan_one(sym)
+            except Exception as e:
+                self.errors += 1
+                print("[SCAN] exception:", e)
+                continue
+            rows.append(row)
+            if interval:
+                intervals.append(interval)
+        rows.sort(key=lambda r: (r.score, r.conf), reverse=True)
+        with self.lock:
+            self.rows = rows
+            self.last_ts = time.time()
+            self.last_sec = self.last_ts - t0
+            self.budget_sec = min(intervals) if intervals else None
+            self.scans += 1
+        self.scan_time.record(self.last_sec)
+        return rows
+
+    def age(self) -> Optional[float]:
+        return (time.time() - self.last_ts) if self.last_ts else None
+
+    def fresh(self, max_age: float) -> Optional[List[ScanRow]]:
+        """
+        הדירוג האחרון, אם הוא לא ישן מ-max_age (+ משך הסריקה האחרונה — סריקה
+        ארוכה מהמרווח היא עדיין "הסריקה הנוכחית"). None = אין / ישנה.
+        """
+        with self.lock:
+            if self.last_ts and time.time() - self.last_ts <= max_age + self.last_sec:
+                return list(self.rows)
+        return None
+
+    def run_forever(self, interval_sec: float = SCAN_INTERVAL_SEC):
+        while True:
+            t0 = time.time()
+            try:
+                self.scan()
+            except Exception as e:
+                print("[SCAN LOOP] exception:", e)
+            time.sleep(max(0.05, interval_sec - (time.time() - t0)))
+
+    def start(self, interval_sec: float = SCAN_INTERVAL_SEC) -> threading.Thread:
+        t = threading.Thread(target=self.run_forever, args=(interval_sec,), daemon=True)
+        t.start()
+        return t
+
+    def status_line(self) -> str:
+        s = self.scan_time.summary()
+        if not s["n"]:
+            return f"Scanner: {len(self.symbols)} symbols | no scan yet"
+        budget = self.budget_sec
+        keeps_up = "n/a" if budget is None else ("OK" if s["p95"] <= budget * 1000.0 else "SLOW")
+        return (
+            f"Scanner: {len(self.symbols)} symbols | scan last {s['last']:.0f}ms "
+            f"p95 {s['p95']:.0f}ms | tick budget "
+            f"{'n/a' if budget is None else f'{budget*1000:.0f}ms'} ({keeps_up}) | scans: {self.scans}"
+        )
@@ -0,0 +1,83 @@
+# startup_bench.py
+from __future__ import annotations
+import argparse, os, re, statistics, subprocess, sys
+from typing import Dict, List, Tuple
+
+###############################################################################
+# Startup benchmark
+# -----------------
+# 1. import של main תחת `python -X importtime` (תהליך נקי בכל ריצה): זמן כולל,
+#    המודולים הכבדים ביותר (cumulative / self), ובדיקה שמודולים כבדים שאמורים
+#    להיות עצלים (lazy_import.py) לא נטענים ב-import.
+# 2. time-to-first-poll: `python main.py` עם STARTUP_BENCH=1 — main() רץ עד
+#    הרגע שלפני infinity_polling, מדפיס את STARTUP.status_line() ויוצא.
+#    במצב הזה main() מדלג על כל מה שנוגע ברשת / בבוט שרץ (נעילת מופע,
+#    aggressive_reset, ה-fetcher, סנכרון ה-learner מ-GitHub), והטוקן תמיד דמה.
+#
+#   python startup_bench.py --runs 5 --top 15
+#   python startup_bench.py --no-poll        (רק imports, בלי להריץ את main())
+###############################################################################
+
+LAZY_EXPECTED = ("matplotlib", "selenium")
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["TELEGRAM_BOT_TOKEN"] = "1:bench"   # אף פעם לא הטוקן האמיתי מהסביבה
+    return env
+
+
+def import_profile() -> List[Tuple[str, int, int, int]]:
+    """[(module, self_us, cumulative_us, depth)] מריצה אחת של -X importtime."""
+    r = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                       capture_output=True, text=True, env=_env())
+    rows = []
+    for line in r.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    if r.returncode != 0:
+        raise RuntimeError(r.stderr.strip().splitlines()[-1] if r.stderr.strip() else "import main failed")
+    return rows
+
+
+def first_poll() -> str:
+    r = subprocess.run([sys.executable, "main.py"], capture_output=True, text=True,
+                       env=dict(_env(), STARTUP_BENCH="1"), timeout=120)
+    lines = [l for l in r.stdout.splitlines() if l.startswith("Startup:")]
+    return lines[-1] if lines else f"no startup line (exit {r.returncode})"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Import-time and time-to-first-poll benchmark")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=15)
+    ap.add_argument("--no-poll", action="store_true", help="skip the main() run")
+    args = ap.parse_args()
+
+    totals, last = [], []
+    for _ in range(args.runs):
+        last = import_profile()
+        totals.append(next((cum for name, _, cum, _ in last if name == "main"), 0))
+    print(f"import main: median {statistics.median(totals) / 1000:.0f}ms | "
+          f"min {min(totals) / 1000:.0f}ms | max {max(totals) / 1000:.0f}ms ({args.runs} runs)")
+
+    top_level = [r for r in last if r[3] == 1]
+    print(f"\nTop {args.top} direct imports of main (cumulative):")
+    for name, _, cum, _ in sorted(top_level, key=lambda r: -r[2])[:args.top]:
+        print(f"  {cum / 1000:8.1f}ms  {name}")
+    print(f"\nTop {args.top} modules by self time:")
+    for name, self_us, _, _ in sorted(last, key=lambda r: -r[1])[:args.top]:
+        print(f"  {self_us / 1000:8.1f}ms  {name}")
+
+    loaded = {name.split(".")[0] for name, *_ in last}
+    eager = [m for m in LAZY_EXPECTED if m in loaded]
+    print("\nLazy modules loaded at import: " + (", ".join(eager) if eager else "none ✅"))
+
+    if not args.no_poll:
+        print("\n" + first_poll())
+
+
+if __name__ == "__main__":
+    main()
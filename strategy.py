@@ -1,8 +1,11 @@
 # strategy.py
 from __future__ import annotations
-import math, time
+import json, math, os, threading, time
 from typing import Tuple, Dict, List
 
+from ensemble import run_ensemble
+from features import classify_regime
+
 CFG = {
     "WINDOW_SEC": 26.0,      # מתעדכן מהבוט
     "ALPHA_FAST": 0.40,
@@ -18,8 +21,89 @@ CFG = {
     "NEUTRAL_RSI_LOW": 48.0,
     "NEUTRAL_RSI_HIGH": 52.0,
     "EXPIRY": "M1",
+    # משקלים / עונשים / בונוסים (היו קבועים בקוד; ניתנים לכיול ב-walkforward.py)
+    "W_EMA": 0.58,            # משקל ema_spread בציון הגולמי
+    "W_SLOPE": 0.42,          # משקל trend_slope בציון הגולמי
+    "PEN_SHOCK": 0.5,         # הלם: תנודתיות גבוהה בלי כיוון
+    "PEN_RANGE": 0.7,         # דשדוש: שיפוע נמוך + התמדה נמוכה
+    "PEN_COUNTER": 0.65,      # כניסה נגד המגמה
+    "PEN_RSI_NEUTRAL": 0.75,  # RSI באזור הניטרלי
+    "PEN_LOW_VOL": 0.85,      # vol מתחת ל-VOL_GUARD
+    # ספי הרג'ים ה-inline (כש-REGIME_STREAM כבוי); quantiles.py יכול להחליפם באחוזונים
+    "SHOCK_VOL": 3e-3,        # הלם: vol מעל...
+    "SHOCK_SLOPE": 1e-3,      # ...ו-|slope| מתחת
+    "RANGE_SLOPE": 6e-4,      # דשדוש: |slope| מתחת (+ התמדה < 0.6)
+    "BONUS_ALIGN": 0.12,      # יישור טווח ארוך + תמיכת RSI
+    "BONUS_BREAKOUT": 0.10,   # פריצה בכיוון הסיגנל
+    "BONUS_IMB": 0.06,        # חוסר איזון טיקים
+    "BONUS_XASSET": 0.06,     # אישור/סתירה מנכסים מתואמים (correlation.py, ב-main)
+    # Ensemble (ensemble.py): off / weighted / majority / unanimous
+    "ENSEMBLE_MODE": os.getenv("STRAT_ENSEMBLE", "off").strip().lower() or "off",
+    "ENS_W_BLEND": 1.0,       # משקל 0 = head כבוי
+    "ENS_W_BREAKOUT": 0.5,
+    "ENS_W_RSI_MR": 0.5,
+    "MR_RSI_HIGH": 70.0,      # rsi_mr: מעל -> DOWN
+    "MR_RSI_LOW": 30.0,       # rsi_mr: מתחת -> UP
+    "REGIME_STREAM": 1.0,     # 1 = עונשי SHOCK/RANGE מהגלאי המתגלגל (regime.py) כשיש
 }
 
+# גרסת קונפיג: עולה בכל שינוי ב-CFG / בהגדרות הנכס, כדי לבטל החלטות שמורות
+_CFG_VERSION = 0
+
+def cfg_version() -> int:
+    return _CFG_VERSION
+
+def bump_cfg_version() -> int:
+    """נקרא אחרי כל שינוי ב-CFG (או בהגדרות נכס שמשפיעות עליו)."""
+    global _CFG_VERSION
+    _CFG_VERSION += 1
+    return _CFG_VERSION
+
+# ===== Presets פר נכס (מתוך sweep.py) =====
+# רק המפתחות האלה נטענים מ-preset; השאר (חלון, expiry) נשלטים מהבוט.
+PRESET_KEYS = (
+    "ALPHA_FAST", "ALPHA_SLOW", "HYSTERESIS", "VOL_GUARD", "COOLDOWN_SEC",
+    "RSI_BULL", "RSI_BEAR", "NEUTRAL_RSI_LOW", "NEUTRAL_RSI_HIGH",
+    "W_EMA", "W_SLOPE", "PEN_SHOCK", "PEN_RANGE", "PEN_COUNTER",
+    "PEN_RSI_NEUTRAL", "PEN_LOW_VOL", "BONUS_ALIGN", "BONUS_BREAKOUT", "BONUS_IMB",
+)
+_BASE_CFG = {k: CFG[k] for k in PRESET_KEYS}
+PRESETS: Dict[str, Dict] = {}
+
+def load_presets(path: str) -> int:
+    """טוען קובץ presets (פלט של sweep.py). מחזיר כמה סימבולים נטענו."""
+    if not path or not os.path.exists(path):
+        return 0
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return 0
+    PRESETS.clear()
+    for sym, entry in (data.get("presets") or {}).items():
+        cfg = entry.get("cfg") if isinstance(entry, dict) else None
+        if isinstance(cfg, dict):
+            PRESETS[sym] = {k: float(v) for k, v in cfg.items() if k in PRESET_KEYS}
+    return len(PRESETS)
+
+def apply_preset(symbol: str) -> bool:
+    """מחזיר את ברירות המחדל ואז מלביש את ה-preset של הסימבול (אם יש)."""
+    CFG.update(_BASE_CFG)
+    preset = PRESETS.get(symbol)
+    if preset:
+        CFG.update(preset)
+    return bool(preset)
+
+def cfg_for(symbol: str) -> Dict:
+    """
+    CFG כפי שהוא היה אחרי apply_preset(symbol) — בלי לגעת ב-CFG הגלובלי.
+    לסורק, שמעריך סימבולים שאינם הנכס הנוכחי (חלון / expiry משותפים).
+    """
+    c = dict(CFG)
+    c.update(_BASE_CFG)
+    c.update(PRESETS.get(symbol) or {})
+    return c
+
 # ===== עזרי חישוב =====
 def _log_changes(prices: List[float]) -> List[float]:
     if not prices:
@@ -30,6 +114,10 @@ def _log_changes(prices: List[float]) -> List[float]:
 def _diffs(x: List[float]) -> List[float]:
     return [x[i] - x[i-1] for i in range(1, len(x))] if len(x) > 1 else []
 
+def _log_steps(prices: List[float]) -> List[float]:
+    """log(p_i/p_{i-1}) — בדיוק כמו הצעדים של SymbolStream ו-vector_signal (לא הפרש של _log_changes)."""
+    return [math.log(max(1e-12, prices[i] / prices[i-1])) for i in range(1, len(prices))]
+
 def _ema_alpha(series: List[float], alpha: float) -> float:
     if not series:
         return 0.0
@@ -81,41 +169,111 @@ def _breakout_flags(prices: list[float]) -> tuple[bool, bool]:
     last = prices[-1]
     return (last > hi, last < lo)
 
+# ===== שעון =====
+# בלייב: time.time. ב-backtest מחליפים לשעון מדומה (זמן הטיק הנוכחי),
+# כדי שה-cooldown והחלון יתנהגו כמו שהיו מתנהגים בזמן אמת.
+_clock = time.time
+
+def set_clock(fn=None):
+    """fn=None מחזיר לשעון האמיתי."""
+    global _clock
+    _clock = fn or time.time
+
 # ===== מצב פנימי =====
-_LAST_SIGNAL_TS = 0.0
-_LAST_SIDE = "WAIT"
-_LAST_NORM = 0.0
-_CONF_EWMA = 50.0
-
-def _apply_hysteresis(side: str, norm_score: float) -> Tuple[str, float]:
-    global _LAST_SIDE, _LAST_NORM
-    if _LAST_SIDE in ("UP", "DOWN") and side != _LAST_SIDE:
-        if norm_score < (_LAST_NORM + CFG["HYSTERESIS"]):
-            return _LAST_SIDE, _LAST_NORM
-    _LAST_SIDE, _LAST_NORM = side, norm_score
-    return side, norm_score
+# היסטרזיס / EWMA / cooldown — לכל סימבול בנפרד (הסורק מעריך את כולם),
+# כדי שהחלטה על נכס אחד לא "תזהם" את הריכוך של נכס אחר.
+class StrategyState:
+    def __init__(self):
+        self.reset()
 
-def compute_signal_from_prices(prices: List[float]) -> Tuple[str, int, Dict]:
-    global _LAST_SIGNAL_TS, _CONF_EWMA
-    now_ts = time.time()
+    def reset(self):
+        self.last_signal_ts = 0.0
+        self.last_side = "WAIT"
+        self.last_norm = 0.0
+        self.conf_ewma = 50.0
 
-    if not prices or len(prices) < 10:
-        return "WAIT", 50, {"reason": "insufficient_data"}
+_DEFAULT_STATE = StrategyState()   # למי שלא מעביר state (backtest exact)
+_STATES: Dict[str, StrategyState] = {}
+_STATES_LOCK = threading.Lock()
 
+def state_for(symbol: str) -> StrategyState:
+    with _STATES_LOCK:
+        st = _STATES.get(symbol)
+        if st is None:
+            st = _STATES[symbol] = StrategyState()
+        return st
+
+def reset_state():
+    """מצב התחלתי נקי (כמו אחרי הפעלה) — ל-backtest של כמה סימבולים ברצף."""
+    _DEFAULT_STATE.reset()
+    with _STATES_LOCK:
+        for st in _STATES.values():
+            st.reset()
+
+def _apply_hysteresis(side: str, norm_score: float, st: StrategyState,
+                      hysteresis: float) -> Tuple[str, float]:
+    if st.last_side in ("UP", "DOWN") and side != st.last_side:
+        if norm_score < (st.last_norm + hysteresis):
+            return st.last_side, st.last_norm
+    st.last_side, st.last_norm = side, norm_score
+    return side, norm_score
+
+def compute_features(prices: List[float], pre: Dict | None = None,
+                     cfg: Dict | None = None) -> Dict:
+    """
+    מעבר פיצ'רים משותף (פעם אחת לטיק) — כל מה שלא תלוי במצב / בצד שנבחר.
+    ה-heads (blend כאן, והשאר ב-ensemble.py) קוראים רק מהמילון הזה.
+    """
+    cfg = cfg or CFG
+    pre = pre or {}
     ch  = _log_changes(prices)
-    df  = _diffs(ch)
-    vol = _robust_vol(df)
-    ema_fast  = _ema_alpha(ch, CFG["ALPHA_FAST"])
-    ema_slow  = _ema_alpha(ch, CFG["ALPHA_SLOW"])
+    df  = _log_steps(prices) if ("vol" not in pre or "persist_log" not in pre) else None
+    vol = pre["vol"] if "vol" in pre else _robust_vol(df)
+    ema_fast  = _ema_alpha(ch, cfg["ALPHA_FAST"])
+    ema_slow  = _ema_alpha(ch, cfg["ALPHA_SLOW"])
     ema_spread = ema_fast - ema_slow
     trend_slope = ch[-1] - ch[0] # שיפוע לוגריתמי
-    rsi_v = _rsi(prices, CFG["RSI_PERIOD"])
+    rsi_v = _rsi(prices, cfg["RSI_PERIOD"])
 
-    raw  = 0.58 * ema_spread + 0.42 * trend_slope
+    raw  = cfg["W_EMA"] * ema_spread + cfg["W_SLOPE"] * trend_slope
     norm = abs(raw) / max(1e-9, vol)
 
-    side_pre = _direction_from_score(raw, prices)
-    side, norm_adj = _apply_hysteresis(side_pre, norm)
+    persist_log_steps = pre["persist_log"] if "persist_log" in pre else _persistence_ratio(df) # התמדה של צעדי הלוג (0..1)
+
+    # טווח ארוך (ליישור)
+    long_win_n   = max(20, int(round(len(prices) * 2.5)))
+    long_prices  = prices[-long_win_n:] if len(prices) >= long_win_n else prices
+    chL  = _log_changes(long_prices)
+    ema_spread_L = _ema_alpha(chL, cfg["ALPHA_FAST"]) - _ema_alpha(chL, cfg["ALPHA_SLOW"])
+    slope_L      = chL[-1] - chL[0]
+    side_long    = _direction_from_score(cfg["W_EMA"]*ema_spread_L + cfg["W_SLOPE"]*slope_L, long_prices)
+
+    bo_up, bo_dn = (pre["bo_up"], pre["bo_dn"]) if "bo_up" in pre else _breakout_flags(prices)
+
+    if "persist_price" in pre:
+        persist_price, tick_imbalance = pre["persist_price"], pre["tick_imb"]
+    else:
+        persist_price = _persistence_ratio(_diffs(prices))  # על מחיר ישיר לרגישות צד
+        tick_imbalance = abs(2*persist_price - 1.0)         # 0..1, 0.36 ≈ 68%
+
+    return {
+        "prices": prices,
+        "vol": vol, "ema_spread": ema_spread, "trend_slope": trend_slope, "rsi": rsi_v,
+        "raw": raw, "norm": norm, "persist_log": persist_log_steps,
+        "side_long": side_long, "bo_up": bo_up, "bo_dn": bo_dn,
+        "persist_price": persist_price, "tick_imb": tick_imbalance,
+        "regime": pre.get("regime"),
+    }
+
+def _blend_head(feat: Dict, st: StrategyState, cfg: Dict, now_ts: float) -> Tuple[str, int, Dict]:
+    """ה-head המקורי: EMA + שיפוע, היסטרזיס, עונשי רג'ים, בונוסי יישור, EWMA ו-cooldown."""
+    prices = feat["prices"]
+    vol, rsi_v = feat["vol"], feat["rsi"]
+    ema_spread, trend_slope = feat["ema_spread"], feat["trend_slope"]
+    persist_price, tick_imbalance = feat["persist_price"], feat["tick_imb"]
+
+    side_pre = _direction_from_score(feat["raw"], prices)
+    side, norm_adj = _apply_hysteresis(side_pre, feat["norm"], st, cfg["HYSTERESIS"])
 
     # ================================================================
     # שדרוג: מנגנון סינון סיכונים (Regime / Counter-Trend)
@@ -124,21 +282,31 @@ def compute_signal_from_prices(prices: List[float]) -> Tuple[str, int, Dict]:
     # אם תנאי השוק נראים מסוכנים (הלם, דשדוש, נגד מגמה).
     # ================================================================
     regime_penalty = 1.0
-    persist_log_steps = _persistence_ratio(df) # התמדה של צעדי הלוג (0..1)
+    persist_log_steps = feat["persist_log"]
+    regime = feat.get("regime") if cfg["REGIME_STREAM"] else None
 
-    # 1. זיהוי "SHOCK" (תנודתיות גבוהה מאוד, אבל ללא כיוון ברור)
-    if vol > 3e-3 and abs(trend_slope) < 1e-3:
-        regime_penalty *= 0.5 # עונש חריף על "הלם"
-        
-    # 2. זיהוי "RANGE" (שיפוע נמוך והתמדה נמוכה - "דשדוש")
-    if abs(trend_slope) < 6e-4 and persist_log_steps < 0.6:
-        regime_penalty *= 0.7 # עונש קל על "דשדוש"
+    if regime is not None:
+        # רג'ים מהגלאי המתגלגל (regime.py): ספים לפי ה-vol של הסימבול + היסטרזיס
+        if regime == "SHOCK":
+            regime_penalty *= cfg["PEN_SHOCK"]
+        elif regime == "RANGE":
+            regime_penalty *= cfg["PEN_RANGE"]
+    else:
+        # 1. זיהוי "SHOCK" (תנודתיות גבוהה מאוד, אבל ללא כיוון ברור)
+        if vol > cfg["SHOCK_VOL"] and abs(trend_slope) < cfg["SHOCK_SLOPE"]:
+            regime_penalty *= cfg["PEN_SHOCK"] # עונש חריף על "הלם"
+
+        # 2. זיהוי "RANGE" (שיפוע נמוך והתמדה נמוכה - "דשדוש")
+        if abs(trend_slope) < cfg["RANGE_SLOPE"] and persist_log_steps < 0.6:
+            regime_penalty *= cfg["PEN_RANGE"] # עונש קל על "דשדוש"
+        regime = classify_regime(trend_slope, vol, persist_log_steps, cfg["SHOCK_VOL"],
+                                 cfg["SHOCK_SLOPE"], cfg["RANGE_SLOPE"])  # לתצוגה בלבד
         
     # 3. עונש על כניסה נגד מגמה (אם המגמה משמעותית)
     if side == "UP" and trend_slope < -1e-4:
-        regime_penalty *= 0.65 # עונש בינוני
+        regime_penalty *= cfg["PEN_COUNTER"] # עונש בינוני
     elif side == "DOWN" and trend_slope > 1e-4:
-        regime_penalty *= 0.65 # עונש בינוני
+        regime_penalty *= cfg["PEN_COUNTER"] # עונש בינוני
 
     # החלת העונש הכולל
     norm_adj *= regime_penalty
@@ -147,73 +315,119 @@ def compute_signal_from_prices(prices: List[float]) -> Tuple[str, int, Dict]:
     # ================================================================
 
     # עונשים “רכים”
-    if CFG["NEUTRAL_RSI_LOW"] <= rsi_v <= CFG["NEUTRAL_RSI_HIGH"]:
-        norm_adj *= 0.75
-    if vol < CFG["VOL_GUARD"]:
-        norm_adj *= 0.85
+    if cfg["NEUTRAL_RSI_LOW"] <= rsi_v <= cfg["NEUTRAL_RSI_HIGH"]:
+        norm_adj *= cfg["PEN_RSI_NEUTRAL"]
+    if vol < cfg["VOL_GUARD"]:
+        norm_adj *= cfg["PEN_LOW_VOL"]
 
     # ===== מגבר יישור (alignment) =====
-    long_win_n   = max(20, int(round(len(prices) * 2.5)))
-    long_prices  = prices[-long_win_n:] if len(prices) >= long_win_n else prices
-    chL  = _log_changes(long_prices)
-    dfL  = _diffs(chL)
-    ema_spread_L = _ema_alpha(chL, CFG["ALPHA_FAST"]) - _ema_alpha(chL, CFG["ALPHA_SLOW"])
-    slope_L      = chL[-1] - chL[0]
-    side_long    = _direction_from_score(0.58*ema_spread_L + 0.42*slope_L, long_prices)
-
-    bo_up, bo_dn = _breakout_flags(prices)
-    breakout_ok  = (bo_up and side == "UP") or (bo_dn and side == "DOWN")
+    breakout_ok  = (feat["bo_up"] and side == "UP") or (feat["bo_dn"] and side == "DOWN")
 
-    persist_price = _persistence_ratio(_diffs(prices))  # על מחיר ישיר לרגישות צד
-    tick_imbalance = abs(2*persist_price - 1.0)         # 0..1, 0.36 ≈ 68%
-
-    rsi_support = (side == "UP" and rsi_v >= max(58.0, CFG["RSI_BULL"])) or \
-                  (side == "DOWN" and rsi_v <= min(42.0, CFG["RSI_BEAR"]))
+    rsi_support = (side == "UP" and rsi_v >= max(58.0, cfg["RSI_BULL"])) or \
+                  (side == "DOWN" and rsi_v <= min(42.0, cfg["RSI_BEAR"]))
 
     alignment_bonus = 0.0
-    if side == side_long and rsi_support:
-        alignment_bonus += 0.12
+    if side == feat["side_long"] and rsi_support:
+        alignment_bonus += cfg["BONUS_ALIGN"]
     if breakout_ok:
-        alignment_bonus += 0.10
+        alignment_bonus += cfg["BONUS_BREAKOUT"]
     if tick_imbalance >= 0.36:
-        alignment_bonus += 0.06
+        alignment_bonus += cfg["BONUS_IMB"]
 
     # בסיס בטחון
     conf_base = 50 + 30 * math.tanh(norm_adj)
     conf_base += alignment_bonus * 100.0  # עד ~+12 נק'
 
     # ריכוך EWMA
-    _CONF_EWMA = 0.6*_CONF_EWMA + 0.4*conf_base
-    conf = int(max(CFG["CONF_MIN"], min(CFG["CONF_MAX"], _CONF_EWMA)))
+    st.conf_ewma = 0.6*st.conf_ewma + 0.4*conf_base
+    conf = int(max(cfg["CONF_MIN"], min(cfg["CONF_MAX"], st.conf_ewma)))
 
     # Cooldown: מניעת היפוך מיידי
-    if _LAST_SIGNAL_TS and (now_ts - _LAST_SIGNAL_TS) < CFG["COOLDOWN_SEC"]:
-        if side != _LAST_SIDE and side in ("UP","DOWN"):
-            return "WAIT", max(52, CFG["CONF_MIN"]-3), {"reason":"cooldown"}
+    if st.last_signal_ts and (now_ts - st.last_signal_ts) < cfg["COOLDOWN_SEC"]:
+        if side != st.last_side and side in ("UP","DOWN"):
+            # ערכי החלון נשארים ב-dbg — ה-sketches של quantiles.py דוגמים כל החלטה
+            return "WAIT", max(52, cfg["CONF_MIN"]-3), {
+                "reason": "cooldown",
+                "vol": vol, "rsi": rsi_v, "ema_spread": ema_spread,
+                "trend_slope": trend_slope, "regime": regime,
+            }
 
-    if conf < CFG["CONF_MIN"]:
+    if conf < cfg["CONF_MIN"]:
         return "WAIT", conf, {
             "vol": vol, "rsi": rsi_v, "ema_spread": ema_spread,
             "trend_slope": trend_slope, "norm": norm_adj,
             "persist": persist_price, "tick_imb": tick_imbalance,
             "align_bonus": alignment_bonus,
-            "penalty": regime_penalty # הוספנו לפלט
+            "penalty": regime_penalty, # הוספנו לפלט
+            "regime": regime,
         }
 
-    _LAST_SIGNAL_TS = now_ts
+    st.last_signal_ts = now_ts
     dbg = {
         "n": len(prices),
         "price_now": prices[-1],
         "vol": vol, "rsi": rsi_v, "ema_spread": ema_spread, "trend_slope": trend_slope,
         "norm": norm_adj, "persist": persist_price, "tick_imb": tick_imbalance,
-        "align_bonus": alignment_bonus, "expiry": CFG["EXPIRY"],
-        "penalty": regime_penalty # הוספנו לפלט
+        "align_bonus": alignment_bonus, "expiry": cfg["EXPIRY"],
+        "penalty": regime_penalty, # הוספנו לפלט
+        "regime": regime,
     }
     return side, conf, dbg
 
-def decide_from_ticks(ticks_deque) -> Tuple[str, int, Dict]:
-    now = time.time()
-    window = [p for (ts, p) in list(ticks_deque) if now - ts <= CFG["WINDOW_SEC"]]
+def compute_signal_from_prices(prices: List[float], pre: Dict | None = None,
+                               state: StrategyState | None = None,
+                               cfg: Dict | None = None, store=None) -> Tuple[str, int, Dict]:
+    """
+    pre: ערכים שכבר חושבו בצורה מצטברת לאותו חלון (stream_state.SymbolStream):
+    vol, persist_log, persist_price/tick_imb, bo_up/bo_dn — קריאות O(1)
+    במקום מיון / מעבר מלא על החלון בכל החלטה.
+    state / cfg: המצב והקונפיג של הסימבול (state_for / cfg_for); ברירת מחדל — הגלובליים.
+    cfg["ENSEMBLE_MODE"] != "off": ה-blend הוא head אחד מתוך כמה (ensemble.py),
+    כולם על אותו מעבר פיצ'רים.
+    store: FeatureStore של הסימבול (feature_store.py) — מקבל את הפיצ'רים של הטיק.
+    """
+    st = state or _DEFAULT_STATE
+    cfg = cfg or CFG
+    now_ts = _clock()
+
+    if not prices or len(prices) < 10:
+        return "WAIT", 50, {"reason": "insufficient_data"}
+
+    feat = compute_features(prices, pre, cfg)
+    if store is not None:
+        store.publish(feat, now_ts, cfg)
+    side, conf, dbg = _blend_head(feat, st, cfg, now_ts)
+    if cfg.get("ENSEMBLE_MODE", "off") == "off":
+        return side, conf, dbg
+    return run_ensemble(feat, (side, conf, dbg), cfg)
+
+# ===== דירוג איכות סיגנל =====
+def quality_label(conf: int, align_bonus: float) -> str:
+    if conf >= 75 or align_bonus >= 0.2:
+        return "🟩 Strong"
+    if conf >= 65:
+        return "🟨 Medium"
+    return "🟥 Weak"
+
+def decide_from_ticks(ticks_deque, stream=None, state: StrategyState | None = None,
+                      cfg: Dict | None = None, store=None) -> Tuple[str, int, Dict]:
+    """
+    stream: SymbolStream של הסימבול (אופציונלי) — אם החלון שלו תואם,
+    הערכים המצטברים שלו נכנסים ל-compute_signal_from_prices במקום חישוב מלא.
+    state / cfg / store: ראו compute_signal_from_prices.
+    """
+    cfg = cfg or CFG
+    now = _clock()
+    window = [p for (ts, p) in list(ticks_deque) if now - ts <= cfg["WINDOW_SEC"]]
     if len(window) < 12:
         window = [p for (_, p) in list(ticks_deque)[-12:]]
-    return compute_signal_from_prices(window)
+
+    pre = None
+    if stream is not None:
+        W = float(cfg["WINDOW_SEC"])
+        if stream.window_sec != W:
+            stream.rebuild(W, ticks_deque)
+        pre = stream.snapshot(now, W)
+        if pre is not None and pre["n"] != len(window):
+            pre = None  # ה-stream לא מסונכרן עם ה-deque — חישוב רגיל
+    return compute_signal_from_prices(window, pre, state, cfg, store)
@@ -0,0 +1,176 @@
+# stream_state.py
+from __future__ import annotations
+import collections, math, threading
+from typing import Dict, Optional
+
+from regime import RegimeDetector
+from rolling import RollingMedianMAD
+
+###############################################################################
+# מצב מתגלגל פר סימבול
+# --------------------
+# כל טיק מה-fetcher (add_tick_listener) מעדכן את החלון של הסימבול שלו:
+# הטיק נכנס, טיקים שיצאו מה-WINDOW_SEC נזרקים, והמבנים המצטברים מתעדכנים
+# ב-O(log n) במקום לחשב מחדש את כל החלון בכל החלטה.
+#
+# החלון זהה לזה של strategy.decide_from_ticks (now - ts <= WINDOW_SEC),
+# וצעדי הלוג הם log(p_i/p_{i-1}) — אותם צעדים כמו _diffs(_log_changes(prices)).
+#
+# מה מתוחזק:
+# - RollingMedianMAD על צעדי הלוג -> vol
+# - deque מונוטוני למקסימום / מינימום של החלון בלי הטיק האחרון -> פריצה
+# - מוני צעדים חיוביים (לוג / מחיר) -> persist, tick_imb
+# - RegimeDetector (regime.py) שמתעדכן מאותם ערכים בכל טיק
+# snapshot() מחזיר None כשהחלון לא תואם (פחות מ-12 טיקים -> האסטרטגיה
+# נופלת ל-12 האחרונים ומחשבת בעצמה).
+###############################################################################
+
+MIN_STREAM_TICKS = 12
+
+
+class SymbolStream:
+    def __init__(self, symbol: str, window_sec: float):
+        self.symbol = symbol
+        self.lock = threading.Lock()
+        self.window_sec = float(window_sec)
+        self.regime = RegimeDetector()   # לא מתאפס ב-rebuild — ה-vol ה"רגיל" נשמר
+        self._reset()
+
+    def _reset(self):
+        # (seq, ts, price, log_step|None, price_step_up|None)
+        self.ticks: collections.deque = collections.deque()
+        self.steps = RollingMedianMAD()
+        self.seq = 0
+        # קיצון של החלון בלי הטיק האחרון: (seq, price), מונוטוני יורד / עולה
+        self._maxq: collections.deque = collections.deque()
+        self._minq: collections.deque = collections.deque()
+        self.pos_log = 0     # צעדי לוג >= 0 בחלון
+        self.pos_price = 0   # צעדי מחיר >= 0 בחלון
+
+    # ---------- עדכון ----------
+
+    def _push(self, ts: float, price: float):
+        step = up = None
+        if self.ticks:
+            prev_seq, _, prev, _, _ = self.ticks[-1]
+            step = math.log(max(1e-12, price / prev)) if prev > 0 else 0.0
+            up = price >= prev
+            self.steps.add(step)
+            self.pos_log += step >= 0
+            self.pos_price += up
+            # הטיק הקודם כבר לא "האחרון" — נכנס לקיצון
+            while self._maxq and self._maxq[-1][1] <= prev:
+                self._maxq.pop()
+            self._maxq.append((prev_seq, prev))
+            while self._minq and self._minq[-1][1] >= prev:
+                self._minq.pop()
+            self._minq.append((prev_seq, prev))
+        self.seq += 1
+        self.ticks.append((self.seq, ts, price, step, up))
+
+    def _evict(self, now: float):
+        W = self.window_sec
+        while self.ticks and now - self.ticks[0][1] > W:
+            old_seq = self.ticks.popleft()[0]
+            if self._maxq and self._maxq[0][0] == old_seq:
+                self._maxq.popleft()
+            if self._minq and self._minq[0][0] == old_seq:
+                self._minq.popleft()
+            if self.ticks:
+                # הצעד של הטיק הראשון החדש היה מול הטיק שיצא — כבר לא בחלון
+                sq, ts, p, step, up = self.ticks[0]
+                if step is not None:
+                    self.steps.remove(step)
+                    self.pos_log -= step >= 0
+                    self.pos_price -= up
+                    self.ticks[0] = (sq, ts, p, None, None)
+
+    def on_tick(self, ts: float, price: float):
+        with self.lock:
+            self._push(ts, price)
+            self._evict(ts)
+            n = len(self.ticks)
+            if n >= MIN_STREAM_TICKS:
+                first, last = self.ticks[0][2], self.ticks[-1][2]
+                slope = math.log(max(1e-12, last / first)) if first > 0 else 0.0
+                self.regime.update(ts, slope, self.steps.robust_vol(),
+                                   self._persist_last(), n)
+
+    def _persist_last(self) -> float:
+        # features.rolling_persistence: אחוז הצעדים עם הסימן של האחרון
+        persist_log = self.pos_log / (len(self.ticks) - 1)
+        last_step = self.ticks[-1][3]
+        return persist_log if (last_step or 0.0) >= 0 else 1.0 - persist_log
+
+    def rebuild(self, window_sec: float, ticks):
+        """חלון השתנה (או סנכרון ראשון) — בנייה מחדש מה-deque של ה-fetcher."""
+        with self.lock:
+            self.window_sec = float(window_sec)
+            self._reset()
+            items = list(ticks)
+            if items:
+                last = items[-1][0]
+                for ts, p in items:
+                    if last - ts <= self.window_sec:
+                        self._push(ts, p)
+
+    # ---------- קריאה ----------
+
+    def size(self, now: float) -> int:
+        """כמה טיקים בחלון ב-now (לבריאות הפיד בסורק)."""
+        with self.lock:
+            self._evict(now)
+            return len(self.ticks)
+
+    def snapshot(self, now: float, window_sec: float) -> Optional[Dict]:
+        """
+        ערכים מוכנים לחלון הנוכחי (אותו חלון כמו decide_from_ticks ב-now),
+        או None אם צריך לחשב רגיל.
+        """
+        with self.lock:
+            if float(window_sec) != self.window_sec:
+                return None
+            self._evict(now)
+            n = len(self.ticks)
+            if n < MIN_STREAM_TICKS:
+                return None
+            last = self.ticks[-1][2]
+            hi, lo = self._maxq[0][1], self._minq[0][1]
+            steps = n - 1
+            persist_log = self.pos_log / steps
+            persist_price = self.pos_price / steps
+            snap = {
+                "n": n,
+                "vol": self.steps.robust_vol(),
+                "persist_log": persist_log,
+                "persist_last": self._persist_last(),
+                "persist_price": persist_price,
+                "tick_imb": abs(2 * persist_price - 1.0),
+                "bo_up": last > hi,
+                "bo_dn": last < lo,
+            }
+            if self.regime.seen:
+                snap["regime"] = self.regime.current
+            return snap
+
+
+class StreamRegistry:
+    def __init__(self, window_sec: float = 26.0):
+        self.lock = threading.Lock()
+        self.window_sec = float(window_sec)
+        self.streams: Dict[str, SymbolStream] = {}
+
+    def get(self, symbol: str) -> SymbolStream:
+        with self.lock:
+            st = self.streams.get(symbol)
+            if st is None:
+                st = SymbolStream(symbol, self.window_sec)
+                self.streams[symbol] = st
+            return st
+
+    def on_tick(self, symbol: str, ts: float, price: float):
+        self.get(symbol).on_tick(ts, price)
+
+
+# אינסטנס גלובלי — נרשם כ-tick listener ב-main.ensure_fetcher
+STREAMS = StreamRegistry()
@@ -0,0 +1,213 @@
+# sweep.py
+from __future__ import annotations
+import argparse, itertools, json, math, os, random, time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from strategy import CFG, PRESET_KEYS
+from tick_history import TICK_HISTORY_DIR, list_symbols, load_symbol
+from vector_signal import FeatureCache, TickSeries
+
+###############################################################################
+# Sweep פרמטרים מעל strategy.CFG
+# ------------------------------
+# מריץ גריד (או דגימה אקראית ממנו) של וריאנטים על היסטוריית טיקים מוקלטת
+# (tick_history), דרך המסלול המוקטר (vector_signal), ומדרג לפי אחוז פגיעה
+# בפועל ב-expiry שנבחר. העבודה מתחלקת ל-ProcessPool לפי (סימבול, חבילת וריאנטים);
+# כל worker טוען סימבול פעם אחת ומחזיק FeatureCache משלו.
+#
+# הפלט: קובץ JSON עם preset לכל סימבול, שהבוט טוען (strategy.load_presets).
+#
+#   python sweep.py --history ticks/ --expiry 60 --samples 300 --out strategy_presets.json
+###############################################################################
+
+SWEEP_GRID: Dict[str, List[Any]] = {
+    "ALPHA_FAST":   [0.25, 0.32, 0.40, 0.50],
+    "ALPHA_SLOW":   [0.08, 0.11, 0.14, 0.18],
+    "HYSTERESIS":   [0.0, 0.04, 0.08, 0.16],
+    "VOL_GUARD":    [4e-5, 8e-5, 1.6e-4],
+    "COOLDOWN_SEC": [6.0, 12.0, 24.0],
+    "RSI_BULL":     [52.0, 55.0, 58.0],
+    "RSI_BEAR":     [42.0, 45.0, 48.0],
+}
+
+
+def _valid(v: Dict[str, Any]) -> bool:
+    # EMA "מהיר" חייב להיות מהיר מהאיטי
+    return v.get("ALPHA_FAST", 1.0) > v.get("ALPHA_SLOW", 0.0)
+
+def grid_variants(grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    keys = list(grid)
+    out = []
+    for combo in itertools.product(*(grid[k] for k in keys)):
+        v = dict(zip(keys, combo))
+        if _valid(v):
+            out.append(v)
+    return out
+
+def sample_variants(grid: Dict[str, List[Any]], n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    דגימה אקראית בלי חזרות מתוך הגריד (כולל ברירת המחדל הנוכחית, להשוואה).
+    גריד גדול לא נפרש במלואו — דוגמים צירופים ישירות.
+    """
+    keys = list(grid)
+    total = math.prod(len(grid[k]) for k in keys)
+    rnd = random.Random(seed)
+    if n <= 0 or n >= total // 2:
+        allv = grid_variants(grid)
+        picked = allv if n <= 0 or n >= len(allv) else rnd.sample(allv, n)
+    else:
+        seen, picked = set(), []
+        while len(picked) < n and len(seen) < total:
+            combo = tuple(rnd.randrange(len(grid[k])) for k in keys)
+            if combo in seen:
+                continue
+            seen.add(combo)
+            v = {k: grid[k][i] for k, i in zip(keys, combo)}
+            if _valid(v):
+                picked.append(v)
+    base = {k: CFG[k] for k in grid}
+    if base not in picked:
+        picked = [base] + picked
+    return picked
+
+
+# ===== worker =====
+_WORKER_CACHE: Dict[Tuple[str, str, float], FeatureCache] = {}
+
+def _feature_cache(root: str, sym: str, eval_step: float) -> FeatureCache:
+    key = (root, sym, eval_step)
+    fc = _WORKER_CACHE.get(key)
+    if fc is None:
+        ts, ps = load_symbol(root, sym)
+        fc = FeatureCache(TickSeries(ts, ps), eval_step)
+        _WORKER_CACHE[key] = fc
+    return fc
+
+def evaluate_variant(fc: FeatureCache, variant: Dict[str, Any], expiry_sec: float,
+                     min_conf: int, sl: slice = slice(None)) -> Dict[str, Any]:
+    out = fc.evaluate(variant, sl)
+    side = out["side"]
+    side = side * (out["conf"] >= min_conf)
+    win, labeled = fc.outcomes(side, expiry_sec, sl)
+    trades = int(labeled.sum())
+    hits = int(win.sum())
+    return {
+        "trades": trades,
+        "hits": hits,
+        "hit_rate": (hits / trades) if trades else 0.0,
+    }
+
+def _eval_chunk(args) -> List[Dict[str, Any]]:
+    root, sym, variants, expiry_sec, min_conf, eval_step, window_sec = args
+    fc = _feature_cache(root, sym, eval_step)
+    res = []
+    for v in variants:
+        cfg = dict(v)
+        cfg.setdefault("WINDOW_SEC", window_sec)
+        r = evaluate_variant(fc, cfg, expiry_sec, min_conf)
+        r["symbol"] = sym
+        r["cfg"] = v
+        res.append(r)
+    return res
+
+
+def run_sweep(root: str, symbols: List[str], variants: List[Dict[str, Any]],
+              expiry_sec: float, min_conf: int, eval_step: float, window_sec: float,
+              workers: int | None = None, chunk: int = 16) -> List[Dict[str, Any]]:
+    jobs = []
+    for sym in symbols:
+        for i in range(0, len(variants), chunk):
+            jobs.append((root, sym, variants[i:i + chunk], expiry_sec, min_conf, eval_step, window_sec))
+    results: List[Dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        for part in ex.map(_eval_chunk, jobs):
+            results.extend(part)
+    return results
+
+
+def rank_results(results: List[Dict[str, Any]], min_trades: int) -> Dict[str, List[Dict[str, Any]]]:
+    by_sym: Dict[str, List[Dict[str, Any]]] = {}
+    for r in results:
+        if r["trades"] < min_trades:
+            continue
+        by_sym.setdefault(r["symbol"], []).append(r)
+    for sym in by_sym:
+        by_sym[sym].sort(key=lambda r: (r["hit_rate"], r["trades"]), reverse=True)
+    return by_sym
+
+
+def write_presets(path: str, ranked: Dict[str, List[Dict[str, Any]]], meta: Dict[str, Any],
+                  top: int = 5):
+    payload = {
+        "generated_ts": time.time(),
+        "meta": meta,
+        "presets": {
+            sym: {
+                "cfg": {k: v for k, v in rows[0]["cfg"].items() if k in PRESET_KEYS},
+                "hit_rate": rows[0]["hit_rate"],
+                "trades": rows[0]["trades"],
+            }
+            for sym, rows in ranked.items() if rows
+        },
+        "leaderboard": {
+            sym: [
+                {"cfg": r["cfg"], "hit_rate": r["hit_rate"], "trades": r["trades"]}
+                for r in rows[:top]
+            ]
+            for sym, rows in ranked.items()
+        },
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+
+
+def _parse_param(spec: str) -> Tuple[str, List[float]]:
+    # "ALPHA_FAST=0.3,0.4,0.5"
+    k, vals = spec.split("=", 1)
+    return k.strip(), [float(v) for v in vals.split(",") if v.strip()]
+
+def main():
+    ap = argparse.ArgumentParser(description="Parallel parameter sweep over strategy.CFG")
+    ap.add_argument("--history", default=TICK_HISTORY_DIR or "ticks", help="tick_history root dir")
+    ap.add_argument("--symbols", default="", help="comma list (default: all recorded)")
+    ap.add_argument("--expiry", type=float, default=60.0, help="trade expiry in seconds")
+    ap.add_argument("--min-conf", type=int, default=70, help="only count decisions with conf >= this")
+    ap.add_argument("--min-trades", type=int, default=30)
+    ap.add_argument("--window", type=float, default=float(CFG["WINDOW_SEC"]))
+    ap.add_argument("--eval-step", type=float, default=1.0, help="seconds between decisions (0 = every tick)")
+    ap.add_argument("--samples", type=int, default=200, help="random sample size (0 = full grid)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--param", action="append", default=[], help="override grid: KEY=v1,v2,...")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--out", default=os.getenv("STRAT_PRESETS_PATH", "strategy_presets.json"))
+    args = ap.parse_args()
+
+    grid = dict(SWEEP_GRID)
+    for spec in args.param:
+        k, vals = _parse_param(spec)
+        if k not in CFG:
+            raise SystemExit(f"unknown CFG key: {k}")
+        grid[k] = vals
+
+    symbols = [s.strip() for s in args.symbols.split(",") if s.strip()] or list_symbols(args.history)
+    if not symbols:
+        raise SystemExit(f"no recorded ticks under {args.history}")
+    variants = sample_variants(grid, args.samples, args.seed)
+
+    t0 = time.time()
+    results = run_sweep(args.history, symbols, variants, args.expiry, args.min_conf,
+                        args.eval_step, args.window, args.workers)
+    ranked = rank_results(results, args.min_trades)
+    write_presets(args.out, ranked, {
+        "expiry_sec": args.expiry, "min_conf": args.min_conf, "window_sec": args.window,
+        "eval_step": args.eval_step, "variants": len(variants), "symbols": symbols,
+    })
+
+    print(f"{len(variants)} variants x {len(symbols)} symbols in {time.time()-t0:.1f}s -> {args.out}")
+    for sym, rows in ranked.items():
+        best = rows[0]
+        print(f"{sym}: {100*best['hit_rate']:.1f}% over {best['trades']} trades  {best['cfg']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+import os, sys
+
+# המודולים יושבים בשורש הריפו (בלי package)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,58 @@
+# backtest fast (vector_signal) מול exact (strategy.decide_from_ticks טיק אחרי טיק):
+# אותו side ואותו conf בכל נקודת החלטה — כולל גלאי הרג'ים וספי האחוזונים.
+import math, random
+
+import numpy as np
+import pytest
+
+from backtest import replay_exact
+from quantiles import QUANTILE_MIN_COUNT
+from strategy import CFG
+from tick_history import TickRecorder, load_symbol
+from vector_signal import REGIME_CODES, FeatureCache, TickSeries
+
+SYMBOL = "OANDA:EUR_USD"
+
+
+@pytest.fixture(scope="module")
+def ticks(tmp_path_factory):
+    """קובץ טיקים סינתטי: מגמות, דשדוש, פרצי הלם וטיקים חוזרים (מחיר מעוגל ל-pip)."""
+    root = str(tmp_path_factory.mktemp("ticks"))
+    rec = TickRecorder(root)
+    rnd = random.Random(7)
+    t, p = 1.7e9, 1.0850
+    for i in range(3000):
+        t += rnd.expovariate(1.5)
+        shock = (i // 500) % 4 == 3
+        drift = 3e-6 if (i // 400) % 3 == 0 else 0.0
+        if rnd.random() > 0.1:
+            p *= math.exp(rnd.gauss(drift, 3e-5 * (6.0 if shock else 1.0)))
+        rec.on_tick(SYMBOL, t, round(p, 5))
+    rec.close()
+    return load_symbol(root, SYMBOL)
+
+
+@pytest.mark.parametrize("eval_step", [0.0, 5.0])
+@pytest.mark.parametrize("regime_stream", [0.0, 1.0])
+def test_fast_matches_exact(ticks, regime_stream, eval_step):
+    ts, ps = ticks
+    fc = FeatureCache(TickSeries(ts, ps), eval_step)
+    cfg = dict(CFG, REGIME_STREAM=regime_stream)
+
+    fast = fc.evaluate(cfg)
+    exact = replay_exact(ts, ps, fc.eval_idx, cfg)
+
+    np.testing.assert_array_equal(fast["side"], exact["side"])
+    np.testing.assert_array_equal(fast["conf"], exact["conf"])
+    np.testing.assert_array_equal(fast["align_bonus"], exact["align_bonus"])
+
+
+def test_fixture_exercises_regimes_and_quantiles(ticks):
+    """בלי זה ההשוואה למעלה לא בודקת את מה שהיא אמורה לבדוק."""
+    ts, ps = ticks
+    fc = FeatureCache(TickSeries(ts, ps))
+    W, P = CFG["WINDOW_SEC"], CFG["RSI_PERIOD"]
+    seen = set(fc.regimes(W).tolist())
+    assert {REGIME_CODES["SHOCK"], REGIME_CODES["RANGE"], REGIME_CODES["TREND"]} <= seen
+    assert int(fc.features(W, P)["valid"].sum()) > 2 * QUANTILE_MIN_COUNT
+    assert not np.isnan(fc.thresholds(W, P)["VOL_GUARD"]).all()
@@ -0,0 +1,38 @@
+# ensemble.run_ensemble: blend שנמנע לא הופך head חלש לסיגנל, ו-cooldown של ה-blend
+# חוסם את כל ה-heads.
+import pytest
+
+from ensemble import run_ensemble
+from strategy import CFG
+
+
+def _feat(norm):
+    # breakout UP בעוצמה tanh(norm) (tick_imb=1), rsi ניטרלי -> rsi_mr נמנע
+    return {"bo_up": True, "bo_dn": False, "norm": norm, "tick_imb": 1.0, "rsi": 50.0}
+
+
+def _cfg(mode):
+    return dict(CFG, ENSEMBLE_MODE=mode)
+
+
+@pytest.mark.parametrize("mode", ["weighted", "majority", "unanimous"])
+def test_weak_head_below_conf_min_is_wait(mode):
+    side, conf, dbg = run_ensemble(_feat(0.07), ("WAIT", 40, {}), _cfg(mode))
+    assert dbg["heads"]["breakout"] == {"side": "UP", "conf": 52, "w": 0.5, "contrib": 2.0}
+    assert (side, conf) == ("WAIT", 52)
+
+
+@pytest.mark.parametrize("mode", ["weighted", "majority", "unanimous"])
+def test_strong_head_keeps_raw_conf(mode):
+    side, conf, _ = run_ensemble(_feat(2.0), ("WAIT", 40, {}), _cfg(mode))
+    assert (side, conf) == ("UP", 78)
+    side, conf, _ = run_ensemble(_feat(2.0), ("WAIT", 40, {}), dict(_cfg(mode), CONF_MAX=70))
+    assert (side, conf) == ("UP", 70)
+
+
+@pytest.mark.parametrize("mode", ["weighted", "majority", "unanimous"])
+def test_blend_cooldown_blocks_heads(mode):
+    blend = ("WAIT", 52, {"reason": "cooldown", "vol": 1e-4})
+    side, conf, dbg = run_ensemble(_feat(2.0), blend, _cfg(mode))
+    assert (side, conf) == ("WAIT", 52)
+    assert dbg["reason"] == "cooldown" and dbg["ensemble"] == mode
@@ -0,0 +1,92 @@
+# rolling.py מול חישוב מחדש מלא (sorted) על רצפי הכנסה / הוצאה אקראיים
+import collections, random
+
+import pytest
+
+from rolling import IndexableSkiplist, RollingMedianMAD
+from strategy import _robust_vol
+
+
+def _brute_mad(values):
+    s = sorted(values)
+    med = s[len(s) // 2]
+    return med, sorted(abs(v - med) for v in values)[len(values) // 2]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_skiplist_matches_sorted_list(seed):
+    rnd = random.Random(seed)
+    sl = IndexableSkiplist(seed=seed)
+    ref = []
+    for _ in range(3000):
+        if ref and rnd.random() < 0.45:
+            v = rnd.choice(ref)
+            ref.remove(v)
+            sl.remove(v)
+        else:
+            v = rnd.randint(-20, 20) * 0.5     # הרבה כפילויות
+            ref.append(v)
+            sl.insert(v)
+        ref.sort()
+        assert len(sl) == len(ref)
+        if ref:
+            i = rnd.randrange(len(ref))
+            assert sl[i] == ref[i]
+            assert sl[-1] == ref[-1]
+    assert [sl[i] for i in range(len(sl))] == ref
+
+
+def test_skiplist_errors():
+    sl = IndexableSkiplist(seed=0)
+    for v in (3.0, 1.0, 2.0):
+        sl.insert(v)
+    with pytest.raises(IndexError):
+        sl[3]
+    with pytest.raises(IndexError):
+        sl[-4]
+    with pytest.raises(KeyError):
+        sl.remove(5.0)
+    sl.remove(2.0)
+    assert [sl[0], sl[1]] == [1.0, 3.0]
+
+
+@pytest.mark.parametrize("window", [1, 2, 7, 50])
+@pytest.mark.parametrize("discrete", [True, False])
+def test_rolling_median_mad_sliding_window(window, discrete):
+    rnd = random.Random(window * 2 + discrete)
+    r = RollingMedianMAD()
+    win = collections.deque()
+    for _ in range(2000):
+        x = rnd.randint(-5, 5) * 1e-5 if discrete else rnd.gauss(0.0, 1e-4)
+        win.append(x)
+        r.add(x)
+        while len(win) > window:
+            r.remove(win.popleft())
+        med, mad = _brute_mad(win)
+        assert len(r) == len(win)
+        assert r.median() == med
+        assert r.mad() == mad
+        assert r.robust_vol() == _robust_vol(list(win))
+
+
+def test_rolling_median_mad_variable_window():
+    """החלון גדל ומתכווץ לסירוגין (כמו חלון זמן עם פרצי טיקים ושקט) — עד ריק וחזרה."""
+    rnd = random.Random(11)
+    r = RollingMedianMAD()
+    win = collections.deque()
+    emptied = 0
+    for step in range(4000):
+        grow = (step // 250) % 2 == 0
+        if not win or rnd.random() < (0.8 if grow else 0.2):
+            x = rnd.choice([0.0, 1e-5, -1e-5, 2e-5, rnd.gauss(0.0, 3e-5)])
+            win.append(x)
+            r.add(x)
+        else:
+            r.remove(win.popleft())
+            emptied += not win
+        if win:
+            med, mad = _brute_mad(win)
+            assert (r.median(), r.mad()) == (med, mad)
+        else:
+            assert len(r) == 0 and r.median() == 0.0 and r.robust_vol() == 1e-9
+    assert emptied
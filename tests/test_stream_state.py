@@ -0,0 +1,107 @@
+# stream_state.SymbolStream מול חישוב מחדש של החלון (כמו decide_from_ticks בלי stream):
+# vol, קיצון בלי הטיק האחרון, מוני צעדים והתמדה — אחרי כל טיק ואחרי הוצאה לפי זמן.
+import random
+
+import pytest
+
+from stream_state import MIN_STREAM_TICKS, SymbolStream
+from strategy import _log_steps, _robust_vol
+
+W = 26.0
+
+
+def _ticks(seed, n=3000):
+    """פרצים צפופים, שקט ארוך מהחלון (החלון מתרוקן), מחירים מעוגלים וחוזרים."""
+    rnd = random.Random(seed)
+    t, p = 1000.0, 1.0850
+    out = []
+    for i in range(n):
+        phase = (i // 150) % 3
+        t += rnd.expovariate(8.0) if phase == 0 else rnd.expovariate(0.7)
+        if rnd.random() < 0.01:
+            t += W * rnd.uniform(0.5, 2.0)
+        if rnd.random() > 0.15:
+            p = round(p + rnd.choice([-2, -1, 1, 2]) * 1e-5, 5)
+        out.append((t, p))
+    return out
+
+
+def _brute(ticks, now, window_sec=W):
+    prices = [p for ts, p in ticks if now - ts <= window_sec]
+    n = len(prices)
+    if n < MIN_STREAM_TICKS:
+        return None
+    steps = _log_steps(prices)
+    pos_log = sum(s >= 0 for s in steps)
+    pos_price = sum(prices[i] >= prices[i - 1] for i in range(1, n))
+    persist_log = pos_log / (n - 1)
+    persist_price = pos_price / (n - 1)
+    return {
+        "n": n,
+        "vol": _robust_vol(steps),
+        "persist_log": persist_log,
+        "persist_last": persist_log if steps[-1] >= 0 else 1.0 - persist_log,
+        "persist_price": persist_price,
+        "tick_imb": abs(2 * persist_price - 1.0),
+        "bo_up": prices[-1] > max(prices[:-1]),
+        "bo_dn": prices[-1] < min(prices[:-1]),
+        "_pos": (pos_log, pos_price),
+        "_hi_lo": (max(prices[:-1]), min(prices[:-1])),
+    }
+
+
+def _check(st, seen, now, window_sec=W):
+    want = _brute(seen, now, window_sec)
+    got = st.snapshot(now, window_sec)
+    if want is None:
+        assert got is None
+        return
+    assert got is not None
+    got = {k: v for k, v in got.items() if k != "regime"}
+    assert (st.pos_log, st.pos_price) == want.pop("_pos")
+    assert (st._maxq[0][1], st._minq[0][1]) == want.pop("_hi_lo")
+    assert got == want
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_snapshot_matches_window_recompute(seed):
+    st = SymbolStream("X", W)
+    seen = []
+    empty_windows = 0
+    for ts, p in _ticks(seed):
+        st.on_tick(ts, p)
+        seen.append((ts, p))
+        empty_windows += st.size(ts) == 1
+        _check(st, seen, ts)
+    assert empty_windows      # החלון באמת התרוקן (הוצאה של כל הקיצון / הצעדים)
+
+
+def test_time_eviction_without_new_ticks():
+    """snapshot ב-now מאוחר מהטיק האחרון מוציא טיקים ישנים גם בלי טיק חדש."""
+    rnd = random.Random(5)
+    st = SymbolStream("X", W)
+    seen = []
+    now = 0.0
+    for ts, p in _ticks(5, 1500):
+        ts = max(ts, now)
+        st.on_tick(ts, p)
+        seen.append((ts, p))
+        now = ts + (rnd.uniform(0.0, W) if rnd.random() < 0.2 else 0.0)
+        assert st.size(now) == sum(now - t <= W for t, _ in seen)
+        _check(st, seen, now)
+
+
+def test_rebuild_matches_incremental():
+    ticks = _ticks(7, 1200)
+    st = SymbolStream("X", W)
+    for ts, p in ticks:
+        st.on_tick(ts, p)
+    now = ticks[-1][0]
+    _check(st, ticks, now)
+
+    st.rebuild(W, ticks)
+    _check(st, ticks, now)
+
+    st.rebuild(60.0, ticks)
+    assert st.snapshot(now, W) is None         # חלון אחר -> חישוב רגיל
+    _check(st, ticks, now, 60.0)
@@ -0,0 +1,101 @@
+# tick_history.py
+from __future__ import annotations
+import os, time, threading
+from typing import Dict, List, Tuple
+
+###############################################################################
+# היסטוריית טיקים
+# ---------------
+# TickRecorder: מאזין לטיקים מה-fetcher וכותב אותם לדיסק, קובץ CSV לכל סימבול
+#               ולכל יום:  <dir>/<symbol>/<YYYY-MM-DD>.csv   (ts,price)
+# load_history: טוען את ההקלטות חזרה (ל-sweep / backtest).
+#
+# מופעל רק אם TICK_HISTORY_DIR מוגדר.
+###############################################################################
+
+TICK_HISTORY_DIR = os.getenv("TICK_HISTORY_DIR", "").strip()
+
+
+def symbol_to_dirname(sym: str) -> str:
+    # "OANDA:EUR_USD" -> "OANDA--EUR_USD" (נקודתיים לא חוקיים בחלק ממערכות הקבצים)
+    return sym.replace(":", "--")
+
+def dirname_to_symbol(name: str) -> str:
+    return name.replace("--", ":")
+
+
+class TickRecorder:
+    """
+    כתיבה זולה מתוך thread ה-fetcher: קובץ פתוח לכל סימבול, flush פעם בכמה שניות.
+    """
+
+    def __init__(self, root: str, flush_every_sec: float = 5.0):
+        self.root = root
+        self.flush_every_sec = flush_every_sec
+        self.lock = threading.Lock()
+        self._files: Dict[str, Tuple[str, object]] = {}  # sym -> (day, file)
+        self._last_flush = 0.0
+        self.rows = 0
+
+    def on_tick(self, sym: str, ts: float, price: float):
+        day = time.strftime("%Y-%m-%d", time.gmtime(ts))
+        with self.lock:
+            cur = self._files.get(sym)
+            if cur is None or cur[0] != day:
+                if cur is not None:
+                    cur[1].close()
+                d = os.path.join(self.root, symbol_to_dirname(sym))
+                os.makedirs(d, exist_ok=True)
+                f = open(os.path.join(d, f"{day}.csv"), "a", encoding="utf-8")
+                cur = (day, f)
+                self._files[sym] = cur
+            cur[1].write(f"{ts:.3f},{price!r}\n")
+            self.rows += 1
+            if ts - self._last_flush >= self.flush_every_sec:
+                for _, f in self._files.values():
+                    f.flush()
+                self._last_flush = ts
+
+    def close(self):
+        with self.lock:
+            for _, f in self._files.values():
+                try: f.close()
+                except Exception: pass
+            self._files.clear()
+
+
+def list_symbols(root: str) -> List[str]:
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        dirname_to_symbol(n) for n in os.listdir(root)
+        if os.path.isdir(os.path.join(root, n))
+    )
+
+def load_symbol(root: str, sym: str) -> Tuple[List[float], List[float]]:
+    """
+    מחזיר (timestamps, prices) ממוינים לפי זמן, מכל קבצי היום של הסימבול.
+    שורות פגומות (למשל קובץ שנחתך באמצע כתיבה) מדולגות.
+    """
+    d = os.path.join(root, symbol_to_dirname(sym))
+    rows: List[Tuple[float, float]] = []
+    if not os.path.isdir(d):
+        return [], []
+    for name in sorted(os.listdir(d)):
+        if not name.endswith(".csv"):
+            continue
+        with open(os.path.join(d, name), "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split(",")
+                if len(parts) != 2:
+                    continue
+                try:
+                    rows.append((float(parts[0]), float(parts[1])))
+                except ValueError:
+                    continue
+    rows.sort(key=lambda r: r[0])
+    return [r[0] for r in rows], [r[1] for r in rows]
+
+def load_history(root: str, symbols: List[str] | None = None) -> Dict[str, Tuple[List[float], List[float]]]:
+    syms = symbols or list_symbols(root)
+    return {s: load_symbol(root, s) for s in syms}
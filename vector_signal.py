@@ -0,0 +1,451 @@
+# vector_signal.py
+from __future__ import annotations
+import math
+from typing import Dict, Tuple
+import numpy as np
+
+from quantiles import PCT_THRESHOLDS, QUANTILE_ENABLED, SymbolSketches
+from regime import REGIMES, RegimeDetector
+from stream_state import MIN_STREAM_TICKS
+from strategy import CFG
+
+###############################################################################
+# מסלול סיגנל מוקטר (NumPy) — לשחזור היסטוריה, sweep ו-backtest
+# ----------------------------------------------------------------
+# strategy.compute_signal_from_prices מחשב חלון אחד בכל קריאה.
+# כאן מחשבים את אותם הגדלים לכל נקודות ההחלטה בבת אחת:
+#
+#   1. window_features — כל מה שתלוי רק בחלון (vol, slope, RSI, התמדה, פריצה)
+#   2. ema_spread      — EMA מהיר/איטי דרך EMA רץ גלובלי + תיקון תחילת חלון
+#   3. stream_regimes  — RegimeDetector (regime.py) על כל הטיקים, כמו SymbolStream
+#                        בלייב (REGIME_STREAM=1)
+#   4. sketch_thresholds — ספי האחוזונים של הסימבול (quantiles.py) בכל נקודה,
+#                        כמו SKETCHES.resolve ב-main
+#   5. score           — מעבר סדרתי זול על המערכים: היסטרזיס, עונשים, בונוסים,
+#                        EWMA ו-cooldown (החלקים ה-stateful של האסטרטגיה)
+#
+# "עכשיו" בכל נקודת החלטה = זמן הטיק שלה (שעון מדומה), כך שה-cooldown
+# מתנהג כמו בלייב. FeatureCache שומר את המערכים לפי הפרמטרים שהם תלויים בהם,
+# כדי ש-sweep / walk-forward לא יחשבו אותם מחדש לכל וריאנט.
+###############################################################################
+
+SIDE_UP, SIDE_DOWN, SIDE_WAIT = 1, -1, 0
+SKETCH_SEED = 0         # KLL דטרמיניסטי ב-replay (fast ו-exact מקבלים אותם ספים)
+# ספי CFG שב-live מוחלפים באחוזונים (SymbolSketches.resolve)
+SKETCH_KEYS = tuple(k for k in PCT_THRESHOLDS if k in CFG)
+NO_REGIME = -1
+REGIME_CODES = {r: i for i, r in enumerate(REGIMES)}
+
+MIN_TICKS = 10          # מתחת לזה: insufficient_data
+FALLBACK_TICKS = 12     # חלון קצר מזה -> 12 הטיקים האחרונים
+_GROUP_CELLS = 2_000_000  # גודל מקסימלי של מטריצת חלונות בבת אחת
+
+
+def _log_ratios(a: np.ndarray, b: np.ndarray) -> list:
+    """math.log(max(1e-12, a/b)) לכל זוג — אותו חישוב (עד הביט) כמו במסלול החי."""
+    return [math.log(max(1e-12, q)) for q in (a / b).tolist()]
+
+
+class TickSeries:
+    def __init__(self, ts, prices):
+        self.ts = np.asarray(ts, dtype=np.float64)
+        self.p = np.asarray(prices, dtype=np.float64)
+        self.logp = np.log(np.maximum(self.p, 1e-300))
+        # צעדי לוג / מחיר (אינדקס i = בין טיק i-1 לטיק i; באינדקס 0 אין צעד).
+        # צעדי הלוג דרך math.log של היחס, כמו SymbolStream / strategy._log_steps:
+        # vol וספי האחוזונים נבנים מהם, והפרש של np.log סוטה בביטים האחרונים
+        self.r = np.array([0.0] + _log_ratios(self.p[1:], self.p[:-1]))
+        self.pd = np.concatenate(([0.0], np.diff(self.p)))
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+
+def eval_points(series: TickSeries, step_sec: float = 0.0) -> np.ndarray:
+    """
+    אינדקסי הטיקים שבהם מקבלים החלטה.
+    step_sec<=0 -> בכל טיק; אחרת הטיק האחרון בכל צעד זמן.
+    """
+    n = len(series)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    if step_sec <= 0:
+        return np.arange(n, dtype=np.int64)
+    grid = np.arange(series.ts[0], series.ts[-1] + step_sec, step_sec)
+    idx = np.searchsorted(series.ts, grid, side="right") - 1
+    return np.unique(idx[idx >= 0]).astype(np.int64)
+
+
+def window_starts(series: TickSeries, eval_idx: np.ndarray, window_sec: float) -> np.ndarray:
+    """כמו decide_from_ticks: כל הטיקים בטווח window_sec, ולפחות 12 האחרונים."""
+    s = np.searchsorted(series.ts, series.ts[eval_idx] - window_sec, side="left")
+    short = (eval_idx - s + 1) < FALLBACK_TICKS
+    s = np.where(short, np.maximum(0, eval_idx - (FALLBACK_TICKS - 1)), s)
+    return s.astype(np.int64)
+
+
+def _running_ema(x: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    y[i] = alpha*x[i] + (1-alpha)*y[i-1], y[-1]=0 — בבלוקים מוקטרים.
+    בתוך בלוק: y = c^j * cumsum(alpha*x*c^-j) + c^(j+1)*y_prev,
+    גודל הבלוק נבחר כך ש-c^-j לא יגלוש.
+    """
+    c = 1.0 - alpha
+    if c <= 0.0:
+        return x.copy()
+    block = max(1, int(150.0 * math.log(10.0) / -math.log(c)))
+    y = np.empty_like(x)
+    prev = 0.0
+    for c0 in range(0, len(x), block):
+        xs = x[c0:c0 + block]
+        j = np.arange(len(xs), dtype=np.float64)
+        cj = np.power(c, j)
+        acc = np.cumsum(alpha * xs / cj)
+        yc = cj * acc + cj * c * prev
+        y[c0:c0 + block] = yc
+        prev = yc[-1]
+    return y
+
+
+def _upper_median(a: np.ndarray) -> np.ndarray:
+    # כמו strategy._robust_vol: sorted(x)[len//2] (ולא ממוצע שני האמצעיים)
+    k = a.shape[1] // 2
+    return np.partition(a, k, axis=1)[:, k]
+
+
+def window_features(series: TickSeries, eval_idx: np.ndarray, window_sec: float,
+                    rsi_period: int, starts: np.ndarray | None = None) -> Dict[str, np.ndarray]:
+    e = eval_idx
+    s = window_starts(series, e, window_sec) if starts is None else starts
+    n = e - s + 1
+    valid = n >= MIN_TICKS
+    m = len(e)
+
+    slope = np.array(_log_ratios(series.p[e], series.p[s]))
+
+    # התמדה: אחוז צעדים >= 0 בתוך החלון (n-1 צעדים: s+1..e)
+    cnt_r = np.cumsum(series.r >= 0)
+    cnt_p = np.cumsum(series.pd >= 0)
+    steps = np.maximum(1, n - 1)
+    persist_log = (cnt_r[e] - cnt_r[s]) / steps
+    persist_price = (cnt_p[e] - cnt_p[s]) / steps
+
+    # RSI על P הצעדים האחרונים במחיר
+    P = int(rsi_period)
+    G = np.cumsum(np.maximum(series.pd, 0.0))
+    L = np.cumsum(np.maximum(-series.pd, 0.0))
+    back = np.maximum(0, e - P)
+    gains = G[e] - G[back]
+    losses = L[e] - L[back]
+    avg_gain = gains / P
+    avg_loss = np.where(losses != 0, losses / P, 1e-9)
+    rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    rsi = np.where(n >= P + 1, rsi, 50.0)
+
+    last_up = series.p[e] >= series.p[np.maximum(0, e - 1)]
+
+    # vol (MAD) ופריצה (max/min בלי הטיק האחרון) — לפי קבוצות של אורך חלון זהה
+    vol = np.full(m, 1e-9)
+    bo_up = np.zeros(m, dtype=bool)
+    bo_dn = np.zeros(m, dtype=bool)
+    for k in np.unique(n[valid]):
+        rows = np.nonzero(n == k)[0]
+        w = int(k) - 1
+        offs = np.arange(w)
+        per_batch = max(1, _GROUP_CELLS // max(1, w))
+        for b0 in range(0, len(rows), per_batch):
+            rb = rows[b0:b0 + per_batch]
+            d = series.r[(s[rb] + 1)[:, None] + offs]
+            med = _upper_median(d)
+            mad = _upper_median(np.abs(d - med[:, None]))
+            vol[rb] = np.maximum(1e-9, 1.4826 * mad)
+            px = series.p[s[rb][:, None] + offs]
+            last = series.p[e[rb]]
+            bo_up[rb] = last > px.max(axis=1)
+            bo_dn[rb] = last < px.min(axis=1)
+
+    return {
+        "start": s, "n": n, "valid": valid,
+        "vol": vol, "slope": slope, "rsi": rsi,
+        "persist_log": persist_log, "persist_price": persist_price,
+        "bo_up": bo_up, "bo_dn": bo_dn, "last_up": last_up,
+    }
+
+
+def ema_spread(series: TickSeries, eval_idx: np.ndarray, starts: np.ndarray,
+               alpha_fast: float, alpha_slow: float,
+               _ema_cache: Dict[float, np.ndarray] | None = None) -> np.ndarray:
+    """
+    EMA של חלון שמתחיל ב-x[s] (כמו strategy._ema_alpha):
+        c^n*x[s] + y[e] - c^n*y[s-1]
+    (x מוזז בקבוע — EMA לינארי ומשקליו מסתכמים ל-1, אז ההפרש fast-slow לא משתנה)
+    """
+    x = series.logp - series.logp[0] if len(series) else series.logp
+    n = (eval_idx - starts + 1).astype(np.float64)
+
+    def win_ema(alpha: float) -> np.ndarray:
+        y = _ema_cache.get(alpha) if _ema_cache is not None else None
+        if y is None:
+            y = _running_ema(x, alpha)
+            if _ema_cache is not None:
+                _ema_cache[alpha] = y
+        cn = np.power(1.0 - alpha, n)
+        y_prev = np.where(starts > 0, y[np.maximum(0, starts - 1)], 0.0)
+        return cn * x[starts] + y[eval_idx] - cn * y_prev
+
+    return win_ema(alpha_fast) - win_ema(alpha_slow)
+
+
+def stream_regimes(series: TickSeries, window_sec: float) -> np.ndarray:
+    """
+    מצב הגלאי המתגלגל אחרי כל טיק (קודים של REGIME_CODES, NO_REGIME כשאין).
+    אותו עדכון כמו SymbolStream.on_tick: רק כשיש MIN_STREAM_TICKS טיקים בחלון
+    הטהור (בלי השלמה ל-12), עם slope / robust vol / התמדת הצעד האחרון של החלון.
+    הגלאי עצמו סדרתי (EWMA + היסטרזיס) — לולאה אחת על המערכים המוכנים.
+    """
+    n_all = len(series)
+    out = np.full(n_all, NO_REGIME, dtype=np.int8)
+    if not n_all:
+        return out
+    idx = np.arange(n_all, dtype=np.int64)
+    s = np.searchsorted(series.ts, series.ts - window_sec, side="left").astype(np.int64)
+    ok = np.nonzero(idx - s + 1 >= MIN_STREAM_TICKS)[0]
+    if not len(ok):
+        return out
+    f = window_features(series, ok, window_sec, 1, s[ok])
+    pl = f["persist_log"]
+    persist_last = np.where(series.r[ok] >= 0, pl, 1.0 - pl)
+
+    det = RegimeDetector()
+    codes = REGIME_CODES
+    for i, t, sl_i, v, pr, n in zip(ok.tolist(), series.ts[ok].tolist(), f["slope"].tolist(),
+                                    f["vol"].tolist(), persist_last.tolist(), f["n"].tolist()):
+        out[i] = codes[det.update(t, sl_i, v, pr, n)]
+    return out
+
+
+def sketch_thresholds(feat: Dict[str, np.ndarray], seed: int = SKETCH_SEED) -> Dict[str, np.ndarray]:
+    """
+    ספי SKETCH_KEYS בכל נקודת החלטה, כמו main._compute_decision: הסף נלקח
+    מה-sketch לפני ההחלטה, ואחריה ה-sketch מתעדכן ב-vol / slope שלה.
+    NaN = ה-sketch עוד לא מוכן (QUANTILE_MIN_COUNT) -> הקבוע מה-cfg.
+    """
+    sk = SymbolSketches("replay", seed)
+    m = len(feat["valid"])
+    out = {k: np.full(m, np.nan) for k in SKETCH_KEYS}
+    nan = float("nan")
+    for i, (ok, v, s) in enumerate(zip(feat["valid"].tolist(), feat["vol"].tolist(),
+                                       feat["slope"].tolist())):
+        if not ok:
+            continue
+        if sk.ready:
+            for k in SKETCH_KEYS:
+                out[k][i] = sk.threshold(k, nan)
+        sk.update(vol=v, slope=s)
+    return out
+
+
+def score(feat: Dict[str, np.ndarray], spread: np.ndarray, times: np.ndarray,
+          cfg: Dict, sl: slice = slice(None),
+          regime: np.ndarray | None = None,
+          thresholds: Dict[str, np.ndarray] | None = None) -> Dict[str, np.ndarray]:
+    """
+    החלק ה-stateful של compute_signal_from_prices, מעבר אחד על נקודות ההחלטה
+    (מצב התחלתי נקי, כמו אחרי הפעלה). sl מאפשר להריץ על תת-טווח (folds).
+    regime: קודי stream_regimes בנקודות ההחלטה — עם REGIME_STREAM הם מחליפים
+    את ספי SHOCK/RANGE הקבועים (כמו _blend_head), NO_REGIME -> הספים הקבועים.
+    thresholds: פלט sketch_thresholds — סף לכל נקודה במקום הקבוע (NaN -> הקבוע).
+    """
+    c = dict(CFG)
+    c.update(cfg)
+    H = float(c["HYSTERESIS"]); cd = float(c["COOLDOWN_SEC"])
+    nlo = float(c["NEUTRAL_RSI_LOW"]); nhi = float(c["NEUTRAL_RSI_HIGH"])
+    bull = max(58.0, float(c["RSI_BULL"])); bear = min(42.0, float(c["RSI_BEAR"]))
+    cmin = int(c["CONF_MIN"]); cmax = int(c["CONF_MAX"])
+    w_ema = float(c["W_EMA"]); w_slope = float(c["W_SLOPE"])
+    p_shock = float(c["PEN_SHOCK"]); p_range = float(c["PEN_RANGE"]); p_counter = float(c["PEN_COUNTER"])
+    p_rsi = float(c["PEN_RSI_NEUTRAL"]); p_lowvol = float(c["PEN_LOW_VOL"])
+    b_align = float(c["BONUS_ALIGN"]); b_bo = float(c["BONUS_BREAKOUT"]); b_imb = float(c["BONUS_IMB"])
+
+    valid = feat["valid"][sl].tolist()
+    vol = feat["vol"][sl].tolist(); slope = feat["slope"][sl].tolist()
+    rsi = feat["rsi"][sl].tolist(); pl = feat["persist_log"][sl].tolist()
+    pp = feat["persist_price"][sl].tolist()
+    bu = feat["bo_up"][sl].tolist(); bd = feat["bo_dn"][sl].tolist()
+    lu = feat["last_up"][sl].tolist()
+    sp = spread[sl].tolist(); tt = times[sl].tolist()
+    rg = regime[sl].tolist() if regime is not None and c["REGIME_STREAM"] else None
+    r_shock, r_range = REGIME_CODES["SHOCK"], REGIME_CODES["RANGE"]
+
+    m = len(valid)
+
+    def thr(name: str) -> list:
+        a = thresholds.get(name) if thresholds else None
+        if a is None:
+            return [float(c[name])] * m
+        return np.where(np.isnan(a[sl]), float(c[name]), a[sl]).tolist()
+    vgs, shock_vs, shock_ss, range_ss = (thr(k) for k in ("VOL_GUARD", "SHOCK_VOL", "SHOCK_SLOPE", "RANGE_SLOPE"))
+    out_side = np.zeros(m, dtype=np.int8)
+    out_conf = np.full(m, 50, dtype=np.int16)
+    out_bonus = np.zeros(m, dtype=np.float64)
+
+    last_side, last_norm, last_sig_ts, ewma = SIDE_WAIT, 0.0, 0.0, 50.0
+    for i in range(m):
+        if not valid[i]:
+            continue
+        v = vol[i]; sl_i = slope[i]
+        raw = w_ema * sp[i] + w_slope * sl_i
+        norm = abs(raw) / max(1e-9, v)
+        if raw > 0: side_pre = SIDE_UP
+        elif raw < 0: side_pre = SIDE_DOWN
+        else: side_pre = SIDE_UP if lu[i] else SIDE_DOWN
+
+        # היסטרזיס
+        if last_side != SIDE_WAIT and side_pre != last_side and norm < last_norm + H:
+            side, norm_adj = last_side, last_norm
+        else:
+            last_side, last_norm = side_pre, norm
+            side, norm_adj = side_pre, norm
+
+        pen = 1.0
+        reg = rg[i] if rg is not None else NO_REGIME
+        if reg != NO_REGIME:
+            if reg == r_shock:
+                pen *= p_shock
+            elif reg == r_range:
+                pen *= p_range
+        else:
+            if v > shock_vs[i] and abs(sl_i) < shock_ss[i]:
+                pen *= p_shock
+            if abs(sl_i) < range_ss[i] and pl[i] < 0.6:
+                pen *= p_range
+        if (side == SIDE_UP and sl_i < -1e-4) or (side == SIDE_DOWN and sl_i > 1e-4):
+            pen *= p_counter
+        norm_adj *= pen
+
+        r = rsi[i]
+        if nlo <= r <= nhi:
+            norm_adj *= p_rsi
+        if v < vgs[i]:
+            norm_adj *= p_lowvol
+
+        # בלייב long_prices == prices (החלון קצר מ-2.5n), לכן side_long == side_pre
+        rsi_support = (side == SIDE_UP and r >= bull) or (side == SIDE_DOWN and r <= bear)
+        bonus = 0.0
+        if side == side_pre and rsi_support:
+            bonus += b_align
+        if (bu[i] and side == SIDE_UP) or (bd[i] and side == SIDE_DOWN):
+            bonus += b_bo
+        if abs(2 * pp[i] - 1.0) >= 0.36:
+            bonus += b_imb
+
+        conf_base = 50 + 30 * math.tanh(norm_adj) + bonus * 100.0
+        ewma = 0.6 * ewma + 0.4 * conf_base
+        conf = int(max(cmin, min(cmax, ewma)))
+
+        now = tt[i]
+        if last_sig_ts and (now - last_sig_ts) < cd and side != last_side:
+            out_conf[i] = max(52, cmin - 3)
+            continue
+        out_bonus[i] = bonus
+        out_conf[i] = conf
+        if conf < cmin:
+            continue
+        last_sig_ts = now
+        out_side[i] = side
+
+    return {"side": out_side, "conf": out_conf, "align_bonus": out_bonus}
+
+
+def label_outcomes(series: TickSeries, eval_idx: np.ndarray, side: np.ndarray,
+                   expiry_sec: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    תוצאת עסקה ב-expiry: מחיר כניסה = הטיק של ההחלטה, מחיר יציאה = הטיק האחרון
+    עד ts+expiry. מחזיר (win, labeled): labeled=False לנקודות בלי כיוון,
+    בלי מספיק היסטוריה קדימה, או תיקו (מחיר זהה — ב-PO מוחזר הסכום).
+    """
+    t_exit = series.ts[eval_idx] + expiry_sec
+    j = np.searchsorted(series.ts, t_exit, side="right") - 1
+    entry = series.p[eval_idx]
+    exitp = series.p[j]
+    covered = t_exit <= (series.ts[-1] if len(series) else -np.inf)
+    moved = exitp != entry
+    labeled = covered & moved & (side != SIDE_WAIT)
+    win = ((side == SIDE_UP) & (exitp > entry)) | ((side == SIDE_DOWN) & (exitp < entry))
+    return win & labeled, labeled
+
+
+class FeatureCache:
+    """
+    מערכי פיצ'רים לסימבול אחד ולנקודות החלטה קבועות, שמורים לפי הפרמטרים:
+    - window_features לפי (window_sec, rsi_period)
+    - EMA רץ לפי alpha
+    - רג'ים מתגלגל וספי אחוזונים לפי window_sec
+    וריאנטים של CFG שנבדלים רק בספים/עונשים לא מחשבים כלום מחדש.
+    """
+
+    def __init__(self, series: TickSeries, eval_step_sec: float = 0.0):
+        self.series = series
+        self.eval_idx = eval_points(series, eval_step_sec)
+        self.times = series.ts[self.eval_idx] if len(series) else np.zeros(0)
+        self._starts: Dict[float, np.ndarray] = {}
+        self._win: Dict[Tuple[float, int], Dict[str, np.ndarray]] = {}
+        self._ema: Dict[float, np.ndarray] = {}
+        self._spread: Dict[Tuple[float, float, float], np.ndarray] = {}
+        self._regime: Dict[float, np.ndarray] = {}
+        self._thr: Dict[float, Dict[str, np.ndarray]] = {}
+
+    def starts(self, window_sec: float) -> np.ndarray:
+        key = float(window_sec)
+        s = self._starts.get(key)
+        if s is None:
+            s = window_starts(self.series, self.eval_idx, window_sec)
+            self._starts[key] = s
+        return s
+
+    def features(self, window_sec: float, rsi_period: int) -> Dict[str, np.ndarray]:
+        key = (float(window_sec), int(rsi_period))
+        f = self._win.get(key)
+        if f is None:
+            f = window_features(self.series, self.eval_idx, window_sec, rsi_period,
+                                self.starts(window_sec))
+            self._win[key] = f
+        return f
+
+    def spread(self, window_sec: float, alpha_fast: float, alpha_slow: float) -> np.ndarray:
+        key = (float(window_sec), float(alpha_fast), float(alpha_slow))
+        sp = self._spread.get(key)
+        if sp is None:
+            sp = ema_spread(self.series, self.eval_idx, self.starts(window_sec),
+                            alpha_fast, alpha_slow, self._ema)
+            self._spread[key] = sp
+        return sp
+
+    def regimes(self, window_sec: float) -> np.ndarray:
+        key = float(window_sec)
+        rg = self._regime.get(key)
+        if rg is None:
+            rg = stream_regimes(self.series, window_sec)[self.eval_idx]
+            self._regime[key] = rg
+        return rg
+
+    def thresholds(self, window_sec: float, rsi_period: int) -> Dict[str, np.ndarray]:
+        key = float(window_sec)
+        th = self._thr.get(key)
+        if th is None:
+            th = sketch_thresholds(self.features(window_sec, rsi_period))
+            self._thr[key] = th
+        return th
+
+    def evaluate(self, cfg: Dict, sl: slice = slice(None)) -> Dict[str, np.ndarray]:
+        c = dict(CFG)
+        c.update(cfg)
+        f = self.features(c["WINDOW_SEC"], c["RSI_PERIOD"])
+        sp = self.spread(c["WINDOW_SEC"], c["ALPHA_FAST"], c["ALPHA_SLOW"])
+        rg = self.regimes(c["WINDOW_SEC"]) if c["REGIME_STREAM"] else None
+        th = self.thresholds(c["WINDOW_SEC"], c["RSI_PERIOD"]) if QUANTILE_ENABLED else None
+        return score(f, sp, self.times, c, sl, rg, th)
+
+    def outcomes(self, side: np.ndarray, expiry_sec: float,
+                 sl: slice = slice(None)) -> Tuple[np.ndarray, np.ndarray]:
+        return label_outcomes(self.series, self.eval_idx[sl], side, expiry_sec)
@@ -0,0 +1,208 @@
+# walkforward.py
+from __future__ import annotations
+import argparse, collections, json, math, time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from strategy import CFG
+from sweep import SWEEP_GRID, _feature_cache, evaluate_variant, sample_variants
+from tick_history import TICK_HISTORY_DIR, list_symbols, load_symbol
+
+###############################################################################
+# Walk-forward
+# ------------
+# sweep יחיד על כל ההיסטוריה "לומד בעל פה" את הקבועים הידניים של
+# compute_signal_from_prices (משקלי 0.58/0.42, עונשים, בונוסים).
+# כאן ההיסטוריה נחתכת ל-folds מתגלגלים:
+#
+#   |---- train ----|-- test --|
+#          |---- train ----|-- test --|
+#
+# לכל fold: אופטימיזציה על ה-train (במקביל, fold לתהליך), ואז הערכה
+# out-of-sample על ה-test. הפיצ'רים מחושבים פעם אחת לסימבול בכל worker
+# (FeatureCache של sweep) וכל fold רק חותך אותם.
+#
+# הדו"ח: אחוז פגיעה OOS פר נכס (מול CFG ברירת מחדל), ויציבות הפרמטרים
+# שנבחרו בין ה-folds.
+#
+#   python walkforward.py --history ticks/ --train-h 24 --test-h 6 --expiry 60
+###############################################################################
+
+WALK_GRID: Dict[str, List[Any]] = dict(SWEEP_GRID)
+WALK_GRID.update({
+    "W_EMA":          [0.40, 0.58, 0.75],   # W_SLOPE = 1 - W_EMA
+    "PEN_SHOCK":      [0.3, 0.5, 0.8],
+    "PEN_RANGE":      [0.5, 0.7, 0.9],
+    "PEN_COUNTER":    [0.45, 0.65, 0.85],
+    "BONUS_ALIGN":    [0.06, 0.12, 0.18],
+    "BONUS_BREAKOUT": [0.05, 0.10, 0.15],
+    "BONUS_IMB":      [0.0, 0.06, 0.12],
+})
+
+
+def walk_variants(n: int, seed: int) -> List[Dict[str, Any]]:
+    out = []
+    for v in sample_variants(WALK_GRID, n, seed):
+        v = dict(v)
+        v["W_SLOPE"] = round(1.0 - v["W_EMA"], 6)
+        out.append(v)
+    return out
+
+
+def make_folds(t0: float, t1: float, train_sec: float, test_sec: float,
+               step_sec: float) -> List[Tuple[float, float, float]]:
+    """[(train_start, train_end == test_start, test_end), ...]"""
+    folds = []
+    start = t0
+    while start + train_sec + test_sec <= t1:
+        folds.append((start, start + train_sec, start + train_sec + test_sec))
+        start += step_sec
+    return folds
+
+
+def _slice(times: np.ndarray, a: float, b: float) -> slice:
+    return slice(int(np.searchsorted(times, a, side="left")),
+                 int(np.searchsorted(times, b, side="left")))
+
+
+def _run_fold(args) -> Dict[str, Any]:
+    root, sym, k, fold, variants, expiry, min_conf, min_trades, eval_step, window = args
+    fc = _feature_cache(root, sym, eval_step)
+    tr0, tr1, te1 = fold
+    # נקודות שה-expiry שלהן חוצה את הגבול לא נכנסות (אין דליפה בין train ל-test)
+    train = _slice(fc.times, tr0, tr1 - expiry)
+    test = _slice(fc.times, tr1, te1 - expiry)
+
+    best, best_r = None, None
+    for v in variants:
+        cfg = dict(v, WINDOW_SEC=window)
+        r = evaluate_variant(fc, cfg, expiry, min_conf, train)
+        if r["trades"] < min_trades:
+            continue
+        if best_r is None or (r["hit_rate"], r["trades"]) > (best_r["hit_rate"], best_r["trades"]):
+            best, best_r = v, r
+
+    base = evaluate_variant(fc, {"WINDOW_SEC": window}, expiry, min_conf, test)
+    oos = evaluate_variant(fc, dict(best, WINDOW_SEC=window), expiry, min_conf, test) if best else None
+    return {
+        "symbol": sym, "fold": k, "range": fold,
+        "best": best, "train": best_r, "test": oos, "baseline": base,
+    }
+
+
+def param_stability(chosen: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """
+    לכל פרמטר: mode_share = כמה מה-folds בחרו בערך הנפוץ,
+    cv = סטיית תקן / ממוצע של הערכים שנבחרו. יציב = mode_share גבוה, cv נמוך.
+    """
+    out: Dict[str, Dict[str, float]] = {}
+    if not chosen:
+        return out
+    for k in chosen[0]:
+        vals = [float(c[k]) for c in chosen if k in c]
+        cnt = collections.Counter(vals)
+        mode_v, mode_n = cnt.most_common(1)[0]
+        mean = sum(vals) / len(vals)
+        std = math.sqrt(sum((v - mean) ** 2 for v in vals) / len(vals))
+        out[k] = {
+            "mode": mode_v,
+            "mode_share": mode_n / len(vals),
+            "cv": (std / abs(mean)) if mean else 0.0,
+        }
+    return out
+
+
+def summarize(folds: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    by_sym: Dict[str, List[Dict[str, Any]]] = collections.defaultdict(list)
+    for f in folds:
+        by_sym[f["symbol"]].append(f)
+    report = {}
+    for sym, fs in by_sym.items():
+        fs.sort(key=lambda f: f["fold"])
+        used = [f for f in fs if f["test"] is not None]
+        def agg(key: str, rows) -> Dict[str, Any]:
+            t = sum(f[key]["trades"] for f in rows)
+            h = sum(f[key]["hits"] for f in rows)
+            return {"trades": t, "hits": h, "hit_rate": (h / t) if t else 0.0}
+        report[sym] = {
+            "folds": len(fs),
+            "folds_optimized": len(used),
+            "oos": agg("test", used),
+            "baseline_oos": agg("baseline", fs),
+            "in_sample": agg("train", used),
+            "stability": param_stability([f["best"] for f in used]),
+            "per_fold": [
+                {"fold": f["fold"],
+                 "train": f["train"]["hit_rate"] if f["train"] else None,
+                 "test": f["test"]["hit_rate"] if f["test"] else None,
+                 "baseline": f["baseline"]["hit_rate"],
+                 "best": f["best"]}
+                for f in fs
+            ],
+        }
+    return report
+
+
+def print_report(report: Dict[str, Dict[str, Any]]):
+    for sym, r in report.items():
+        print(f"== {sym}: {r['folds_optimized']}/{r['folds']} folds")
+        print(f"   OOS:        {100*r['oos']['hit_rate']:.1f}% ({r['oos']['trades']})")
+        print(f"   baseline:   {100*r['baseline_oos']['hit_rate']:.1f}% ({r['baseline_oos']['trades']})")
+        print(f"   in-sample:  {100*r['in_sample']['hit_rate']:.1f}% ({r['in_sample']['trades']})")
+        for k, st in sorted(r["stability"].items(), key=lambda kv: kv[1]["mode_share"]):
+            print(f"   {k:<16} mode={st['mode']:<8g} share={st['mode_share']:.2f} cv={st['cv']:.2f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Walk-forward optimization with rolling train/test splits")
+    ap.add_argument("--history", default=TICK_HISTORY_DIR or "ticks")
+    ap.add_argument("--symbols", default="")
+    ap.add_argument("--train-h", type=float, default=24.0)
+    ap.add_argument("--test-h", type=float, default=6.0)
+    ap.add_argument("--step-h", type=float, default=0.0, help="fold step (default = test length)")
+    ap.add_argument("--expiry", type=float, default=60.0)
+    ap.add_argument("--min-conf", type=int, default=70)
+    ap.add_argument("--min-trades", type=int, default=30)
+    ap.add_argument("--window", type=float, default=float(CFG["WINDOW_SEC"]))
+    ap.add_argument("--eval-step", type=float, default=1.0)
+    ap.add_argument("--samples", type=int, default=150)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--json", default="walkforward_report.json")
+    args = ap.parse_args()
+
+    symbols = [s.strip() for s in args.symbols.split(",") if s.strip()] or list_symbols(args.history)
+    if not symbols:
+        raise SystemExit(f"no recorded ticks under {args.history}")
+    variants = walk_variants(args.samples, args.seed)
+    train_sec, test_sec = args.train_h * 3600.0, args.test_h * 3600.0
+    step_sec = (args.step_h * 3600.0) or test_sec
+
+    t0 = time.time()
+    jobs = []
+    for sym in symbols:
+        # גבולות ה-folds מהטיקים הגולמיים — הפיצ'רים נבנים רק ב-workers
+        ts, _ = load_symbol(args.history, sym)
+        if not ts:
+            continue
+        for k, fold in enumerate(make_folds(float(ts[0]), float(ts[-1]),
+                                            train_sec, test_sec, step_sec)):
+            jobs.append((args.history, sym, k, fold, variants, args.expiry, args.min_conf,
+                         args.min_trades, args.eval_step, args.window))
+    if not jobs:
+        raise SystemExit("history too short for a single train+test fold")
+
+    with ProcessPoolExecutor(max_workers=args.workers) as ex:
+        folds = list(ex.map(_run_fold, jobs))
+
+    report = summarize(folds)
+    print_report(report)
+    print(f"{len(jobs)} folds x {len(variants)} variants in {time.time()-t0:.1f}s")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# window_selector.py
+from __future__ import annotations
+import collections, os, threading, time
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from stream_state import SymbolStream
+from strategy import StrategyState, compute_signal_from_prices
+
+###############################################################################
+# בורר חלון ניתוח אדפטיבי
+# ----------------------
+# לכל סימבול מריצים את האסטרטגיה על כל החלונות ב-WINDOW_CHOICES
+# (כל חלון עם StrategyState משלו), ומודדים לכל אחד דיוק בפועל:
+# כל UP/DOWN נרשם עם מחיר כניסה ומתויג כשעובר ה-expiry של הנכס.
+#
+# buffer טיקים אחד (באורך החלון הגדול) — החלונות הם סיומות שלו, ומעבר אחד
+# מוצא את נקודות ההתחלה. לכל חלון SymbolStream משלו (stream_state.py) שמתעדכן
+# בכל טיק, כך ש-vol / התמדה / פריצה / רג'ים מגיעים כ-pre מוכן (כמו ב-
+# decide_from_ticks) במקום מיון ומעברים מלאים על כל חלון בכל הערכה.
+#
+# - on_tick (listener של ה-fetcher): מוסיף ל-buffer ול-streams ומתייג עסקאות
+#   שהגיע זמנן. התיוג לפי המחיר שהיה בתוקף ב-due (הטיק האחרון לפני).
+# - evaluate(now): כל SELECTOR_STEP_SEC, ישירות על ה-thread של הבורר —
+#   עבודת פייתון טהורה, thread pool לא מקצר אותה (GIL).
+#
+# בחירה: ציון = (hits+1)/(n+2) על SELECTOR_HISTORY התוצאות האחרונות;
+# מחליפים חלון רק אחרי SELECTOR_MIN_SAMPLES ורק אם המוביל עדיף ב-SELECTOR_MARGIN
+# (על החלון הנוכחי — הנבחר, או הידני כל עוד לא נבחר כלום).
+###############################################################################
+
+SELECTOR_ENABLED = os.getenv("AUTO_WINDOW", "1").strip() != "0"
+SELECTOR_STEP_SEC = float(os.getenv("SELECTOR_STEP_MS", "2000")) / 1000.0
+SELECTOR_HISTORY = 60
+SELECTOR_MIN_SAMPLES = 20
+SELECTOR_MARGIN = 0.03
+MIN_TICKS = 12
+
+
+class WindowStats:
+    def __init__(self):
+        self.outcomes: Deque[bool] = collections.deque(maxlen=SELECTOR_HISTORY)
+        self.side: str = "WAIT"
+        self.conf: int = 50
+
+    @property
+    def n(self) -> int:
+        return len(self.outcomes)
+
+    def score(self) -> float:
+        return (sum(self.outcomes) + 1.0) / (self.n + 2.0)
+
+
+class WindowSelector:
+    def __init__(self, symbol: str, windows: List[int]):
+        self.symbol = symbol
+        self.windows = sorted(int(w) for w in windows)
+        self.lock = threading.Lock()
+        self.ticks: Deque[Tuple[float, float]] = collections.deque()
+        self.states = {w: StrategyState() for w in self.windows}
+        self.streams = {w: SymbolStream(symbol, w) for w in self.windows}
+        self.stats = {w: WindowStats() for w in self.windows}
+        # (due_ts, entry_price, side, window)
+        self.pending: Deque[Tuple[float, float, str, int]] = collections.deque()
+        self.chosen: Optional[float] = None   # None = עדיין אין מספיק תוצאות
+        self.switches: int = 0
+        self.last_eval_ts: float = 0.0
+
+    # ---------- טיקים + תיוג ----------
+
+    def on_tick(self, ts: float, price: float):
+        with self.lock:
+            prev = self.ticks[-1][1] if self.ticks else None
+            while self.pending and self.pending[0][0] <= ts:
+                due, entry, side, w = self.pending.popleft()
+                if prev is None or prev == entry:
+                    continue  # תיקו — לא נספר
+                self.stats[w].outcomes.append((prev > entry) == (side == "UP"))
+            self.ticks.append((ts, price))
+            for stream in self.streams.values():
+                stream.on_tick(ts, price)
+            # מספיק להחזיק את החלון הגדול (+ מינימום טיקים ל-fallback)
+            horizon = self.windows[-1]
+            while len(self.ticks) > MIN_TICKS and ts - self.ticks[0][0] > horizon:
+                self.ticks.popleft()
+
+    # ---------- הערכת כל החלונות ----------
+
+    def _window_starts(self, items: List[Tuple[float, float]], now: float) -> Dict[int, int]:
+        """מעבר אחד: החלונות ממוינים מהגדול לקטן, כך שנקודות ההתחלה רק מתקדמות."""
+        starts, i = {}, 0
+        for w in reversed(self.windows):
+            while i < len(items) and now - items[i][0] > w:
+                i += 1
+            starts[w] = i
+        return starts
+
+    def evaluate(self, now: float, cfg: Dict, expiry_sec: float):
+        with self.lock:
+            items = list(self.ticks)
+        if len(items) < MIN_TICKS:
+            return
+        starts = self._window_starts(items, now)
+        prices = [p for _, p in items]
+        entry = prices[-1]
+        results = {}
+        for w in self.windows:
+            window = prices[starts[w]:]
+            if len(window) < MIN_TICKS:
+                window = prices[-MIN_TICKS:]
+            pre = self.streams[w].snapshot(now, w)
+            if pre is not None and pre["n"] != len(window):
+                pre = None  # טיק שנכנס בין ההעתקה ל-snapshot — חישוב רגיל
+            c = dict(cfg)
+            c["WINDOW_SEC"] = float(w)
+            c["ENSEMBLE_MODE"] = "off"
+            side, conf, _ = compute_signal_from_prices(window, pre, self.states[w], c)
+            results[w] = (side, conf)
+        with self.lock:
+            for w, (side, conf) in results.items():
+                st = self.stats[w]
+                st.side, st.conf = side, conf
+                if side in ("UP", "DOWN"):
+                    self.pending.append((now + expiry_sec, entry, side, w))
+            self.last_eval_ts = now
+            self._choose(float(cfg["WINDOW_SEC"]))
+
+    def _choose(self, manual_window: float):
+        ready = [w for w in self.windows if self.stats[w].n >= SELECTOR_MIN_SAMPLES]
+        if not ready:
+            return
+        best = max(ready, key=lambda w: self.stats[w].score())
+        cur = int(self.chosen if self.chosen is not None else manual_window)
+        cur_score = self.stats[cur].score() if cur in self.stats else 0.0
+        if best != cur and self.stats[best].score() >= cur_score + SELECTOR_MARGIN:
+            self.chosen = float(best)
+            self.switches += 1
+
+    # ---------- קריאה ----------
+
+    def sides(self) -> Tuple[str, str, str]:
+        """(קצר, אמצעי, ארוך) — הצד האחרון של החלון הקטן / הנבחר / הגדול."""
+        with self.lock:
+            mid = int(self.chosen) if self.chosen is not None else self.windows[len(self.windows) // 2]
+            return (self.stats[self.windows[0]].side, self.stats[mid].side,
+                    self.stats[self.windows[-1]].side)
+
+    def scores_line(self) -> str:
+        with self.lock:
+            parts = []
+            for w in self.windows:
+                st = self.stats[w]
+                mark = "✅" if self.chosen is not None and w == int(self.chosen) else ""
+                parts.append(f"{w}s {100*st.score():.0f}%({st.n}){mark}")
+            return "Windows: " + " | ".join(parts)
+
+
+class SelectorRegistry:
+    def __init__(self, windows: List[int]):
+        self.windows = list(windows)
+        self.lock = threading.Lock()
+        self.selectors: Dict[str, WindowSelector] = {}
+
+    def get(self, symbol: str) -> WindowSelector:
+        with self.lock:
+            sel = self.selectors.get(symbol)
+            if sel is None:
+                sel = self.selectors[symbol] = WindowSelector(symbol, self.windows)
+            return sel
+
+    def on_tick(self, symbol: str, ts: float, price: float):
+        self.get(symbol).on_tick(ts, price)
+
+    def window_for(self, symbol: str) -> Optional[float]:
+        """החלון שנבחר לסימבול, או None (-> החלון הידני / מה-sync)."""
+        with self.lock:
+            sel = self.selectors.get(symbol)
+        return sel.chosen if sel is not None else None
+
+    def evaluate_all(self, cfg_for: Callable[[str], Dict], expiry_for: Callable[[str], float]):
+        now = time.time()
+        with self.lock:
+            sels = list(self.selectors.values())
+        for s in sels:
+            try:
+                s.evaluate(now, cfg_for(s.symbol), expiry_for(s.symbol))
+            except Exception as e:
+                print("[WINDOW SELECTOR] exception:", e)
+
+    def run_forever(self, cfg_for, expiry_for, step_sec: float = SELECTOR_STEP_SEC):
+        while True:
+            t0 = time.time()
+            self.evaluate_all(cfg_for, expiry_for)
+            time.sleep(max(0.05, step_sec - (time.time() - t0)))
+
+    def start(self, cfg_for, expiry_for) -> threading.Thread:
+        t = threading.Thread(target=self.run_forever, args=(cfg_for, expiry_for), daemon=True)
+        t.start()
+        return t